@@ -7,7 +7,10 @@ import asyncio
 from app.external.ahr_client import AHRClient
 from app.external.cdc_wonder import CDCWonderClient
 from app.external.datafenix import DataFenixClient
-from app.data.pipeline import run_data_pipeline, _run_pipeline_async
+from app.data.pipeline import run_data_pipeline, run_pipeline_sync, _run_pipeline_async
+from app.data.storage import get_task
+from app.data.task_queue import get_task_queue
+from app.data.calibration_registry import get_calibration_registry
 
 data_bp = Blueprint('data_integration', __name__, url_prefix='/api/v1')
 import logging
@@ -157,31 +160,71 @@ def trigger_calibration():
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)}), 500
             
+    # Celery when a broker is configured, otherwise (or if it is unreachable)
+    # the in-process queue with the same task_id/status contract
+    if os.getenv("CELERY_BROKER_URL"):
+        try:
+            task = run_data_pipeline.delay()
+            return jsonify({"task_id": task.id, "status": "queued", "backend": "celery"})
+        except Exception as e:
+            logger.warning(f"Celery dispatch failed, using local task queue: {e}")
+
     try:
-        task = run_data_pipeline.delay()
-        return jsonify({"task_id": task.id, "status": "queued"})
+        task_id = get_task_queue().submit("run_data_pipeline", run_pipeline_sync)
+        task = get_task(task_id)
+        return jsonify({"task_id": task_id, "status": task["status"], "backend": "local"})
     except Exception as e:
         return jsonify({
             "status": "error", 
-            "message": "Celery/Redis not running. Try adding ?sync=true to your request.",
+            "message": "Could not queue calibration. Try adding ?sync=true to your request.",
             "details": str(e)
         }), 503
 
+_CELERY_STATUS = {
+    "PENDING": "queued",
+    "RECEIVED": "queued",
+    "STARTED": "running",
+    "RETRY": "running",
+    "SUCCESS": "success",
+    "FAILURE": "failure",
+    "REVOKED": "failure",
+}
+
+@data_bp.route('/data/tasks/<task_id>', methods=['GET'])
+@jwt_required()
+def get_task_status(task_id):
+    task = get_task(task_id)
+    if task:
+        return jsonify({
+            "task_id": task_id,
+            "status": task["status"],
+            "result": task["result"],
+            "error": task["error"],
+            "created_at": task["created_at"],
+            "started_at": task["started_at"],
+            "finished_at": task["finished_at"],
+            "backend": "local"
+        })
+
+    if os.getenv("CELERY_BROKER_URL"):
+        result = run_data_pipeline.AsyncResult(task_id)
+        status = _CELERY_STATUS.get(result.state, result.state.lower())
+        return jsonify({
+            "task_id": task_id,
+            "status": status,
+            "result": result.result if status == "success" else None,
+            "error": str(result.result) if status == "failure" else None,
+            "backend": "celery"
+        })
+
+    return jsonify({"status": "error", "message": "Task not found"}), 404
+
 @data_bp.route('/data/calibration-status', methods=['GET'])
 def get_calibration_status():
     path = os.getenv("CALIBRATION_OUTPUT_PATH", "./config/calibration_params.json")
-    if not os.path.exists(path):
-        return jsonify({"status": "never_run"})
-    
     try:
-        with open(path, 'r') as f:
-            params = json.load(f)
-        
-        return jsonify({
-            "status": "success",
-            "last_updated": os.path.getmtime(path),
-            "features": list(params.keys())
-        })
+        # Served from the cached parse; the file is re-read only when it changes
+        return jsonify(get_calibration_registry(path).metadata())
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -1,31 +1,52 @@
+import itertools
+import logging
 import os
-from flask import Blueprint, request, jsonify, Response, send_file
-import torch
+import numpy as np
+from flask import Blueprint, request, jsonify, Response, send_file, stream_with_context
 
-from app.data.synthetic_data import generate_synthetic_maternal_data, split_data_for_federated_learning, prepare_dataloaders
 from app.data.storage import (
-    init_db,
     get_prediction_count,
     get_training_history as fetch_training_history,
+    list_privacy_accountants,
     list_model_versions,
     get_latest_model_version,
     get_model_version,
-    record_prediction,
+    record_predictions,
     save_model_version,
 )
-from app.federated_learning.coordinator import FederatedLearningCoordinator
-from app.federated_learning.hospital_node import HospitalNode
+from app.data.model_store import STORE_PREFIX, get_model_store
+from app.models.inference import BACKENDS as INFERENCE_BACKENDS, get_latest_predictor, predict_in_memory
 from config import config
 
 from flask_jwt_extended import jwt_required, create_access_token
 from app.api.data_routes import run_async
 
 api_bp = Blueprint('api', __name__)
+logger = logging.getLogger(__name__)
 
 # Global variables to store the coordinator
+# Training dependencies (torch, opacus, sklearn, scipy) are imported inside
+# the handlers that need them, so workers start without loading them.
 coordinator = None
 
-init_db()
+
+def _feature_options(options, key, enabled):
+    """
+    Settings dict for an optional /api/initialize feature: `options[key]`
+    may be true ({}), false (None: off) or a dict; when absent the feature
+    is on ({}) if `enabled` (its config switch). Anything else raises
+    ValueError.
+    """
+    value = options.get(key)
+    if value is None:
+        return {} if enabled else None
+    if value is True:
+        return {}
+    if value is False:
+        return None
+    if isinstance(value, dict):
+        return value
+    raise ValueError(f"'{key}' must be true, false or an object, got {type(value).__name__}")
 
 @api_bp.route('/auth/login', methods=['POST'])
 def login():
@@ -262,6 +283,10 @@ def health_check():
             <div class="method">GET</div>
             <div><span class="path">/api/history</span> <span class="note">Get training history</span></div>
           </div>
+          <div class="row">
+            <div class="method">GET</div>
+            <div><span class="path">/api/privacy</span> <span class="note">Epsilon spent per hospital</span></div>
+          </div>
         </div>
         <div class="chart-card">
           <div class="chart-title">Training Metrics</div>
@@ -284,7 +309,7 @@ def health_check():
       <div class="card mini">
         <div class="stat">
           <h3>Device</h3>
-          <p>""" + str(config.DEVICE) + """</p>
+          <p>""" + config.device_label + """</p>
         </div>
         <div class="stat">
           <h3>Hospitals</h3>
@@ -415,6 +440,7 @@ def health_check():
                   borderColor: "#6dd3a0",
                   backgroundColor: "rgba(109, 211, 160, 0.2)",
                   yAxisID: "y1",
+                  spanGaps: true,
                   tension: 0.35
                 }
               ]
@@ -1059,7 +1085,7 @@ def get_latest_model():
 @api_bp.route('/api/model/download/<int:version>', methods=['GET'])
 @jwt_required()
 def download_model(version):
-    """Download a specific model version."""
+    """Download a specific model version (?format=torchscript|int8|numpy for an inference artifact)."""
     model_info = get_model_version(version)
     if not model_info:
         return jsonify({
@@ -1067,6 +1093,30 @@ def download_model(version):
             'message': 'Model version not found'
         }), 404
     model_path = model_info['path']
+    artifact_format = request.args.get('format')
+    if artifact_format in INFERENCE_BACKENDS:
+        model_path = model_info.get(INFERENCE_BACKENDS[artifact_format])
+        if not model_path:
+            return jsonify({
+                'status': 'error',
+                'message': f'No {artifact_format} artifact for this version'
+            }), 404
+    elif model_path.startswith(STORE_PREFIX):
+        # Rebuilt from this version's objects (and its keyframe's) and streamed
+        store = get_model_store()
+        try:
+            chunks = store.iter_state_dict_bytes(version)
+            first = next(chunks)
+        except (KeyError, FileNotFoundError):
+            return jsonify({
+                'status': 'error',
+                'message': 'Model data missing from the model store'
+            }), 404
+        return Response(
+            stream_with_context(itertools.chain([first], chunks)),
+            mimetype='application/octet-stream',
+            headers={'Content-Disposition': f'attachment; filename=model_v{version}.pt'}
+        )
     if not os.path.exists(model_path):
         return jsonify({
             'status': 'error',
@@ -1074,60 +1124,365 @@ def download_model(version):
         }), 404
     return send_file(model_path, as_attachment=True, download_name=os.path.basename(model_path))
 
+@api_bp.route('/api/model/gc', methods=['POST'])
+@jwt_required()
+def collect_model_garbage():
+    """Prune old model versions (body: {"keep_last": N}, default MODEL_RETENTION) and unreferenced objects."""
+    data = request.get_json(silent=True) or {}
+    keep_last = data.get('keep_last', config.MODEL_RETENTION)
+    if not isinstance(keep_last, int) or keep_last < 0:
+        return jsonify({
+            'status': 'error',
+            'message': 'keep_last must be a non-negative integer.'
+        }), 400
+    store = get_model_store()
+    return jsonify({
+        'status': 'success',
+        'gc': store.gc(keep_last),
+        'store': store.stats()
+    })
+
 @api_bp.route('/api/initialize', methods=['POST'])
 @jwt_required()
 def initialize_federated_learning():
     """Initialize the federated learning system with synthetic data"""
     global coordinator
+    from app.data.synthetic_data import (
+        generate_synthetic_maternal_data,
+        split_frame_to_matrix,
+        prepare_matrix_dataloaders,
+        make_federated_streams,
+        split_holdout,
+        num_samples,
+    )
+    from app.federated_learning.async_coordinator import AsyncFederatedCoordinator
+    from app.federated_learning.compression import UpdateCompressor, build_compressor
+    from app.federated_learning.coordinator import FederatedLearningCoordinator
+    from app.federated_learning.hierarchical import HierarchicalAggregator, assign_regions
+    from app.federated_learning.hospital_node import HospitalNode
+    from app.federated_learning.privacy import PrivacyAccountant, build_privacy
+    from app.federated_learning.remote_node import RemoteHospitalNode, get_local_cluster
+    from app.federated_learning.scheduler import build_scheduler
+    from app.federated_learning.stragglers import build_straggler_handling
+    from app.federated_learning.vectorized import VectorizedFederatedCoordinator
     
     try:
-        # Generate synthetic data
-        data = generate_synthetic_maternal_data(
-            n_samples=config.NUM_SAMPLES_PER_HOSPITAL * config.NUM_HOSPITALS,
-            n_features=config.NUM_FEATURES
-        )
-        
-        # Split data for federated learning
-        hospital_dfs, test_df = split_data_for_federated_learning(
-            data,
-            n_hospitals=config.NUM_HOSPITALS,
-            test_size=config.TEST_SIZE
-        )
-        
-        # Prepare dataloaders
-        hospital_dataloaders, test_dataloader, pos_weight = prepare_dataloaders(
-            hospital_dfs,
-            test_df,
-            batch_size=config.BATCH_SIZE
-        )
+        options = request.get_json(silent=True) or {}
+        streaming = bool(options.get('streaming', config.STREAMING_DATA))
+        vectorized = bool(options.get('vectorized', config.VECTORIZED_SIMULATION))
+        try:
+            async_options = _feature_options(options, 'async', config.ASYNC_AGGREGATION)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid async options: {str(e)}'
+            }), 400
+        try:
+            hierarchical_options = _feature_options(options, 'hierarchical', config.HIERARCHICAL_AGGREGATION)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid hierarchical options: {str(e)}'
+            }), 400
+        federated_eval = bool(options.get('federated_eval', config.FEDERATED_EVALUATION))
+        try:
+            remote_options = _feature_options(options, 'remote', config.NODE_SERVERS or config.NODE_SERVER_PROCESSES)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid remote options: {str(e)}'
+            }), 400
+        straggler_options = options.get('stragglers')
+        if straggler_options is not None and not isinstance(straggler_options, dict):
+            return jsonify({
+                'status': 'error',
+                'message': f"Invalid straggler options: 'stragglers' must be an object, "
+                           f"got {type(straggler_options).__name__}"
+            }), 400
+        samples_per_hospital = int(options.get('samples_per_hospital', config.NUM_SAMPLES_PER_HOSPITAL))
+        n_hospitals = int(options.get('n_hospitals', config.NUM_HOSPITALS))
+        if n_hospitals <= 0:
+            return jsonify({
+                'status': 'error',
+                'message': 'n_hospitals must be a positive integer.'
+            }), 400
+        if streaming and vectorized:
+            return jsonify({
+                'status': 'error',
+                'message': 'Vectorized simulation needs in-memory hospital data; it cannot be combined with streaming.'
+            }), 400
+        if async_options is not None and (vectorized or options.get('participation')
+                                          or (straggler_options or {}).get('deadline') is not None):
+            return jsonify({
+                'status': 'error',
+                'message': 'Async aggregation has no rounds; it cannot be combined with vectorized simulation, '
+                           'participation sampling or round deadlines.'
+            }), 400
+        if federated_eval and (streaming or vectorized):
+            return jsonify({
+                'status': 'error',
+                'message': 'Federated evaluation needs per-node, in-memory hospitals; '
+                           'it cannot be combined with streaming or vectorized simulation.'
+            }), 400
+        if remote_options is not None and (streaming or vectorized):
+            return jsonify({
+                'status': 'error',
+                'message': 'Remote nodes need in-memory hospital data and per-node training; '
+                           'they cannot be combined with streaming or vectorized simulation.'
+            }), 400
+        if hierarchical_options is not None and (vectorized or async_options is not None):
+            return jsonify({
+                'status': 'error',
+                'message': 'Hierarchical aggregation applies to synchronous per-node rounds only.'
+            }), 400
+        aggregator = None
+        if hierarchical_options is not None:
+            try:
+                aggregator = HierarchicalAggregator(
+                    assign_regions(n_hospitals, hierarchical_options.get('regions', config.AGGREGATION_REGIONS)),
+                    workers=int(hierarchical_options.get('workers', config.AGGREGATION_WORKERS)),
+                    executor=hierarchical_options.get('executor', config.AGGREGATION_EXECUTOR)
+                )
+            except (AttributeError, TypeError, ValueError) as e:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Invalid hierarchical options: {str(e)}'
+                }), 400
+            if aggregator.executor == 'process' and streaming:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Hierarchical aggregation in worker processes hosts hospitals on node servers, '
+                               'which need in-memory data; use executor "thread" with streaming.'
+                }), 400
+            if aggregator.executor == 'process' and remote_options is None:
+                # Regions are reduced on local node server processes
+                remote_options = {'processes': aggregator.workers}
+
+        if streaming:
+            # Generate hospital/test records on the fly, never held in memory
+            total_samples = samples_per_hospital * n_hospitals
+            test_samples = int(total_samples * config.TEST_SIZE)
+            hospital_dataloaders, test_dataloader, stream_stats = make_federated_streams(
+                n_hospitals=n_hospitals,
+                samples_per_hospital=int(samples_per_hospital * (1 - config.TEST_SIZE)),
+                test_samples=test_samples,
+                batch_size=config.BATCH_SIZE,
+                chunk_size=config.STREAM_CHUNK_SIZE
+            )
+            scaling = stream_stats
+            data_stats = {
+                'total_samples': total_samples,
+                'high_risk_percentage': stream_stats['high_risk_percentage'],
+                'test_samples': test_samples,
+                'streaming': True
+            }
+        else:
+            # Generate synthetic data
+            data = generate_synthetic_maternal_data(
+                n_samples=samples_per_hospital * n_hospitals,
+                n_features=config.NUM_FEATURES
+            )
+            
+            # Split data for federated learning into one contiguous matrix
+            features, labels, ranges = split_frame_to_matrix(
+                data,
+                n_hospitals=n_hospitals,
+                test_size=config.TEST_SIZE
+            )
+            data_stats = {
+                'total_samples': len(data),
+                'high_risk_percentage': (data['high_risk'].sum() / len(data)) * 100,
+                'test_samples': ranges[-1][1] - ranges[-1][0]
+            }
+            del data
+            
+            # Prepare dataloaders (views over the normalized matrix)
+            hospital_dataloaders, test_dataloader, scaling = prepare_matrix_dataloaders(
+                features,
+                labels,
+                ranges,
+                batch_size=config.BATCH_SIZE
+            )
+
+        eval_dataloaders = [None] * len(hospital_dataloaders)
+        if federated_eval:
+            # Every hospital keeps a local hold-out split; the central test set goes unused
+            try:
+                holdout = float(options.get('eval_holdout', config.EVAL_HOLDOUT))
+            except (TypeError, ValueError):
+                holdout = -1.0
+            if not 0 < holdout < 1:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'eval_holdout must be a fraction between 0 and 1.'
+                }), 400
+            splits = [split_holdout(dl, holdout, config.BATCH_SIZE) for dl in hospital_dataloaders]
+            hospital_dataloaders = [train for train, _ in splits]
+            eval_dataloaders = [held_out for _, held_out in splits]
+            test_dataloader = None
+            data_stats['test_samples'] = sum(len(dl.dataset) for dl in eval_dataloaders)
+            data_stats['federated_eval'] = True
+
+        try:
+            scheduler = build_scheduler(
+                [num_samples(dl.dataset) for dl in hospital_dataloaders],
+                options.get('participation'),
+                config
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid participation options: {str(e)}'
+            }), 400
+        try:
+            if async_options is not None:
+                # Async mode always runs on simulated node latency
+                straggler_options = dict(straggler_options or {})
+                straggler_options.setdefault('latency', {})
+            latency_model, deadline = build_straggler_handling(
+                len(hospital_dataloaders),
+                straggler_options,
+                config
+            )
+        except (AttributeError, TypeError, ValueError) as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid straggler options: {str(e)}'
+            }), 400
+        try:
+            compression = build_compressor(options.get('compression'), config)
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid compression options: {str(e)}'
+            }), 400
+        if vectorized and compression is not None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Update compression needs per-node hospitals; it cannot be combined with vectorized simulation.'
+            }), 400
+        try:
+            privacy = build_privacy(options.get('privacy'), config)
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid privacy options: {str(e)}'
+            }), 400
+        if privacy is not None and (streaming or vectorized):
+            return jsonify({
+                'status': 'error',
+                'message': 'DP-SGD needs per-node hospitals with in-memory data (Poisson sampling); '
+                           'it cannot be combined with streaming or vectorized simulation.'
+            }), 400
+        if vectorized and deadline is not None and latency_model is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Round deadlines in vectorized simulation need simulated latency (stragglers.latency).'
+            }), 400
+
+        if vectorized:
+            # Every hospital trained at once in one stacked model
+            coordinator = VectorizedFederatedCoordinator(
+                [(dl.dataset.features, dl.dataset.labels) for dl in hospital_dataloaders],
+                test_dataloader,
+                config,
+                pos_weight=scaling['pos_weight'],
+                feat_mean=scaling['feat_mean'],
+                feat_std=scaling['feat_std'],
+                scheduler=scheduler,
+                latency_model=latency_model,
+                deadline=deadline
+            )
+            return jsonify({
+                'status': 'success',
+                'message': f'Federated learning initialized with {n_hospitals} hospitals (vectorized simulation)',
+                'data_stats': data_stats
+            })
 
         # Create hospital nodes
         hospital_nodes = []
-        for i, dataloader in enumerate(hospital_dataloaders):
-            hospital = HospitalNode(
-                node_id=i,
-                dataloader=dataloader,
-                device=config.DEVICE,
-                config=config,
-                pos_weight=pos_weight
-            )
-            hospital_nodes.append(hospital)
+        if remote_options is not None:
+            # Each hospital lives in a node server process; its shard is shipped once
+            addresses = remote_options.get('servers') or config.NODE_SERVERS
+            if not addresses:
+                addresses = get_local_cluster(
+                    int(remote_options.get('processes', config.NODE_SERVER_PROCESSES) or 1)
+                )
+            if aggregator is not None and aggregator.executor == 'process':
+                # Each region's hospitals share a server, which reduces the region
+                node_addresses = aggregator.placement(addresses)
+            else:
+                node_addresses = {i: addresses[i % len(addresses)] for i in range(len(hospital_dataloaders))}
+            for i, (dataloader, eval_dataloader) in enumerate(zip(hospital_dataloaders, eval_dataloaders)):
+                hospital_nodes.append(RemoteHospitalNode(i, node_addresses[i]).setup(
+                    dataloader.dataset.features.numpy(),
+                    dataloader.dataset.labels.numpy(),
+                    pos_weight=scaling['pos_weight'],
+                    compression=compression,
+                    privacy=privacy,
+                    eval_features=eval_dataloader.dataset.features.numpy() if eval_dataloader else None,
+                    eval_labels=eval_dataloader.dataset.labels.numpy() if eval_dataloader else None
+                ))
+        else:
+            for i, (dataloader, eval_dataloader) in enumerate(zip(hospital_dataloaders, eval_dataloaders)):
+                hospital = HospitalNode(
+                    node_id=i,
+                    dataloader=dataloader,
+                    device=config.DEVICE,
+                    config=config,
+                    pos_weight=scaling['pos_weight'],
+                    compressor=UpdateCompressor(**compression) if compression is not None else None,
+                    eval_dataloader=eval_dataloader,
+                    privacy=PrivacyAccountant(i, **privacy) if privacy is not None else None
+                )
+                hospital_nodes.append(hospital)
+        
+        if async_options is not None:
+            try:
+                max_staleness = async_options.get('max_staleness', config.ASYNC_MAX_STALENESS)
+                coordinator = AsyncFederatedCoordinator(
+                    hospital_nodes,
+                    test_dataloader,
+                    config,
+                    latency_model,
+                    feat_mean=scaling['feat_mean'],
+                    feat_std=scaling['feat_std'],
+                    buffer_size=int(async_options.get('buffer_size', config.ASYNC_BUFFER_SIZE)),
+                    server_lr=float(async_options.get('server_lr', config.ASYNC_SERVER_LR)),
+                    staleness_exponent=float(async_options.get('staleness_exponent', config.ASYNC_STALENESS_EXPONENT)),
+                    max_staleness=int(max_staleness) if max_staleness is not None else None,
+                    federated_eval=federated_eval
+                )
+            except (AttributeError, TypeError, ValueError) as e:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Invalid async options: {str(e)}'
+                }), 400
+            return jsonify({
+                'status': 'success',
+                'message': f'Federated learning initialized with {n_hospitals} hospitals (async buffered aggregation)',
+                'data_stats': data_stats
+            })
         
         # Create coordinator
         coordinator = FederatedLearningCoordinator(
             hospital_nodes,
             test_dataloader,
-            config
+            config,
+            feat_mean=scaling['feat_mean'],
+            feat_std=scaling['feat_std'],
+            scheduler=scheduler,
+            latency_model=latency_model,
+            deadline=deadline,
+            aggregator=aggregator,
+            node_workers=len(hospital_nodes) if remote_options is not None else 1,
+            federated_eval=federated_eval
         )
         
         return jsonify({
             'status': 'success',
-            'message': f'Federated learning initialized with {config.NUM_HOSPITALS} hospitals',
-            'data_stats': {
-                'total_samples': len(data),
-                'high_risk_percentage': (data['high_risk'].sum() / len(data)) * 100,
-                'test_samples': len(test_df)
-            }
+            'message': f'Federated learning initialized with {n_hospitals} hospitals',
+            'data_stats': data_stats
         })
         
     except Exception as e:
@@ -1141,6 +1496,8 @@ def initialize_federated_learning():
 def train_federated_model():
     """Run federated training for specified number of rounds"""
     global coordinator
+    from app.federated_learning.convergence import build_convergence
+    from app.federated_learning.privacy import PrivacyBudgetExceeded
     
     if coordinator is None:
         return jsonify({
@@ -1164,17 +1521,54 @@ def train_federated_model():
                 'message': 'Rounds must be a positive integer.'
             }), 400
         
+        target_auc = data.get('target_auc')
+        if target_auc is not None:
+            try:
+                target_auc = float(target_auc)
+            except (TypeError, ValueError):
+                return jsonify({
+                    'status': 'error',
+                    'message': 'target_auc must be a number.'
+                }), 400
+        
+        try:
+            schedule, monitor = build_convergence(data, config)
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid evaluation/early stopping options: {str(e)}'
+            }), 400
+        
         # Run federated training
-        history = coordinator.run_federated_training(rounds)
-        model_info = save_model_version(coordinator.global_model)
+        history = coordinator.run_federated_training(rounds, schedule=schedule, monitor=monitor)
+        model_info = save_model_version(
+            coordinator.global_model,
+            feat_mean=coordinator.feat_mean,
+            feat_std=coordinator.feat_std,
+            test_dataloader=coordinator.test_dataloader
+        )
         
         return jsonify({
             'status': 'success',
-            'message': f'Completed {rounds} federated learning rounds',
+            'message': f'Completed {coordinator.run_stats["rounds_run"]} of {rounds} federated learning rounds'
+                       + (f' (stopped: {coordinator.stop_reason})' if coordinator.stop_reason else ''),
             'history': history,
-            'model_version': model_info['version']
+            'model_version': model_info['version'],
+            'quantization_report': model_info['quantization_report'],
+            'participation': coordinator.participation_stats(),
+            'round_timing': coordinator.timing_stats(),
+            'transport': coordinator.transport_stats(),
+            'privacy': coordinator.privacy_stats(),
+            'time_to_target_auc': coordinator.time_to_auc(target_auc) if target_auc is not None else None,
+            'convergence': coordinator.run_stats
         })
         
+    except PrivacyBudgetExceeded as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Privacy budget exhausted: {str(e)}',
+            'privacy': coordinator.privacy_stats()
+        }), 409
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -1208,18 +1602,37 @@ def evaluate_model():
 
 @api_bp.route('/api/predict', methods=['POST'])
 def predict_risk():
-    """Predict maternal health risk for a patient"""
+    """Predict maternal health risk for a patient or a batch of patients"""
     global coordinator
     global prediction_count
     
-    if coordinator is None:
+    # Serve from the newest exported artifact ("backend" per request, else
+    # config.INFERENCE_BACKEND); fall back to the in-memory model when
+    # nothing has been saved yet (or the saved artifact cannot be loaded)
+    data = request.get_json(silent=True) or {}
+    backend = data.get('backend') or config.INFERENCE_BACKEND
+    if backend not in INFERENCE_BACKENDS:
+        return jsonify({
+            'status': 'error',
+            'message': f"backend must be one of: {', '.join(INFERENCE_BACKENDS)}"
+        }), 400
+    try:
+        predictor, model_version = get_latest_predictor(backend)
+    except Exception as e:
+        if coordinator is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'Failed to load the {backend} inference model: {str(e)}'
+            }), 500
+        logger.warning(f"Failed to load the {backend} inference model, serving the in-memory model: {e}")
+        predictor, model_version = None, None
+    if predictor is None and coordinator is None:
         return jsonify({
             'status': 'error',
             'message': 'No model available for prediction'
         }), 400
     
     try:
-        data = request.get_json(silent=True) or {}
         patient_data = data.get('patient_data')
 
         if patient_data is None:
@@ -1233,28 +1646,49 @@ def predict_risk():
                 'message': 'patient_data must be a list of features.'
             }), 400
         
-        if len(patient_data) != config.NUM_FEATURES:
+        # One patient (list of features) or a batch (list of feature lists),
+        # scored in a single vectorized pass
+        try:
+            features = np.asarray(patient_data, dtype=np.float32)
+        except (TypeError, ValueError):
             return jsonify({
                 'status': 'error',
-                'message': f'Expected {config.NUM_FEATURES} features, got {len(patient_data)}'
+                'message': 'patient_data must contain numbers (one list of features, or a list of feature lists).'
+            }), 400
+        single = features.ndim == 1
+        features = features.reshape(1, -1) if single else features
+        if features.ndim != 2 or features.shape[1] != config.NUM_FEATURES:
+            got = features.shape[1] if features.ndim == 2 else features.shape
+            return jsonify({
+                'status': 'error',
+                'message': f'Expected {config.NUM_FEATURES} features, got {got}'
+            }), 400
+        if len(features) > config.MAX_PREDICT_BATCH:
+            return jsonify({
+                'status': 'error',
+                'message': f'At most {config.MAX_PREDICT_BATCH} patients per request.'
             }), 400
         
-        # Convert to tensor
-        features = torch.tensor([patient_data], dtype=torch.float32).to(config.DEVICE)
-        
-        # Make prediction
-        coordinator.global_model.eval()
-        with torch.no_grad():
-            logits = coordinator.global_model(features)
-            risk_score = torch.sigmoid(logits).item()
-        risk_category = 'High Risk' if risk_score > 0.5 else 'Low Risk'
-        record_prediction(risk_score, risk_category)
+        if predictor is not None:
+            risk_scores = predictor.predict(features)
+        else:
+            risk_scores = predict_in_memory(
+                coordinator.global_model, features, coordinator.feat_mean, coordinator.feat_std, config.DEVICE
+            )
+        risk_scores = [float(score) for score in risk_scores]
+        risk_categories = ['High Risk' if score > 0.5 else 'Low Risk' for score in risk_scores]
+        record_predictions(list(zip(risk_scores, risk_categories)))
         
-        return jsonify({
+        result = {
             'status': 'success',
-            'risk_score': risk_score,
-            'risk_category': risk_category
-        })
+            'model_version': model_version,
+            'backend': backend if predictor is not None else 'in_memory'
+        }
+        if single:
+            result.update(risk_score=risk_scores[0], risk_category=risk_categories[0])
+        else:
+            result.update(risk_scores=risk_scores, risk_categories=risk_categories)
+        return jsonify(result)
         
     except Exception as e:
         return jsonify({
@@ -1270,3 +1704,11 @@ def get_training_history():
         'status': 'success',
         'history': history
     })
+
+@api_bp.route('/api/privacy', methods=['GET'])
+def get_privacy_budgets():
+    """Cumulative DP-SGD epsilon spent by each hospital"""
+    return jsonify({
+        'status': 'success',
+        'hospitals': list_privacy_accountants()
+    })
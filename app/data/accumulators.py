@@ -0,0 +1,193 @@
+import numpy as np
+import json
+import os
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RunningStats:
+    """
+    Mergeable sufficient statistics for one feature: count, mean, M2 and
+    min/max (Chan et al. parallel update), plus an optional fixed-bin
+    histogram that serves as a mergeable quantile sketch.
+    """
+
+    def __init__(self, hist_range: Optional[Tuple[float, float]] = None, bins: int = 200):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.hist_range = tuple(hist_range) if hist_range is not None else None
+        self.hist = np.zeros(bins, dtype=np.int64) if hist_range is not None else None
+
+    @property
+    def variance(self) -> float:
+        """Population variance (matches scipy.stats.norm.fit)."""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+    def update(self, values) -> 'RunningStats':
+        """Folds a chunk of values in; NaNs are ignored."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+
+        chunk = RunningStats(self.hist_range, len(self.hist) if self.hist is not None else 200)
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        if chunk.hist is not None:
+            lo, hi = chunk.hist_range
+            # Out-of-range values are clipped into the edge bins
+            chunk.hist += np.histogram(np.clip(values, lo, hi), bins=len(chunk.hist), range=(lo, hi))[0]
+        return self.merge(chunk)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """Combines another accumulator into this one (in place)."""
+        if other.count == 0:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self.hist is not None and other.hist is not None and self.hist_range == other.hist_range:
+            self.hist += other.hist
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile from the histogram sketch (None without one)."""
+        if self.hist is None or self.hist.sum() == 0:
+            return None
+        lo, hi = self.hist_range
+        edges = np.linspace(lo, hi, len(self.hist) + 1)
+        cdf = np.concatenate([[0], np.cumsum(self.hist)]) / self.hist.sum()
+        return float(np.clip(np.interp(q, cdf, edges), self.min, self.max))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'hist_range': list(self.hist_range) if self.hist_range is not None else None,
+            'hist': self.hist.tolist() if self.hist is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RunningStats':
+        hist = data.get('hist')
+        stats = cls(data.get('hist_range'), len(hist) if hist else 200)
+        stats.count = int(data['count'])
+        stats.mean = float(data['mean'])
+        stats.m2 = float(data['m2'])
+        stats.min = float(data['min']) if data.get('min') is not None else float('inf')
+        stats.max = float(data['max']) if data.get('max') is not None else float('-inf')
+        if hist is not None:
+            stats.hist = np.asarray(hist, dtype=np.int64)
+        return stats
+
+
+class SufficientStatistics:
+    """
+    Per-source feature accumulators, persisted as JSON next to
+    calibration_params.json. Each ingested file (keyed by year and absolute
+    path) is kept separately with its size/mtime fingerprint in `meta`:
+    re-runs skip unchanged files, a changed file replaces its entry, and the
+    merged view spans every file and year exactly once.
+    """
+
+    def __init__(self, sources: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.sources = sources or {}
+
+    @staticmethod
+    def source_key(file_path: str, year: int) -> str:
+        return f"{year}:{os.path.abspath(file_path)}"
+
+    @staticmethod
+    def file_fingerprint(file_path: str) -> Dict[str, int]:
+        st = os.stat(file_path)
+        return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    def is_current(self, key: str, fingerprint: Dict[str, int]) -> bool:
+        """True if `key` was ingested from a file with this size and mtime."""
+        source = self.sources.get(key)
+        return source is not None and all(source['meta'].get(k) == v for k, v in fingerprint.items())
+
+    def add_source(self, key: str, features: Dict[str, RunningStats], **meta):
+        """Adds a source, replacing any earlier entry for the same file and year."""
+        if key in self.sources:
+            logger.info(f"Replacing natality statistics for changed source {key}")
+        self.sources[key] = {'meta': meta, 'features': features}
+
+    def prune_missing(self) -> int:
+        """Drops sources whose file no longer exists; returns how many were removed."""
+        missing = [key for key, source in self.sources.items()
+                   if source['meta'].get('path') and not os.path.exists(source['meta']['path'])]
+        for key in missing:
+            logger.info(f"Dropping natality statistics for deleted source {key}")
+            del self.sources[key]
+        return len(missing)
+
+    def fingerprints(self):
+        """(key, size, mtime) of every source, for cache keys that must change with the data."""
+        return sorted(
+            [key, source['meta'].get('size'), source['meta'].get('mtime_ns')]
+            for key, source in self.sources.items()
+        )
+
+    def merged(self) -> Dict[str, RunningStats]:
+        """Feature accumulators merged over every ingested source."""
+        total: Dict[str, RunningStats] = {}
+        for source in self.sources.values():
+            for feat, stats in source['features'].items():
+                if feat not in total:
+                    total[feat] = RunningStats(stats.hist_range, len(stats.hist) if stats.hist is not None else 200)
+                total[feat].merge(stats)
+        return total
+
+    def save(self, path: str):
+        data = {
+            key: {
+                'meta': source['meta'],
+                'features': {feat: stats.to_dict() for feat, stats in source['features'].items()}
+            }
+            for key, source in self.sources.items()
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Calibration statistics saved to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'SufficientStatistics':
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r') as f:
+            data = json.load(f)
+        sources = {}
+        for key, source in data.items():
+            meta = source.get('meta', {})
+            if meta.get('path') and 'year' in meta:
+                # Older files keyed sources by name/size/mtime; re-key by path. Their
+                # meta has no fingerprint, so the file is re-ingested once and replaced.
+                key = cls.source_key(meta['path'], meta['year'])
+            sources[key] = {
+                'meta': meta,
+                'features': {feat: RunningStats.from_dict(s) for feat, s in source['features'].items()}
+            }
+        return cls(sources)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import threading
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALIBRATION_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'config', 'calibration_params.json'
+)
+
+
+class FeatureDistribution(BaseModel):
+    """Validated distribution parameters for one calibrated feature."""
+    name: str
+    dist: str = 'norm'
+    mu: Optional[float] = None
+    std: Optional[float] = None
+    bounds: Optional[Tuple[float, float]] = None
+    p: Optional[float] = None
+    source: Optional[str] = None
+    # Standardized truncation bounds, precomputed for truncnorm
+    a: Optional[float] = None
+    b: Optional[float] = None
+
+    @classmethod
+    def from_params(cls, name: str, params: Dict[str, Any]) -> 'FeatureDistribution':
+        dist = params.get('dist', 'norm')
+        if dist == 'bernoulli':
+            p = float(params['p'])
+            if not 0.0 <= p <= 1.0:
+                raise ValueError(f"{name}: bernoulli p must be in [0, 1], got {p}")
+            return cls(name=name, dist=dist, p=p, source=params.get('source'))
+
+        if dist not in ('norm', 'truncnorm'):
+            raise ValueError(f"{name}: unsupported distribution '{dist}'")
+        mu, std = float(params['mu']), float(params['std'])
+        if not std > 0:
+            raise ValueError(f"{name}: std must be positive, got {std}")
+        if dist == 'norm':
+            return cls(name=name, dist=dist, mu=mu, std=std, source=params.get('source'))
+
+        lo, hi = (float(v) for v in params['bounds'])
+        if not lo < hi:
+            raise ValueError(f"{name}: invalid bounds {params['bounds']}")
+        return cls(
+            name=name, dist=dist, mu=mu, std=std, bounds=(lo, hi), source=params.get('source'),
+            a=(lo - mu) / std, b=(hi - mu) / std
+        )
+
+
+class CalibrationParams(BaseModel):
+    """Parsed calibration_params.json plus the file state it was read from."""
+    features: Dict[str, FeatureDistribution]
+    correlations: Dict[str, float]
+    raw: Dict[str, Any]
+    path: Optional[str] = None
+    mtime: Optional[float] = None
+    sha256: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any], **file_state) -> 'CalibrationParams':
+        features = {
+            name: FeatureDistribution.from_params(name, params)
+            for name, params in raw.items()
+            if not name.startswith('_') and isinstance(params, dict)
+        }
+        correlations = {k: float(v) for k, v in raw.get('_correlations', {}).items()}
+        return cls(features=features, correlations=correlations, raw=raw, **file_state)
+
+    def get(self, name: str) -> Optional[FeatureDistribution]:
+        return self.features.get(name)
+
+
+class CalibrationRegistry:
+    """
+    Process-wide cache of a calibration_params.json file.
+
+    The file is parsed and validated once; later calls only stat it. When
+    its mtime or size changes the bytes are re-hashed, and the parameters
+    are rebuilt only if the content hash actually differs.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._params: Optional[CalibrationParams] = None
+        self._stat_key = None
+
+    def get(self) -> CalibrationParams:
+        """Returns the current parameters; raises FileNotFoundError if absent."""
+        st = os.stat(self.path)
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if self._params is not None and stat_key == self._stat_key:
+            return self._params
+
+        with self._lock:
+            if self._params is not None and stat_key == self._stat_key:
+                return self._params
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha256(content).hexdigest()
+            if self._params is None or digest != self._params.sha256:
+                logger.info(f"Loading calibration parameters from {self.path}")
+                self._params = CalibrationParams.from_dict(
+                    json.loads(content), path=self.path, mtime=st.st_mtime, sha256=digest
+                )
+            else:
+                self._params.mtime = st.st_mtime
+            self._stat_key = stat_key
+            return self._params
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def metadata(self) -> Dict[str, Any]:
+        """Status summary served to the dashboard, from the cached parse."""
+        if not self.exists():
+            return {"status": "never_run"}
+        params = self.get()
+        return {
+            "status": "success",
+            "last_updated": params.mtime,
+            "features": list(params.raw.keys()),
+            "sha256": params.sha256
+        }
+
+
+_registries: Dict[str, CalibrationRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_calibration_registry(path: Optional[str] = None) -> CalibrationRegistry:
+    """Returns the shared registry for `path` (default: config/calibration_params.json)."""
+    key = os.path.abspath(path or DEFAULT_CALIBRATION_PATH)
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = CalibrationRegistry(key)
+        return _registries[key]
@@ -1,11 +1,12 @@
 import pandas as pd
 import numpy as np
-import scipy.stats as stats
 import json
 import os
 import logging
 from typing import Dict, Any, List, Optional
 
+from app.data.accumulators import RunningStats, SufficientStatistics
+
 logger = logging.getLogger(__name__)
 
 class CalibrateSyntheticData:
@@ -38,22 +39,36 @@ class CalibrateSyntheticData:
         'thyroidTSH': {'mean': 1.5, 'std': 0.8, 'bounds': (0.1, 10.0)}
     }
 
-    def __init__(self, output_path: str = "./config/calibration_params.json"):
+    # Natality features fitted from microdata, with histogram sketch ranges
+    NATALITY_FEATURES = {
+        'age': (10, 60),
+        'bmi': (10, 80),
+        'gestationalAge': (17, 48),
+        'previousPregnancies': (0, 20),
+    }
+
+    def __init__(self, output_path: str = "./config/calibration_params.json", stats_path: Optional[str] = None):
         self.output_path = output_path
+        self.stats_path = stats_path or os.path.join(os.path.dirname(output_path), "calibration_stats.json")
         self.params = {}
         self.report = {}
 
     def run_calibration(self, 
                        natality_df: Optional[pd.DataFrame] = None, 
                        cdc_data: Optional[Dict[str, Any]] = None,
-                       ahr_data: Optional[Dict[str, Any]] = None):
+                       ahr_data: Optional[Dict[str, Any]] = None,
+                       natality_stats: Optional[SufficientStatistics] = None):
         """
         Fits distributions and saves parameters.
+        `natality_stats` (see `update_natality_stats`) fits from accumulated
+        sufficient statistics instead of an in-memory DataFrame.
         """
         logger.info("Starting data calibration...")
         
         # 1. Calibrate from Real Microdata (NCHS)
-        if natality_df is not None:
+        if natality_stats is not None:
+            self._calibrate_from_stats(natality_stats.merged())
+        elif natality_df is not None:
             self._calibrate_from_natality(natality_df)
             
         # 2. Integrate CDC WONDER & AHR Prevalence Rates
@@ -70,23 +85,61 @@ class CalibrateSyntheticData:
 
         # 5. Save and Export
         self._save_params()
-        self._generate_report(natality_df)
+        self._generate_report(natality_df, natality_stats)
         
         return self.report
 
+    def load_stats(self) -> SufficientStatistics:
+        return SufficientStatistics.load(self.stats_path)
+
+    def update_natality_stats(self, loader, chunksize: int = 250000,
+                              natality_stats: Optional[SufficientStatistics] = None) -> SufficientStatistics:
+        """
+        Streams a natality file chunk by chunk into per-feature accumulators
+        and persists them. Files already ingested (same path, year, size and
+        mtime) are skipped, so a new data drop only costs the new file; a
+        changed file replaces its earlier statistics.
+        """
+        natality_stats = natality_stats if natality_stats is not None else self.load_stats()
+        key = SufficientStatistics.source_key(loader.file_path, loader.year)
+        fingerprint = SufficientStatistics.file_fingerprint(loader.file_path)
+        if natality_stats.is_current(key, fingerprint):
+            logger.info(f"Natality statistics for {loader.file_path} are up to date.")
+            return natality_stats
+
+        logger.info(f"Accumulating natality statistics from {loader.file_path}")
+        accumulators = {feat: RunningStats(hist_range) for feat, hist_range in self.NATALITY_FEATURES.items()}
+        for chunk in loader.iter_features(chunksize):
+            for feat, acc in accumulators.items():
+                acc.update(chunk[feat].to_numpy(dtype=np.float64))
+
+        natality_stats.add_source(key, accumulators, path=os.path.abspath(loader.file_path), year=loader.year,
+                                  **fingerprint)
+        natality_stats.save(self.stats_path)
+        return natality_stats
+
     def _calibrate_from_natality(self, df: pd.DataFrame):
-        features = ['age', 'bmi', 'gestationalAge', 'previousPregnancies']
-        for feat in features:
+        accumulators = {}
+        for feat, hist_range in self.NATALITY_FEATURES.items():
             if feat in df.columns:
-                valid_data = df[feat].dropna()
-                if not valid_data.empty:
-                    mu, std = stats.norm.fit(valid_data)
-                    self.params[feat] = {
-                        'dist': 'norm',
-                        'mu': float(mu),
-                        'std': float(std),
-                        'source': 'NCHS Natality'
-                    }
+                accumulators[feat] = RunningStats(hist_range).update(df[feat].to_numpy(dtype=np.float64))
+        self._calibrate_from_stats(accumulators)
+
+    def _calibrate_from_stats(self, accumulators: Dict[str, RunningStats]):
+        """Normal fit (MLE mean/std) from sufficient statistics."""
+        for feat, acc in accumulators.items():
+            if acc.count > 0:
+                self.params[feat] = {
+                    'dist': 'norm',
+                    'mu': float(acc.mean),
+                    'std': acc.std,
+                    'n': acc.count,
+                    'range': [acc.min, acc.max],
+                    'source': 'NCHS Natality'
+                }
+                p05, p95 = acc.quantile(0.05), acc.quantile(0.95)
+                if p05 is not None:
+                    self.params[feat]['quantiles'] = {'p05': p05, 'p50': acc.quantile(0.5), 'p95': p95}
 
     def _integrate_cdc_prevalence(self, cdc_data: Dict[str, Any]):
         # Example: Adjusting risk factors like diabetes/hypertension
@@ -132,7 +185,8 @@ class CalibrateSyntheticData:
             json.dump(self.params, f, indent=4)
         logger.info(f"Calibration parameters saved to {self.output_path}")
 
-    def _generate_report(self, natality_df: Optional[pd.DataFrame]):
+    def _generate_report(self, natality_df: Optional[pd.DataFrame],
+                         natality_stats: Optional[SufficientStatistics] = None):
         self.report = {
             "summary": "Calibration complete",
             "features_calibrated": list(self.params.keys()),
@@ -141,3 +195,7 @@ class CalibrateSyntheticData:
         # Add comparisons if natality_df is available
         if natality_df is not None:
             self.report["natality_samples"] = len(natality_df)
+        if natality_stats is not None:
+            merged = natality_stats.merged()
+            self.report["natality_samples"] = max((acc.count for acc in merged.values()), default=0)
+            self.report["natality_sources"] = len(natality_stats.sources)
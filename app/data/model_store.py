@@ -0,0 +1,299 @@
+import hashlib
+import io
+import json
+import os
+import zlib
+import logging
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.data.storage import _get_connection
+from config import config
+
+logger = logging.getLogger(__name__)
+
+STORE_PREFIX = "modelstore://"
+
+
+def tensor_sha(array: np.ndarray) -> str:
+    """Content hash of a tensor: dtype, shape and raw bytes."""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _shuffle(raw: bytes, itemsize: int) -> bytes:
+    """Groups byte k of every element together; exponents/high bits then compress well."""
+    return np.frombuffer(raw, dtype=np.uint8).reshape(-1, itemsize).T.tobytes()
+
+
+def _unshuffle(data: bytes, itemsize: int) -> bytes:
+    return np.frombuffer(data, dtype=np.uint8).reshape(itemsize, -1).T.tobytes()
+
+
+class ModelStore:
+    """
+    Content-addressed, compressed storage for model state_dicts.
+
+    Each tensor is stored once under the hash of its content, so identical
+    tensors (and identical versions) are deduplicated. Every
+    KEYFRAME_INTERVAL versions is a keyframe whose tensors are stored whole;
+    the versions in between store each changed tensor as the XOR of its
+    float bits against the keyframe's tensor, byte-shuffled and
+    zlib-compressed. Reading any version touches at most its own objects and
+    the keyframe's, never the intermediate versions.
+    """
+
+    def __init__(self, root: Optional[str] = None, keyframe_interval: Optional[int] = None):
+        self.root = root or os.path.join(config.MODEL_DIR, "objects")
+        self.keyframe_interval = keyframe_interval or config.MODEL_STORE_KEYFRAME_INTERVAL
+
+    # --------------------------------------------------------------- objects
+
+    def _object_path(self, sha: str) -> str:
+        return os.path.join(self.root, sha[:2], sha + ".z")
+
+    def _write_object(self, sha: str, payload: bytes):
+        path = self._object_path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def _get_object(self, conn, sha: str):
+        return conn.execute(
+            """
+            SELECT sha, dtype, shape, encoding, base_sha
+            FROM model_objects
+            WHERE sha = ?
+            """,
+            (sha,),
+        ).fetchone()
+
+    def put_tensor(self, conn, array: np.ndarray, staged: Dict[str, bytes], base_sha: Optional[str] = None) -> str:
+        """
+        Records `array` (as a delta against `base_sha` when that is smaller)
+        and returns its content hash. Without a base the object is stored
+        whole, so keyframe tensors can always serve as delta bases. The
+        payload goes into `staged` ({sha: bytes}); the caller writes it
+        once the transaction has committed.
+        """
+        array = np.ascontiguousarray(array)
+        sha = tensor_sha(array)
+        existing = self._get_object(conn, sha)
+        if existing is not None and (base_sha is not None or existing["encoding"] == "full"):
+            return sha
+
+        raw = array.tobytes()
+        itemsize = array.dtype.itemsize
+        payload = zlib.compress(_shuffle(raw, itemsize))
+        encoding, delta_base = "full", None
+        if base_sha is not None and base_sha != sha:
+            base = self.read_tensor(conn, base_sha)
+            if base.shape == array.shape and base.dtype == array.dtype:
+                xor = np.bitwise_xor(array.view(f"u{itemsize}"), base.view(f"u{itemsize}"))
+                delta = zlib.compress(_shuffle(xor.tobytes(), itemsize))
+                if len(delta) < len(payload):
+                    payload, encoding, delta_base = delta, "xor", base_sha
+
+        staged[sha] = payload
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO model_objects (sha, dtype, shape, encoding, base_sha, stored_bytes, raw_bytes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (sha, array.dtype.str, json.dumps(list(array.shape)), encoding, delta_base, len(payload), len(raw)),
+        )
+        return sha
+
+    def read_tensor(self, conn, sha: str) -> np.ndarray:
+        row = self._get_object(conn, sha)
+        if row is None:
+            raise KeyError(f"Model store object {sha} not found")
+        dtype = np.dtype(row["dtype"])
+        shape = tuple(json.loads(row["shape"]))
+        with open(self._object_path(sha), "rb") as f:
+            raw = _unshuffle(zlib.decompress(f.read()), dtype.itemsize)
+        array = np.frombuffer(raw, dtype=dtype).reshape(shape)
+        if row["encoding"] == "xor":
+            base = self.read_tensor(conn, row["base_sha"])
+            bits = f"u{dtype.itemsize}"
+            array = np.bitwise_xor(array.view(bits), base.view(bits)).view(dtype)
+        return array.copy()
+
+    # -------------------------------------------------------------- versions
+
+    def _version_tensors(self, conn, version: int) -> List[tuple]:
+        rows = conn.execute(
+            """
+            SELECT name, sha
+            FROM model_version_tensors
+            WHERE version = ?
+            ORDER BY position
+            """,
+            (version,),
+        ).fetchall()
+        return [(row["name"], row["sha"]) for row in rows]
+
+    def _keyframe_for(self, conn, version: int) -> Optional[int]:
+        """Keyframe the new `version` should delta against, or None to start a new one."""
+        row = conn.execute(
+            """
+            SELECT version, base_version
+            FROM model_versions
+            WHERE version < ? AND path LIKE ?
+            ORDER BY version DESC
+            LIMIT 1
+            """,
+            (version, STORE_PREFIX + "%"),
+        ).fetchone()
+        if row is None:
+            return None
+        keyframe = row["base_version"] if row["base_version"] is not None else row["version"]
+        if version - keyframe >= self.keyframe_interval:
+            return None
+        return keyframe
+
+    def put_version(self, version: int, state: Dict[str, np.ndarray]) -> Dict[str, object]:
+        """
+        Stores a state_dict (name -> array) for an allocated version and
+        returns {'path', 'base_version', 'stored_bytes'}; `path` is the
+        content address recorded in model_versions. Object files are
+        written only after the rows commit, so a failed put leaves neither.
+        """
+        staged = {}
+        with _get_connection() as conn:
+            keyframe = self._keyframe_for(conn, version)
+            base = dict(self._version_tensors(conn, keyframe)) if keyframe is not None else {}
+            if not base:
+                keyframe = None  # first version, interval reached, or keyframe removed by GC
+            before = conn.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM model_objects").fetchone()[0]
+
+            manifest = hashlib.sha256()
+            for position, (name, array) in enumerate(state.items()):
+                sha = self.put_tensor(conn, np.asarray(array), staged, base.get(name))
+                manifest.update(f"{name}:{sha};".encode())
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO model_version_tensors (version, name, position, sha)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    (version, name, position, sha),
+                )
+            after = conn.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM model_objects").fetchone()[0]
+
+        for sha, payload in staged.items():
+            self._write_object(sha, payload)
+        return {
+            "path": STORE_PREFIX + manifest.hexdigest(),
+            "base_version": keyframe,
+            "stored_bytes": int(after - before),
+        }
+
+    def get_version(self, version: int) -> Dict[str, np.ndarray]:
+        """Reconstructs one version's state_dict from its objects (and its keyframe's)."""
+        with _get_connection() as conn:
+            tensors = self._version_tensors(conn, version)
+            if not tensors:
+                raise KeyError(f"Model version {version} is not in the model store")
+            return {name: self.read_tensor(conn, sha) for name, sha in tensors}
+
+    def iter_state_dict_bytes(self, version: int, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """torch.save-compatible state_dict for `version`, yielded in chunks."""
+        import torch
+
+        buffer = io.BytesIO()
+        torch.save({name: torch.from_numpy(array) for name, array in self.get_version(version).items()}, buffer)
+        view = buffer.getbuffer()
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+
+    # ------------------------------------------------------------ retention
+
+    def gc(self, keep_last: Optional[int] = None) -> Dict[str, int]:
+        """
+        Deletes all but the newest `keep_last` versions (0 keeps everything),
+        their exported artifacts, every object no kept version needs, and
+        object files no row references (left by interrupted writes). Files
+        are removed only after the row deletions commit.
+        """
+        keep_last = config.MODEL_RETENTION if keep_last is None else keep_last
+        removed_versions = []
+        doomed = []
+        with _get_connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT version, path, artifact_path, numpy_path, int8_path
+                FROM model_versions
+                WHERE path != ''
+                ORDER BY version DESC
+                """
+            ).fetchall()
+            for row in rows[keep_last:] if keep_last > 0 else []:
+                for key in ("artifact_path", "numpy_path", "int8_path", "path"):
+                    path = row[key]
+                    if path and not path.startswith(STORE_PREFIX):
+                        doomed.append(path)
+                conn.execute("DELETE FROM model_version_tensors WHERE version = ?", (row["version"],))
+                conn.execute("DELETE FROM model_versions WHERE version = ?", (row["version"],))
+                removed_versions.append(row["version"])
+
+            # Objects still needed: every kept version's tensors and their delta bases
+            live = {row["sha"] for row in conn.execute("SELECT DISTINCT sha FROM model_version_tensors")}
+            live |= {
+                row["base_sha"] for row in conn.execute(
+                    "SELECT sha, base_sha FROM model_objects WHERE base_sha IS NOT NULL"
+                ) if row["sha"] in live
+            }
+            dead = [
+                row["sha"] for row in conn.execute("SELECT sha FROM model_objects")
+                if row["sha"] not in live
+            ]
+            for sha in dead:
+                conn.execute("DELETE FROM model_objects WHERE sha = ?", (sha,))
+                doomed.append(self._object_path(sha))
+
+        # Committed: now the files can go, plus any object file without a row.
+        # Rows are read after listing: put_version writes files only after its
+        # rows commit, so every file listed here that belongs to a version is known.
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".z"):
+                    files[name[:-2]] = os.path.join(directory, name)
+        with _get_connection() as conn:
+            known = {row["sha"] for row in conn.execute("SELECT sha FROM model_objects")}
+        orphans = [path for sha, path in files.items() if sha not in known and sha not in dead]
+        doomed += orphans
+        swept = len(orphans)
+        freed = 0
+        for path in doomed:
+            if os.path.exists(path):
+                freed += os.path.getsize(path)
+                os.remove(path)
+
+        if removed_versions or dead or swept:
+            logger.info(f"Model store GC removed versions {removed_versions}, {len(dead)} objects and "
+                        f"{swept} unreferenced object files ({freed} bytes)")
+        return {"removed_versions": len(removed_versions), "removed_objects": len(dead) + swept,
+                "freed_bytes": freed}
+
+    def stats(self) -> Dict[str, int]:
+        with _get_connection() as conn:
+            row = conn.execute(
+                """
+                SELECT COUNT(*) AS objects,
+                       COALESCE(SUM(stored_bytes), 0) AS stored_bytes,
+                       COALESCE(SUM(raw_bytes), 0) AS raw_bytes,
+                       COALESCE(SUM(encoding = 'xor'), 0) AS delta_objects
+                FROM model_objects
+                """
+            ).fetchone()
+        return dict(row)
+
+
+def get_model_store() -> ModelStore:
+    return ModelStore()
@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+import os
+import logging
+from typing import Dict, Any, List, Tuple, Iterable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Value type accepted by NatalityIndex.block_may_match / loader cohort filters:
+# (lo, hi) inclusive range for numeric fields, or an iterable of allowed codes.
+FieldFilter = Union[Tuple[float, float], Iterable[Any]]
+
+
+def parse_fixed_width(lines: List[bytes], colspecs: Dict[str, Tuple[int, int]]) -> pd.DataFrame:
+    """
+    Slices raw fixed-width records into string columns, matching what
+    `pd.read_fwf(..., dtype=str)` produces (blank fields become NaN).
+    """
+    width = max(end for _, end in colspecs.values())
+    raw = np.array([line[:width] for line in lines], dtype=f'S{width}')
+    matrix = raw.view(np.uint8).reshape(len(lines), width)
+
+    data = {}
+    for name, (start, end) in colspecs.items():
+        field = np.ascontiguousarray(matrix[:, start:end]).view(f'S{end - start}').ravel()
+        values = pd.Series(field).str.decode('ascii', errors='replace').str.strip()
+        data[name] = values.where(values != '', np.nan)
+    return pd.DataFrame(data)
+
+
+class NatalityIndex:
+    """
+    Persistent byte-offset index for an NCHS Natality fixed-width file.
+
+    Records either have a constant length (offset = i * record_length) or
+    their line offsets are stored explicitly. Records are grouped into blocks
+    and each block keeps a bitmask of the categorical codes it contains and
+    the min/max of key numeric fields, so cohort queries can skip blocks that
+    cannot match. The index lives in a sidecar `<file>.idx.npz`.
+    """
+
+    VERSION = 1
+
+    # Raw layout fields summarized per block
+    CATEGORICAL_FIELDS = ['DOB_MM', 'MRACEHISP']   # codes < 64, stored as bitmasks
+    RANGE_FIELDS = ['MAGER', 'BMI', 'OE_GEST']
+
+    def __init__(self, file_path: str, record_count: int, record_length: int,
+                 block_size: int, offsets: Optional[np.ndarray],
+                 masks: Dict[str, np.ndarray], ranges: Dict[str, np.ndarray],
+                 source_size: int, source_mtime: float):
+        self.file_path = file_path
+        self.record_count = record_count
+        self.record_length = record_length
+        self.block_size = block_size
+        self.offsets = offsets
+        self.masks = masks
+        self.ranges = ranges
+        self.source_size = source_size
+        self.source_mtime = source_mtime
+
+    @staticmethod
+    def sidecar_path(file_path: str) -> str:
+        return file_path + '.idx.npz'
+
+    @property
+    def n_blocks(self) -> int:
+        return (self.record_count + self.block_size - 1) // self.block_size
+
+    def is_fresh(self) -> bool:
+        """True if the source file is unchanged since the index was built."""
+        try:
+            st = os.stat(self.file_path)
+        except OSError:
+            return False
+        return st.st_size == self.source_size and st.st_mtime == self.source_mtime
+
+    # ------------------------------------------------------------------ build
+
+    @classmethod
+    def build(cls, file_path: str, colspecs: Dict[str, Tuple[int, int]],
+              block_size: int = 65536) -> 'NatalityIndex':
+        """Scans the file once, recording line offsets and block summaries."""
+        logger.info(f"Building natality index for {file_path} (block size {block_size})")
+        summary_specs = {f: colspecs[f] for f in cls.CATEGORICAL_FIELDS + cls.RANGE_FIELDS if f in colspecs}
+        st = os.stat(file_path)
+
+        offsets = [0]
+        masks = {f: [] for f in cls.CATEGORICAL_FIELDS if f in summary_specs}
+        ranges = {f: [] for f in cls.RANGE_FIELDS if f in summary_specs}
+        block = []
+
+        def summarize(lines):
+            fields = parse_fixed_width(lines, summary_specs)
+            for f in masks:
+                codes = pd.to_numeric(fields[f], errors='coerce').dropna().astype(int)
+                codes = codes[(codes >= 0) & (codes < 64)].unique()
+                masks[f].append(np.bitwise_or.reduce(np.left_shift(np.uint64(1), codes.astype(np.uint64)), initial=np.uint64(0)))
+            for f in ranges:
+                values = pd.to_numeric(fields[f], errors='coerce')
+                ranges[f].append((values.min(), values.max()))
+
+        with open(file_path, 'rb') as fh:
+            for line in fh:
+                offsets.append(offsets[-1] + len(line))
+                block.append(line)
+                if len(block) == block_size:
+                    summarize(block)
+                    block = []
+        if block:
+            summarize(block)
+
+        offsets = np.asarray(offsets, dtype=np.int64)
+        lengths = np.diff(offsets)
+        record_length = int(lengths[0]) if len(lengths) and (lengths == lengths[0]).all() else 0
+
+        index = cls(
+            file_path=file_path,
+            record_count=len(lengths),
+            record_length=record_length,
+            block_size=block_size,
+            offsets=None if record_length else offsets,
+            masks={f: np.asarray(v, dtype=np.uint64) for f, v in masks.items()},
+            ranges={f: np.asarray(v, dtype=np.float64).reshape(-1, 2) for f, v in ranges.items()},
+            source_size=st.st_size,
+            source_mtime=st.st_mtime,
+        )
+        index.save()
+        return index
+
+    # ------------------------------------------------------------ persistence
+
+    def save(self):
+        arrays = {
+            'meta': np.array([self.VERSION, self.record_count, self.record_length,
+                              self.block_size, self.source_size], dtype=np.int64),
+            'source_mtime': np.array([self.source_mtime], dtype=np.float64),
+        }
+        if self.offsets is not None:
+            arrays['offsets'] = self.offsets
+        for f, v in self.masks.items():
+            arrays[f'mask_{f}'] = v
+        for f, v in self.ranges.items():
+            arrays[f'range_{f}'] = v
+
+        path = self.sidecar_path(self.file_path)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp_path, path)
+        logger.info(f"Natality index saved to {path}")
+
+    @classmethod
+    def load(cls, file_path: str) -> Optional['NatalityIndex']:
+        """Loads the sidecar index, or returns None if missing/outdated."""
+        path = cls.sidecar_path(file_path)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            version, record_count, record_length, block_size, source_size = data['meta'].tolist()
+            if version != cls.VERSION:
+                return None
+            index = cls(
+                file_path=file_path,
+                record_count=record_count,
+                record_length=record_length,
+                block_size=block_size,
+                offsets=data['offsets'] if 'offsets' in data else None,
+                masks={k[len('mask_'):]: data[k] for k in data.files if k.startswith('mask_')},
+                ranges={k[len('range_'):]: data[k] for k in data.files if k.startswith('range_')},
+                source_size=source_size,
+                source_mtime=float(data['source_mtime'][0]),
+            )
+        return index if index.is_fresh() else None
+
+    # ----------------------------------------------------------------- access
+
+    def offset(self, record_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (start, length) byte positions for the given record numbers."""
+        record_ids = np.asarray(record_ids, dtype=np.int64)
+        if self.record_length:
+            return record_ids * self.record_length, np.full(len(record_ids), self.record_length)
+        starts = self.offsets[record_ids]
+        return starts, self.offsets[record_ids + 1] - starts
+
+    def block_span(self, block: int) -> Tuple[int, int, int, int]:
+        """Returns (first_record, n_records, byte_start, byte_length) of a block."""
+        first = block * self.block_size
+        count = min(self.block_size, self.record_count - first)
+        if self.record_length:
+            return first, count, first * self.record_length, count * self.record_length
+        start = int(self.offsets[first])
+        return first, count, start, int(self.offsets[first + count]) - start
+
+    def read_records(self, record_ids: Iterable[int]) -> Tuple[List[bytes], np.ndarray]:
+        """Seek-reads individual records (returned in ascending record order)."""
+        record_ids = np.unique(np.asarray(list(record_ids), dtype=np.int64))
+        starts, lengths = self.offset(record_ids)
+        lines = []
+        with open(self.file_path, 'rb') as fh:
+            for start, length in zip(starts.tolist(), lengths.tolist()):
+                fh.seek(start)
+                lines.append(fh.read(length))
+        return lines, record_ids
+
+    def read_block(self, block: int) -> Tuple[List[bytes], np.ndarray]:
+        first, count, start, length = self.block_span(block)
+        with open(self.file_path, 'rb') as fh:
+            fh.seek(start)
+            lines = fh.read(length).splitlines()
+        return lines, np.arange(first, first + count, dtype=np.int64)
+
+    def candidate_blocks(self, filters: Dict[str, FieldFilter]) -> np.ndarray:
+        """Block numbers whose summaries do not rule out every filter."""
+        keep = np.ones(self.n_blocks, dtype=bool)
+        for field, allowed in filters.items():
+            if field in self.ranges and isinstance(allowed, tuple):
+                lo, hi = allowed
+                block_min, block_max = self.ranges[field][:, 0], self.ranges[field][:, 1]
+                # Blocks with no valid values (NaN min/max) can never match a range
+                keep &= (block_max >= lo) & (block_min <= hi)
+            elif field in self.masks and not isinstance(allowed, tuple):
+                wanted = np.uint64(0)
+                for code in allowed:
+                    code = int(code)
+                    if 0 <= code < 64:
+                        wanted |= np.left_shift(np.uint64(1), np.uint64(code))
+                keep &= (self.masks[field] & wanted) != 0
+        return np.flatnonzero(keep)
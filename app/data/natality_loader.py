@@ -2,9 +2,11 @@ import pandas as pd
 import numpy as np
 import os
 import requests
-from typing import Tuple, Dict, Any, List
+from typing import Tuple, Dict, Any, List, Iterator, Optional
 import logging
 
+from app.data.natality_index import NatalityIndex, FieldFilter, parse_fixed_width
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,7 @@ class NatalityMicrodataLoader:
     # So Position 9-12 becomes (8, 12)
     COLUMN_SPECS_2023 = {
         'DOB_YY': (8, 12),
+        'DOB_MM': (12, 14),      # Position 13-14
         'MAGER': (74, 76),
         'MRACEHISP': (116, 117), # Position 117
         'MEDUC': (123, 124),     # Position 124
@@ -54,6 +57,7 @@ class NatalityMicrodataLoader:
         self.file_path = file_path
         self.year = year
         self.colspecs = self.COLUMN_SPECS_2023 if year >= 2022 else self._get_legacy_specs(year)
+        self._index = None
 
     def _get_legacy_specs(self, year: int) -> Dict[str, Tuple[int, int]]:
         # Placeholder for older years if needed
@@ -66,18 +70,191 @@ class NatalityMicrodataLoader:
         """
         logger.info(f"Parsing NCHS Natality file: {self.file_path} (Year: {self.year})")
         
-        # Prepare colspecs and names for pandas
-        names = list(self.colspecs.keys())
-        specs = list(self.colspecs.values())
-        
         df = pd.read_fwf(
             self.file_path,
-            colspecs=specs,
-            names=names,
+            colspecs=list(self.colspecs.values()),
+            names=list(self.colspecs.keys()),
             nrows=nrows,
             dtype=str
         )
         
+        return self._build_features(df, total_records=len(df))
+
+    def iter_chunks(self, chunksize: int = 250000) -> Iterator[pd.DataFrame]:
+        """
+        Streams the raw fixed-width records in chunks of `chunksize` rows.
+        The index of each chunk is the record's line number in the file.
+        """
+        with pd.read_fwf(
+            self.file_path,
+            colspecs=list(self.colspecs.values()),
+            names=list(self.colspecs.keys()),
+            chunksize=chunksize,
+            dtype=str
+        ) as reader:
+            for chunk in reader:
+                yield chunk
+
+    def build_index(self, block_size: int = 65536) -> NatalityIndex:
+        """Builds (or rebuilds) the sidecar byte-offset index for this file."""
+        self._index = NatalityIndex.build(self.file_path, self.colspecs, block_size=block_size)
+        return self._index
+
+    def get_index(self) -> Optional[NatalityIndex]:
+        """Returns the sidecar index if one exists and matches the file."""
+        if self._index is None or not self._index.is_fresh():
+            self._index = NatalityIndex.load(self.file_path)
+        return self._index
+
+    def read_records(self, record_ids) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Seek-reads specific records (0-based line numbers) via the index.
+        Returns (features_df, metadata) like `load`.
+        """
+        index = self.get_index() or self.build_index()
+        lines, ids = index.read_records(record_ids)
+        df = parse_fixed_width(lines, self.colspecs)
+        df.index = ids
+        return self._build_features(df, total_records=index.record_count)
+
+    def load_cohort(self,
+                    filters: Dict[str, FieldFilter],
+                    max_records: Optional[int] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Loads only records matching `filters` on raw layout fields, e.g.
+        {'DOB_MM': [6, 7], 'MAGER': (35, 50)}. Tuples are inclusive numeric
+        ranges, other iterables are sets of allowed codes. Blocks whose index
+        summaries cannot satisfy the filters are never read.
+        """
+        unknown = [c for c in filters if c not in self.colspecs]
+        if unknown:
+            raise ValueError(f"Unknown filter columns: {unknown}")
+
+        index = self.get_index() or self.build_index()
+        blocks = index.candidate_blocks(filters)
+        logger.info(f"Cohort query reads {len(blocks)}/{index.n_blocks} blocks of {self.file_path}")
+
+        parts = []
+        matched = 0
+        for block in blocks:
+            lines, ids = index.read_block(int(block))
+            df = parse_fixed_width(lines, self.colspecs)
+            df.index = ids
+            mask = pd.Series(True, index=df.index)
+            for field, allowed in filters.items():
+                if isinstance(allowed, tuple):
+                    values = pd.to_numeric(df[field], errors='coerce')
+                    mask &= values.between(allowed[0], allowed[1])
+                else:
+                    codes = pd.to_numeric(df[field], errors='coerce')
+                    mask &= codes.isin([float(a) for a in allowed])
+            df = df[mask]
+            parts.append(df)
+            matched += len(df)
+            if max_records is not None and matched >= max_records:
+                break
+
+        cohort = pd.concat(parts) if parts else pd.DataFrame(columns=list(self.colspecs.keys()))
+        if max_records is not None:
+            cohort = cohort.iloc[:max_records]
+        features_df, metadata = self._build_features(cohort, total_records=index.record_count)
+        metadata["blocks_read"] = len(parts)
+        metadata["blocks_total"] = index.n_blocks
+        return features_df, metadata
+
+    def iter_features(self, chunksize: int = 250000) -> Iterator[pd.DataFrame]:
+        """Streams the file as cleaned 25-feature chunks (see `iter_chunks`)."""
+        for chunk in self.iter_chunks(chunksize):
+            yield self._map_to_25_features(self._process_data(chunk))
+
+    def sample(self,
+               n: int,
+               random_state: Optional[int] = None,
+               stratify_by: Optional[List[str]] = None,
+               chunksize: int = 250000,
+               use_index: bool = True) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Draws a uniform random sample of `n` records from the whole file in a
+        single streaming pass (bottom-k reservoir: every record gets a random
+        key and the `n` smallest keys are kept). Memory stays bounded by
+        `n + chunksize` rows regardless of file size.
+
+        With `stratify_by` (raw columns such as DOB_MM or MRACEHISP) the
+        reservoir is kept per stratum and `n` is allocated proportionally to
+        the stratum counts seen over the full file. Those counts are only
+        known at the end of the pass, so every stratum keeps up to `n` rows
+        until then: memory is bounded by `n * strata + chunksize` rows
+        (still independent of file size), not `n + chunksize`.
+
+        If a sidecar index exists (see `build_index`) an unstratified sample
+        is seek-read directly instead of scanning the file.
+        Returns (features_df, metadata) like `load`.
+        """
+        index = self.get_index() if use_index and not stratify_by else None
+        if stratify_by:
+            unknown = [c for c in stratify_by if c not in self.colspecs]
+            if unknown:
+                raise ValueError(f"Unknown stratification columns: {unknown}")
+        elif index is not None:
+            rng = np.random.default_rng(random_state)
+            ids = rng.choice(index.record_count, size=min(n, index.record_count), replace=False)
+            features_df, metadata = self.read_records(ids)
+            features_df = features_df.loc[ids]
+            metadata["sampled_records"] = len(features_df)
+            return features_df, metadata
+
+        logger.info(f"Sampling {n} records from NCHS Natality file: {self.file_path} (Year: {self.year})")
+        rng = np.random.default_rng(random_state)
+        reservoir = None
+        strata_counts = None
+        total = 0
+
+        for chunk in self.iter_chunks(chunksize):
+            total += len(chunk)
+            if stratify_by:
+                sizes = chunk.groupby(stratify_by, dropna=False).size()
+                strata_counts = sizes if strata_counts is None else strata_counts.add(sizes, fill_value=0)
+
+            chunk = chunk.assign(_key=rng.random(len(chunk)))
+            if reservoir is not None:
+                chunk = pd.concat([reservoir, chunk])
+
+            if stratify_by:
+                reservoir = chunk.sort_values('_key').groupby(stratify_by, dropna=False, sort=False).head(n)
+            else:
+                reservoir = chunk.nsmallest(n, '_key')
+
+        if reservoir is None:
+            reservoir = pd.DataFrame(columns=list(self.colspecs.keys()) + ['_key'])
+        elif stratify_by:
+            reservoir = self._allocate_strata(reservoir, strata_counts, stratify_by, n)
+
+        reservoir = reservoir.sort_values('_key').drop(columns='_key')
+        features_df, metadata = self._build_features(reservoir, total_records=total)
+        metadata["sampled_records"] = len(features_df)
+        if stratify_by:
+            metadata["strata"] = len(strata_counts)
+        return features_df, metadata
+
+    @staticmethod
+    def _allocate_strata(reservoir: pd.DataFrame, counts: pd.Series,
+                         stratify_by: List[str], n: int) -> pd.DataFrame:
+        """Proportional allocation of n over strata (largest remainder)."""
+        total = counts.sum()
+        quota = counts * min(n, total) / total
+        alloc = np.floor(quota).astype(int)
+        remainder = int(min(n, total) - alloc.sum())
+        if remainder > 0:
+            alloc[(quota - alloc).sort_values(ascending=False).index[:remainder]] += 1
+
+        reservoir = reservoir.sort_values('_key')
+        rank = reservoir.groupby(stratify_by, dropna=False, sort=False).cumcount()
+        keys = pd.MultiIndex.from_frame(reservoir[stratify_by]) if len(stratify_by) > 1 \
+            else pd.Index(reservoir[stratify_by[0]])
+        limit = alloc.reindex(keys).fillna(0).to_numpy()
+        return reservoir[rank.to_numpy() < limit]
+
+    def _build_features(self, df: pd.DataFrame, total_records: int) -> Tuple[pd.DataFrame, Dict[str, Any]]:
         # Data Cleaning & Mapping
         processed_df = self._process_data(df)
         
@@ -89,7 +266,7 @@ class NatalityMicrodataLoader:
         
         metadata = {
             "year": self.year,
-            "total_records": len(df),
+            "total_records": total_records,
             "quality_report": report,
             "supplementation_needed": [f for f in self.FEATURES_25_SPEC if features_df[f].isnull().all()]
         }
@@ -2,82 +2,233 @@ from celery import Celery
 import os
 import logging
 import asyncio
-from typing import Dict, Any
+import hashlib
+import json
+import re
+import time
+from typing import Dict, Any, Optional
 
 from app.data.natality_loader import NatalityMicrodataLoader
 from app.external.cdc_wonder import CDCWonderClient
 from app.external.ahr_client import AHRClient
 from app.external.ipums_client import IPUMSClient
 from app.data.calibrator import CalibrateSyntheticData
+from app.data.accumulators import SufficientStatistics
 
 logger = logging.getLogger(__name__)
 
 # Assuming celery_app is defined elsewhere or initialized here
 celery_app = Celery("maternal_health_pipeline")
 
+def _natality_year(file_name: str) -> int:
+    """Year from an NCHS file name such as Nat2022PublicUS.c20230504.r20230822.txt."""
+    match = re.search(r'Nat(\d{4})', file_name)
+    return int(match.group(1)) if match else 2023
+
+def run_pipeline_sync():
+    """
+    Orchestrates the full data fetching and calibration pipeline.
+    Plain function so it can also run on the local task queue.
+    """
+    return asyncio.run(_run_pipeline_async())
+
 @celery_app.task(name="run_data_pipeline")
 def run_data_pipeline():
     """
     Orchestrates the full data fetching and calibration pipeline.
     """
-    return asyncio.run(_run_pipeline_async())
+    return run_pipeline_sync()
 
-async def _run_pipeline_async():
-    logger.info("Starting orchestrated data pipeline...")
-    
-    # 1. NCHS Natality Processing
-    nchs_dir = os.getenv("NCHS_DATA_DIR", "/data/nchs/natality")
-    natality_df = None
-    # Look for any .txt file in the dir (usually the extracted microdata)
+class StageCache:
+    """
+    Small JSON cache of pipeline stage outputs, keyed by each stage's input
+    fingerprint. Stored next to calibration_params.json.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, stage: str, key: str, max_age: Optional[float] = None):
+        entry = self.entries.get(stage)
+        if not entry or entry['key'] != key:
+            return None
+        if max_age is not None and time.time() - entry['updated_at'] > max_age:
+            return None
+        return entry['output']
+
+    def put(self, stage: str, key: str, output: Any):
+        self.entries[stage] = {'key': key, 'output': output, 'updated_at': time.time()}
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, default=str)
+        os.replace(tmp_path, self.path)
+
+
+async def _run_stage(name: str, stages: Dict[str, Any], coro, timeout: Optional[float] = None):
+    """
+    Awaits one stage, recording its status and wall time. Failures and
+    timeouts are logged and yield None so the other stages still complete.
+    """
+    start = time.perf_counter()
+    output, cached, status = None, False, 'ok'
     try:
-        txt_files = [f for f in os.listdir(nchs_dir) if f.endswith('.txt')]
-        if txt_files:
-            file_path = os.path.join(nchs_dir, txt_files[0])
-            loader = NatalityMicrodataLoader(file_path, year=2023)
-            natality_df, meta = loader.load(nrows=100000) # Sample for calibration
-            logger.info("NCHS Natality data loaded successfully.")
-        else:
-            logger.warning(f"No NCHS natality records found in {nchs_dir}. Skipping microdata calibration.")
+        output, cached = await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        status = 'timeout'
+        logger.error(f"Pipeline stage '{name}' timed out after {timeout}s")
     except Exception as e:
-        logger.error(f"Error loading NCHS data: {e}")
+        status = 'failed'
+        logger.error(f"Pipeline stage '{name}' failed: {e}")
+    stages[name] = {
+        'status': 'cached' if cached and status == 'ok' else status,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+    return output
+
+
+def _natality_stage(calibrator: CalibrateSyntheticData, nchs_dir: str):
+    """
+    CPU-bound: streams every microdata file into persisted sufficient
+    statistics. Files ingested on a previous run are skipped.
+    """
+    txt_files = sorted(f for f in os.listdir(nchs_dir) if f.endswith('.txt'))
+    if not txt_files:
+        logger.warning(f"No NCHS natality records found in {nchs_dir}. Skipping microdata calibration.")
+        return None, False
+
+    natality_stats = calibrator.load_stats()
+    pruned = natality_stats.prune_missing()
+    if pruned:
+        natality_stats.save(calibrator.stats_path)
+    loaders = [NatalityMicrodataLoader(os.path.join(nchs_dir, f), year=_natality_year(f)) for f in txt_files]
+    if not pruned and all(natality_stats.is_current(SufficientStatistics.source_key(l.file_path, l.year),
+                                     SufficientStatistics.file_fingerprint(l.file_path)) for l in loaders):
+        return natality_stats, True
+
+    for loader in loaders:
+        natality_stats = calibrator.update_natality_stats(loader, natality_stats=natality_stats)
+    logger.info("NCHS Natality statistics updated successfully.")
+    return natality_stats, False
+
+
+async def _cdc_stage(cache: StageCache, max_age: float):
+    years = ["2021", "2022", "2023"]
+    key = StageCache.fingerprint('cdc_wonder', years)
+    cached = cache.get('cdc_wonder', key, max_age=max_age)
+    if cached is not None:
+        return cached, True
 
-    # 2. CDC WONDER Queries
     cdc_client = CDCWonderClient()
     cdc_results = {}
-    try:
-        years = ["2021", "2022", "2023"]
-        morbidity = await cdc_client.get_maternal_morbidity_by_state(years)
-        # Process and store in cdc_results for calibrator
-        # ... logic to extract rates ...
-        logger.info("CDC WONDER data queried.")
-    except Exception as e:
-        logger.error(f"CDC WONDER query failed: {e}")
+    morbidity = await cdc_client.get_maternal_morbidity_by_state(years)
+    # Process and store in cdc_results for calibrator
+    # ... logic to extract rates ...
+    logger.info("CDC WONDER data queried.")
+    cache.put('cdc_wonder', key, cdc_results)
+    return cdc_results, False
+
+
+async def _ahr_stage(cache: StageCache, max_age: float):
+    measure = "Maternal Mortality"
+    key = StageCache.fingerprint('ahr', measure)
+    cached = cache.get('ahr', key, max_age=max_age)
+    if cached is not None:
+        return cached, True
 
-    # 3. AHR API Queries
     ahr_client = AHRClient()
     ahr_results = {}
-    try:
-        mortality = await ahr_client.get_measure_by_state("Maternal Mortality")
-        # Process and store
-        logger.info("AHR API data queried.")
-    except Exception as e:
-        logger.error(f"AHR API query failed: {e}")
+    mortality = await ahr_client.get_measure_by_state(measure)
+    # Process and store
+    logger.info("AHR API data queried.")
+    cache.put('ahr', key, ahr_results)
+    return ahr_results, False
+
 
-    # 4. Optional IPUMS Integration
+async def _ipums_stage():
     if os.getenv("IPUMS_API_KEY"):
         ipums_client = IPUMSClient()
         # Trigger extracts or use cached
         logger.info("IPUMS integration active.")
+    return None, False
+
+
+async def _run_pipeline_async():
+    """
+    Runs the pipeline as a small DAG:
+
+        natality (executor) ─┐
+        cdc_wonder ──────────┼─> calibration
+        ahr ─────────────────┘
+        ipums (independent)
+
+    Network stages run concurrently with timeouts; the blocking NCHS parse
+    runs in a worker thread so it does not stall the event loop. A failed
+    stage only drops its input to calibration. Stage outputs are cached in
+    pipeline_cache.json, so a rerun with unchanged inputs skips the work.
+    """
+    logger.info("Starting orchestrated data pipeline...")
+    loop = asyncio.get_running_loop()
+    fetch_timeout = float(os.getenv("PIPELINE_FETCH_TIMEOUT", "60"))
+    cache_ttl = float(os.getenv("PIPELINE_CACHE_TTL", str(24 * 3600)))
+    nchs_dir = os.getenv("NCHS_DATA_DIR", "/data/nchs/natality")
 
-    # 5. Calibration
     calibrator = CalibrateSyntheticData(
         output_path=os.getenv("CALIBRATION_OUTPUT_PATH", "./config/calibration_params.json")
     )
-    report = calibrator.run_calibration(
-        natality_df=natality_df,
-        cdc_data=cdc_results,
-        ahr_data=ahr_results
-    )
+    cache = StageCache(os.path.join(os.path.dirname(calibrator.output_path), "pipeline_cache.json"))
+    stages: Dict[str, Any] = {}
+    started = time.perf_counter()
+
+    natality_task = asyncio.ensure_future(_run_stage(
+        'natality', stages, loop.run_in_executor(None, _natality_stage, calibrator, nchs_dir)
+    ))
+    cdc_task = asyncio.ensure_future(_run_stage('cdc_wonder', stages, _cdc_stage(cache, cache_ttl), fetch_timeout))
+    ahr_task = asyncio.ensure_future(_run_stage('ahr', stages, _ahr_stage(cache, cache_ttl), fetch_timeout))
+    ipums_task = asyncio.ensure_future(_run_stage('ipums', stages, _ipums_stage(), fetch_timeout))
+
+    # Calibration waits only on its inputs
+    natality_stats, cdc_results, ahr_results = await asyncio.gather(natality_task, cdc_task, ahr_task)
+
+    async def calibration_stage():
+        natality_sources = natality_stats.fingerprints() if natality_stats is not None else []
+        key = StageCache.fingerprint('calibration', natality_sources, cdc_results, ahr_results)
+        cached = cache.get('calibration', key)
+        if cached is not None and os.path.exists(calibrator.output_path):
+            return cached, True
+        report = await loop.run_in_executor(None, lambda: calibrator.run_calibration(
+            natality_stats=natality_stats,
+            cdc_data=cdc_results or {},
+            ahr_data=ahr_results or {}
+        ))
+        cache.put('calibration', key, report)
+        return report, False
+
+    report = await _run_stage('calibration', stages, calibration_stage())
+    await ipums_task
+
+    try:
+        cache.save()
+    except OSError as e:
+        logger.error(f"Could not save pipeline cache: {e}")
 
-    logger.info("Data pipeline completed successfully.")
+    if report is None:
+        raise RuntimeError("Calibration stage failed; see pipeline stages for details.")
+    report = dict(report)
+    report["pipeline"] = {
+        "stages": stages,
+        "total_seconds": round(time.perf_counter() - started, 3)
+    }
+    logger.info(f"Data pipeline completed in {report['pipeline']['total_seconds']}s: {stages}")
     return report
@@ -18,6 +18,20 @@ def fit_scaler(train_df, feature_cols=None):
     return scaler, feature_cols
 
 
+def scaler_from_stats(feat_mean, feat_std):
+    """
+    StandardScaler reproducing a model version's training standardization
+    (the `feature_scaling` stored with it), for use with prepare_features.
+    """
+    scaler = StandardScaler()
+    scaler.mean_ = np.asarray(feat_mean, dtype=np.float64)
+    scaler.scale_ = np.asarray(feat_std, dtype=np.float64)
+    scaler.var_ = scaler.scale_ ** 2
+    scaler.n_features_in_ = len(scaler.mean_)
+    scaler.n_samples_seen_ = 0
+    return scaler
+
+
 def transform_features(df, scaler, feature_cols):
     if scaler is None:
         raise ValueError("Scaler is required to transform features.")
@@ -1,6 +1,6 @@
+import json
 import os
 import sqlite3
-import torch
 from config import config
 
 
@@ -28,10 +28,38 @@ def init_db():
                 test_recall REAL,
                 test_f1 REAL,
                 test_auc REAL,
+                participants TEXT,
+                round_time REAL,
+                node_times TEXT,
+                dropped_updates INTEGER,
+                late_updates INTEGER,
+                bytes_uplink INTEGER,
+                bytes_downlink INTEGER,
+                evaluated INTEGER,
+                update_norm REAL,
+                eval_time REAL,
+                early_stopped INTEGER,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP
             )
             """
         )
+        _ensure_columns(
+            conn,
+            "training_history",
+            {
+                "participants": "TEXT",
+                "round_time": "REAL",
+                "node_times": "TEXT",
+                "dropped_updates": "INTEGER",
+                "late_updates": "INTEGER",
+                "bytes_uplink": "INTEGER",
+                "bytes_downlink": "INTEGER",
+                "evaluated": "INTEGER",
+                "update_norm": "REAL",
+                "eval_time": "REAL",
+                "early_stopped": "INTEGER",
+            },
+        )
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS predictions (
@@ -42,19 +70,109 @@ def init_db():
             )
             """
         )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS privacy_accountants (
+                node_id INTEGER PRIMARY KEY,
+                history TEXT NOT NULL,
+                steps INTEGER NOT NULL,
+                epsilon REAL,
+                delta REAL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                owner TEXT,
+                result TEXT,
+                error TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                started_at TEXT,
+                finished_at TEXT
+            )
+            """
+        )
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS model_versions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 version INTEGER NOT NULL,
                 path TEXT NOT NULL,
+                artifact_path TEXT,
+                numpy_path TEXT,
+                int8_path TEXT,
+                quantization_report TEXT,
+                feature_scaling TEXT,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP
             )
             """
         )
+        _ensure_columns(conn, "model_versions", {
+            "artifact_path": "TEXT",
+            "numpy_path": "TEXT",
+            "int8_path": "TEXT",
+            "quantization_report": "TEXT",
+            "feature_scaling": "TEXT",
+            "base_version": "INTEGER",
+        })
+        conn.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_model_versions_version
+            ON model_versions (version)
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS model_objects (
+                sha TEXT PRIMARY KEY,
+                dtype TEXT NOT NULL,
+                shape TEXT NOT NULL,
+                encoding TEXT NOT NULL,
+                base_sha TEXT,
+                stored_bytes INTEGER,
+                raw_bytes INTEGER,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS model_version_tensors (
+                version INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                sha TEXT NOT NULL,
+                PRIMARY KEY (version, name)
+            )
+            """
+        )
+
+
+def _ensure_columns(conn, table, columns):
+    """Adds columns introduced after a database was first created."""
+    existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, column_type in columns.items():
+        if name not in existing:
+            try:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+            except sqlite3.OperationalError as e:
+                # Another process (e.g. a node server starting alongside) added it first
+                if "duplicate column name" not in str(e):
+                    raise
 
 
-def record_training_round(round_number, train_metrics, test_metrics):
+def record_training_round(round_number, train_metrics, test_metrics, participants=None, timing=None,
+                          transport=None, evaluation=None):
+    # Test columns stay NULL for rounds the evaluation schedule skipped
+    test_metrics = test_metrics or {}
+    timing = timing or {}
+    transport = transport or {}
+    evaluation = evaluation or {}
     with _get_connection() as conn:
         conn.execute(
             """
@@ -69,9 +187,20 @@ def record_training_round(round_number, train_metrics, test_metrics):
                 test_precision,
                 test_recall,
                 test_f1,
-                test_auc
+                test_auc,
+                participants,
+                round_time,
+                node_times,
+                dropped_updates,
+                late_updates,
+                bytes_uplink,
+                bytes_downlink,
+                evaluated,
+                update_norm,
+                eval_time,
+                early_stopped
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 round_number,
@@ -85,6 +214,17 @@ def record_training_round(round_number, train_metrics, test_metrics):
                 test_metrics.get("recall"),
                 test_metrics.get("f1"),
                 test_metrics.get("auc"),
+                json.dumps(participants) if participants is not None else None,
+                timing.get("round_time"),
+                json.dumps(timing["node_times"]) if "node_times" in timing else None,
+                timing.get("dropped_updates"),
+                timing.get("late_updates"),
+                transport.get("bytes_uplink"),
+                transport.get("bytes_downlink"),
+                int(evaluation["evaluated"]) if "evaluated" in evaluation else None,
+                evaluation.get("update_norm"),
+                evaluation.get("eval_time"),
+                int(evaluation["stopped"]) if "stopped" in evaluation else None,
             ),
         )
 
@@ -97,7 +237,12 @@ def get_training_history():
             ORDER BY round ASC, id ASC
             """
         ).fetchall()
-    return [dict(row) for row in rows]
+    history = [dict(row) for row in rows]
+    for entry in history:
+        for key in ("participants", "node_times"):
+            if entry.get(key) is not None:
+                entry[key] = json.loads(entry[key])
+    return history
 
 
 def record_prediction(risk_score, risk_category):
@@ -111,77 +256,315 @@ def record_prediction(risk_score, risk_category):
         )
 
 
-def get_prediction_count():
+def record_predictions(predictions):
+    """Records (risk_score, risk_category) pairs in one transaction."""
     with _get_connection() as conn:
-        row = conn.execute("SELECT COUNT(*) AS count FROM predictions").fetchone()
-    return int(row["count"])
+        conn.executemany(
+            """
+            INSERT INTO predictions (risk_score, risk_category)
+            VALUES (?, ?)
+            """,
+            predictions,
+        )
+
+
+def get_privacy_accountant(node_id):
+    """Persisted DP-SGD accountant state of one hospital, or None."""
+    with _get_connection() as conn:
+        row = conn.execute(
+            """
+            SELECT * FROM privacy_accountants
+            WHERE node_id = ?
+            """,
+            (node_id,),
+        ).fetchone()
+    if row is None:
+        return None
+    accountant = dict(row)
+    accountant["history"] = json.loads(accountant["history"])
+    return accountant
 
 
-def record_model_version(version, path):
+def save_privacy_accountant(node_id, history, steps, epsilon, delta):
+    """Stores a hospital's accountant history ([noise_multiplier, sample_rate, steps] entries)."""
     with _get_connection() as conn:
         conn.execute(
             """
-            INSERT INTO model_versions (version, path)
-            VALUES (?, ?)
+            INSERT INTO privacy_accountants (node_id, history, steps, epsilon, delta)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (node_id) DO UPDATE SET
+                history = excluded.history,
+                steps = excluded.steps,
+                epsilon = excluded.epsilon,
+                delta = excluded.delta,
+                updated_at = CURRENT_TIMESTAMP
             """,
-            (version, path),
+            (node_id, json.dumps(history), steps, epsilon, delta),
         )
 
 
+def list_privacy_accountants():
+    with _get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT node_id, steps, epsilon, delta, updated_at
+            FROM privacy_accountants
+            ORDER BY node_id ASC
+            """
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_prediction_count():
+    with _get_connection() as conn:
+        row = conn.execute("SELECT COUNT(*) AS count FROM predictions").fetchone()
+    return int(row["count"])
+
+
+def _model_row_to_dict(row):
+    model = dict(row)
+    for key in ("quantization_report", "feature_scaling"):
+        if model.get(key) is not None:
+            model[key] = json.loads(model[key])
+    return model
+
+
 def list_model_versions():
     with _get_connection() as conn:
         rows = conn.execute(
             """
-            SELECT version, path, created_at
+            SELECT version, path, artifact_path, numpy_path, int8_path, quantization_report,
+                   feature_scaling, base_version, created_at
             FROM model_versions
+            WHERE path != ''
             ORDER BY version DESC
             """
         ).fetchall()
-    return [dict(row) for row in rows]
+    return [_model_row_to_dict(row) for row in rows]
 
 
 def get_model_version(version):
     with _get_connection() as conn:
         row = conn.execute(
             """
-            SELECT version, path, created_at
+            SELECT version, path, artifact_path, numpy_path, int8_path, quantization_report,
+                   feature_scaling, base_version, created_at
             FROM model_versions
-            WHERE version = ?
+            WHERE version = ? AND path != ''
             LIMIT 1
             """,
             (version,),
         ).fetchone()
-    return dict(row) if row else None
+    return _model_row_to_dict(row) if row else None
 
 
 def get_latest_model_version():
     with _get_connection() as conn:
         row = conn.execute(
             """
-            SELECT version, path, created_at
+            SELECT version, path, artifact_path, numpy_path, int8_path, quantization_report,
+                   feature_scaling, base_version, created_at
             FROM model_versions
+            WHERE path != ''
             ORDER BY version DESC
             LIMIT 1
             """
         ).fetchone()
-    return dict(row) if row else None
+    return _model_row_to_dict(row) if row else None
+
+
+def allocate_model_version():
+    """
+    Reserves the next version number with a single INSERT, so concurrent
+    writers can never get the same number. The row stays hidden from
+    list/get queries until update_model_version fills in its path.
+    """
+    with _get_connection() as conn:
+        cursor = conn.execute(
+            """
+            INSERT INTO model_versions (version, path)
+            SELECT COALESCE(MAX(version), 0) + 1, '' FROM model_versions
+            """
+        )
+        row = conn.execute(
+            "SELECT version FROM model_versions WHERE id = ?", (cursor.lastrowid,)
+        ).fetchone()
+    return int(row["version"])
+
 
+_MODEL_VERSION_FIELDS = {
+    "path", "artifact_path", "numpy_path", "int8_path",
+    "quantization_report", "feature_scaling", "base_version",
+}
+
+
+def update_model_version(version, **fields):
+    unknown = set(fields) - _MODEL_VERSION_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown model_versions fields: {sorted(unknown)}")
+    for key in ("quantization_report", "feature_scaling"):
+        if fields.get(key) is not None:
+            fields[key] = json.dumps(fields[key])
+    assignments = ", ".join(f"{key} = ?" for key in fields)
+    with _get_connection() as conn:
+        conn.execute(
+            f"UPDATE model_versions SET {assignments} WHERE version = ?",
+            (*fields.values(), version),
+        )
+
+
+def delete_model_version(version):
+    """Removes a version row and its tensor references, so gc can free its objects."""
+    with _get_connection() as conn:
+        conn.execute("DELETE FROM model_version_tensors WHERE version = ?", (version,))
+        conn.execute("DELETE FROM model_versions WHERE version = ?", (version,))
 
-def get_next_model_version():
-    latest = get_latest_model_version()
-    if not latest:
-        return 1
-    return int(latest["version"]) + 1
 
+def save_model_version(model, feat_mean=None, feat_std=None, test_dataloader=None):
+    """
+    Stores the weights in the content-addressed model store and exports the
+    inference artifacts (frozen TorchScript and NumPy weights) with the
+    feature standardization baked in. With config.EXPORT_INT8 an int8
+    artifact is exported too, and, given the held-out test set, a
+    float-vs-int8 accuracy/AUC report. Old versions are pruned according
+    to config.MODEL_RETENTION.
+    """
+    from app.data.model_store import get_model_store
+    from app.models.export import export_torchscript, export_numpy, export_quantized, quantization_report
 
-def save_model_version(model):
     os.makedirs(config.MODEL_DIR, exist_ok=True)
-    version = get_next_model_version()
-    filename = f"model_v{version}.pt"
-    path = os.path.join(config.MODEL_DIR, filename)
-    torch.save(model.state_dict(), path)
-    record_model_version(version, path)
+    store = get_model_store()
+    version = allocate_model_version()
+    artifact_files = [
+        os.path.join(config.MODEL_DIR, f"model_v{version}{suffix}") for suffix in (".ts", ".npz", ".int8.ts")
+    ]
+    try:
+        state = {name: tensor.detach().cpu().numpy() for name, tensor in model.state_dict().items()}
+        stored = store.put_version(version, state)
+        artifact_path = export_torchscript(model, artifact_files[0], feat_mean, feat_std)
+        numpy_path = export_numpy(model, artifact_files[1], feat_mean, feat_std)
+        int8_path = report = None
+        if config.EXPORT_INT8:
+            int8_path = export_quantized(model, artifact_files[2], feat_mean, feat_std)
+            if test_dataloader is not None:
+                report = quantization_report(model, test_dataloader)
+    except Exception:
+        # Drop the reservation, its tensor rows and any artifact already written
+        delete_model_version(version)
+        for path in artifact_files:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    # Standardization the model was trained with, so any client can reproduce it
+    scaling = None
+    if feat_mean is not None:
+        scaling = {
+            "feat_mean": [float(v) for v in feat_mean],
+            "feat_std": [float(v) for v in feat_std],
+        }
+    update_model_version(
+        version,
+        path=stored["path"],
+        artifact_path=artifact_path,
+        numpy_path=numpy_path,
+        int8_path=int8_path,
+        quantization_report=report,
+        feature_scaling=scaling,
+        base_version=stored["base_version"],
+    )
+    gc_stats = store.gc()
     return {
         "version": version,
-        "path": path
+        "path": stored["path"],
+        "artifact_path": artifact_path,
+        "numpy_path": numpy_path,
+        "int8_path": int8_path,
+        "quantization_report": report,
+        "feature_scaling": scaling,
+        "base_version": stored["base_version"],
+        "stored_bytes": stored["stored_bytes"],
+        "gc": gc_stats
     }
+
+
+def create_task(task_id, name, owner=None):
+    with _get_connection() as conn:
+        conn.execute(
+            """
+            INSERT INTO tasks (id, name, status, owner)
+            VALUES (?, ?, 'queued', ?)
+            """,
+            (task_id, name, owner),
+        )
+
+
+def mark_task_running(task_id):
+    with _get_connection() as conn:
+        conn.execute(
+            """
+            UPDATE tasks SET status = 'running', started_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            (task_id,),
+        )
+
+
+def finish_task(task_id, status, result=None, error=None):
+    with _get_connection() as conn:
+        conn.execute(
+            """
+            UPDATE tasks
+            SET status = ?, result = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            (status, json.dumps(result, default=str) if result is not None else None, error, task_id),
+        )
+
+
+def _task_row_to_dict(row):
+    task = dict(row)
+    if task.get("result") is not None:
+        task["result"] = json.loads(task["result"])
+    return task
+
+
+def get_task(task_id):
+    with _get_connection() as conn:
+        row = conn.execute(
+            """
+            SELECT id, name, status, owner, result, error, created_at, started_at, finished_at
+            FROM tasks
+            WHERE id = ?
+            LIMIT 1
+            """,
+            (task_id,),
+        ).fetchone()
+    return _task_row_to_dict(row) if row else None
+
+
+def get_active_task(name):
+    with _get_connection() as conn:
+        row = conn.execute(
+            """
+            SELECT id, name, status, owner, result, error, created_at, started_at, finished_at
+            FROM tasks
+            WHERE name = ? AND status IN ('queued', 'running')
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            (name,),
+        ).fetchone()
+    return _task_row_to_dict(row) if row else None
+
+
+def list_active_tasks():
+    with _get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, name, status, owner
+            FROM tasks
+            WHERE status IN ('queued', 'running')
+            """
+        ).fetchall()
+    return [dict(row) for row in rows]
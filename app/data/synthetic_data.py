@@ -1,15 +1,17 @@
 import numpy as np
 import pandas as pd
-import json
 import os
 from scipy import stats as sp_stats
+from scipy import special as sp_special
 from sklearn.datasets import make_classification
 from sklearn.model_selection import train_test_split
 import torch
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, IterableDataset, DataLoader, get_worker_info
 
-CALIBRATION_PATH = os.path.join(
-    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'config', 'calibration_params.json'
+from app.data.calibration_registry import (
+    CalibrationParams,
+    DEFAULT_CALIBRATION_PATH as CALIBRATION_PATH,
+    get_calibration_registry,
 )
 
 # Ordered feature names matching the 25-feature spec
@@ -22,6 +24,11 @@ FEATURE_NAMES = [
     'previousComplications'
 ]
 
+def num_samples(dataset):
+    """Records in a dataset: len() for in-memory datasets, n_samples for streams (whose len() counts batches)."""
+    return dataset.n_samples if isinstance(dataset, SyntheticStreamDataset) else len(dataset)
+
+
 class MaternalHealthDataset(Dataset):
     def __init__(self, features, labels):
         self.features = features
@@ -34,68 +41,153 @@ class MaternalHealthDataset(Dataset):
         return self.features[idx], self.labels[idx]
 
 
+def _calibration(cal=None):
+    """Typed calibration parameters: the cached registry by default, or a raw dict."""
+    if cal is None:
+        return get_calibration_registry(CALIBRATION_PATH).get()
+    if isinstance(cal, dict):
+        return CalibrationParams.from_dict(cal)
+    return cal
+
+
 def _sample_feature(params, n, rng):
     """Sample n values for a single feature from its calibrated distribution."""
-    dist = params.get('dist', 'norm')
-    mu = params['mu']
-    std = params['std']
-
-    if dist == 'truncnorm':
-        lo, hi = params['bounds']
-        a, b = (lo - mu) / std, (hi - mu) / std
-        return sp_stats.truncnorm.rvs(a, b, loc=mu, scale=std, size=n, random_state=rng)
+    if params.dist == 'truncnorm':
+        return sp_stats.truncnorm.rvs(params.a, params.b, loc=params.mu, scale=params.std, size=n, random_state=rng)
+    elif params.dist == 'bernoulli':
+        return rng.binomial(1, params.p, size=n).astype(float)
     else:
-        return rng.normal(mu, std, size=n)
+        return rng.normal(params.mu, params.std, size=n)
 
 
-def _generate_calibrated(n_samples, random_state):
-    """Generate data using calibration_params.json from the NCHS pipeline."""
-    with open(CALIBRATION_PATH, 'r') as f:
-        cal = json.load(f)
+# Clinical thresholds used to derive the high_risk label.
+# A patient is high-risk if ANY major risk factor is present.
+RISK_UPPER_THRESHOLDS = {
+    'systolicBP': 140, 'diastolicBP': 90, 'bloodGlucose': 140,
+    'proteinUrine': 300, 'hba1c': 6.5, 'creatinine': 1.0,
+}
+RISK_LOWER_THRESHOLDS = {'hemoglobin': 10, 'plateletCount': 100}
 
-    rng = np.random.RandomState(random_state)
-    df = pd.DataFrame()
+_FEATURE_INDEX = {feat: i for i, feat in enumerate(FEATURE_NAMES)}
 
-    # 1. Sample each feature independently
+
+def _sampling_plan(cal):
+    """Group FEATURE_NAMES by distribution with per-feature parameter vectors."""
+    trunc, normal, binary = [], [], []
     for feat in FEATURE_NAMES:
-        if feat == 'previousComplications':
+        params = cal.get(feat)
+        if feat == 'previousComplications' and params is None:
             # Binary feature — not in calibration, generate ~12% prevalence
-            df[feat] = rng.binomial(1, 0.12, size=n_samples).astype(float)
-        elif feat in cal and isinstance(cal[feat], dict):
-            df[feat] = _sample_feature(cal[feat], n_samples, rng)
+            binary.append((_FEATURE_INDEX[feat], 0.12))
+        elif params is None:
+            normal.append((_FEATURE_INDEX[feat], 0.0, 1.0))
+        elif params.dist == 'truncnorm':
+            trunc.append((_FEATURE_INDEX[feat], params.mu, params.std, *params.bounds, params.a, params.b))
+        elif params.dist == 'bernoulli':
+            binary.append((_FEATURE_INDEX[feat], params.p))
         else:
-            df[feat] = rng.normal(0, 1, size=n_samples)
+            normal.append((_FEATURE_INDEX[feat], params.mu, params.std))
+
+    trunc = np.array(trunc, dtype=np.float64).reshape(-1, 7)
+    normal = np.array(normal, dtype=np.float64).reshape(-1, 3)
+    binary = np.array(binary, dtype=np.float64).reshape(-1, 2)
+
+    # Truncnorm via inverse CDF. Bounds lying in the right tail are sampled
+    # mirrored so ndtr/ndtri stay in their accurate (left) region.
+    mu, std, lo, hi, a, b = (trunc[:, i] for i in range(1, 7))
+    sign = np.where(a > 0, -1.0, 1.0)
+    a_s, b_s = np.minimum(sign * a, sign * b), np.maximum(sign * a, sign * b)
+    cdf_a = sp_special.ndtr(a_s)
+
+    return {
+        'trunc_idx': trunc[:, 0].astype(np.intp),
+        'trunc_mu': mu, 'trunc_scale': sign * std,
+        'trunc_cdf_a': cdf_a, 'trunc_cdf_span': sp_special.ndtr(b_s) - cdf_a,
+        'trunc_lo': lo, 'trunc_hi': hi,
+        'norm_idx': normal[:, 0].astype(np.intp),
+        'norm_mu': normal[:, 1], 'norm_std': normal[:, 2],
+        'binary_idx': binary[:, 0].astype(np.intp), 'binary_p': binary[:, 1],
+    }
+
+
+def generate_calibrated_matrix(n_samples, random_state=42, cal=None, as_frame=False, block_size=262144):
+    """
+    Vectorized calibrated generator.
+
+    Samples every feature straight into one preallocated (n_samples, 25)
+    float32 matrix, block of rows at a time: all truncated-normal features
+    are drawn together via inverse-CDF sampling, correlation shifts and the
+    clinical-threshold label are computed on whole columns.
+
+    Returns (features, labels) with int8 labels, or a DataFrame with
+    FEATURE_NAMES + ['high_risk'] when `as_frame` is True.
+    """
+    cal = _calibration(cal)
+    plan = _sampling_plan(cal)
+    rng = np.random.default_rng(random_state)
+    features = np.empty((n_samples, len(FEATURE_NAMES)), dtype=np.float32)
+    labels = np.empty(n_samples, dtype=np.int8)
+
+    # 1. Sample each feature independently
+    for start in range(0, n_samples, block_size):
+        block = features[start:start + block_size]
+        m = len(block)
+        if plan['trunc_idx'].size:
+            u = plan['trunc_cdf_a'] + rng.random((m, plan['trunc_idx'].size)) * plan['trunc_cdf_span']
+            values = plan['trunc_mu'] + plan['trunc_scale'] * sp_special.ndtri(u)
+            block[:, plan['trunc_idx']] = np.clip(values, plan['trunc_lo'], plan['trunc_hi'])
+        if plan['norm_idx'].size:
+            block[:, plan['norm_idx']] = rng.normal(plan['norm_mu'], plan['norm_std'], size=(m, plan['norm_idx'].size))
+        if plan['binary_idx'].size:
+            block[:, plan['binary_idx']] = rng.random((m, plan['binary_idx'].size)) < plan['binary_p']
 
     # 2. Apply correlation shifts from calibration
-    corr = cal.get('_correlations', {})
-    bmi_z = (df['bmi'] - df['bmi'].mean()) / df['bmi'].std()
+    corr = cal.correlations
 
-    if 'bmi_to_systolicBP' in corr:
-        df['systolicBP'] += corr['bmi_to_systolicBP'] * bmi_z * cal['systolicBP']['std']
-    if 'bmi_to_bloodGlucose' in corr:
-        df['bloodGlucose'] += corr['bmi_to_bloodGlucose'] * bmi_z * cal['bloodGlucose']['std']
-    if 'gestationalAge_to_bodyTemp' in corr:
-        ga_z = (df['gestationalAge'] - df['gestationalAge'].mean()) / df['gestationalAge'].std()
-        df['bodyTemp'] += corr['gestationalAge_to_bodyTemp'] * ga_z * cal['bodyTemp']['std']
+    def zscore(feat):
+        col = features[:, _FEATURE_INDEX[feat]]
+        return (col - col.mean(dtype=np.float64)) / col.std(dtype=np.float64, ddof=1)
+
+    shifts = [
+        ('bmi_to_systolicBP', 'bmi', 'systolicBP'),
+        ('bmi_to_bloodGlucose', 'bmi', 'bloodGlucose'),
+        ('gestationalAge_to_bodyTemp', 'gestationalAge', 'bodyTemp'),
+    ]
+    z_cache = {}
+    for key, source, target in shifts:
+        if key in corr:
+            if source not in z_cache:
+                z_cache[source] = zscore(source)
+            features[:, _FEATURE_INDEX[target]] += corr[key] * z_cache[source] * cal.get(target).std
+    del z_cache
 
     # 3. Derive high_risk label from clinical thresholds
-    #    A patient is high-risk if ANY major risk factor is present
-    risk_score = (
-        (df['systolicBP'] > 140).astype(int) +
-        (df['diastolicBP'] > 90).astype(int) +
-        (df['bloodGlucose'] > 140).astype(int) +
-        (df['proteinUrine'] > 300).astype(int) +
-        (df['hba1c'] > 6.5).astype(int) +
-        (df['hemoglobin'] < 10).astype(int) +
-        (df['plateletCount'] < 100).astype(int) +
-        (df['creatinine'] > 1.0).astype(int) +
-        ((df['age'] > 35) & (df['previousComplications'] == 1)).astype(int)
-    )
-    df['high_risk'] = (risk_score >= 1).astype(int)
+    upper_idx = [_FEATURE_INDEX[f] for f in RISK_UPPER_THRESHOLDS]
+    upper_thr = np.array(list(RISK_UPPER_THRESHOLDS.values()), dtype=np.float32)
+    lower_idx = [_FEATURE_INDEX[f] for f in RISK_LOWER_THRESHOLDS]
+    lower_thr = np.array(list(RISK_LOWER_THRESHOLDS.values()), dtype=np.float32)
+    age, prev = _FEATURE_INDEX['age'], _FEATURE_INDEX['previousComplications']
+    for start in range(0, n_samples, block_size):
+        block = features[start:start + block_size]
+        labels[start:start + block_size] = (
+            (block[:, upper_idx] > upper_thr).any(axis=1) |
+            (block[:, lower_idx] < lower_thr).any(axis=1) |
+            ((block[:, age] > 35) & (block[:, prev] == 1))
+        )
+
+    if not as_frame:
+        return features, labels
 
+    df = pd.DataFrame(features, columns=FEATURE_NAMES, copy=False)
+    df['high_risk'] = labels.astype(int)
     return df
 
 
+def _generate_calibrated(n_samples, random_state):
+    """Generate data using calibration_params.json from the NCHS pipeline."""
+    return generate_calibrated_matrix(n_samples, random_state=random_state, as_frame=True)
+
+
 from app.data.natality_loader import NatalityMicrodataLoader
 
 def _get_nchs_file():
@@ -116,21 +208,21 @@ def generate_synthetic_maternal_data(n_samples=1000, n_features=25, random_state
     if nchs_path:
         # 1. Load Real Human Records
         loader = NatalityMicrodataLoader(nchs_path, year=2022)
-        # Load slightly more than requested to allow for filtering
-        base_df, _ = loader.load(nrows=n_samples * 2) 
-        base_df = base_df.sample(n=n_samples, random_state=random_state)
+        # Unbiased single-pass sample over the whole file (not just its head)
+        base_df, _ = loader.sample(n_samples, random_state=random_state)
+        base_df = base_df.reset_index(drop=True)
+        n_samples = len(base_df)
         
         # 2. Load Calibration for Supplementation
-        with open(CALIBRATION_PATH, 'r') as f:
-            cal = json.load(f)
+        cal = _calibration()
         
         rng = np.random.RandomState(random_state)
         
         # 3. Fill missing clinical features (Labs, BP, Blood Glucose)
         for feat in base_df.columns:
             if base_df[feat].isnull().all():
-                if feat in cal:
-                    base_df[feat] = _sample_feature(cal[feat], n_samples, rng)
+                if cal.get(feat) is not None:
+                    base_df[feat] = _sample_feature(cal.get(feat), n_samples, rng)
                 else:
                     base_df[feat] = rng.normal(0, 1, size=n_samples)
         
@@ -198,52 +290,256 @@ def split_data_for_federated_learning(df, n_hospitals=3, test_size=0.2, random_s
     for i in range(n_hospitals):
         start_idx = i * hospital_size
         end_idx = (i + 1) * hospital_size if i < n_hospitals - 1 else len(train_df)
-        hospital_df = train_df.iloc[start_idx:end_idx].copy()
+        hospital_df = train_df.iloc[start_idx:end_idx]
         hospital_dfs.append(hospital_df)
     
     return hospital_dfs, test_df
 
-def prepare_dataloaders(hospital_dfs, test_df, batch_size=32):
+def split_frame_to_matrix(df, n_hospitals=3, test_size=0.2, random_state=42, label_col='high_risk'):
     """
-    Prepare PyTorch dataloaders for each hospital and test set.
-    Features are standardized (zero mean, unit variance) using training statistics.
+    Single-copy alternative to split_data_for_federated_learning.
+
+    Uses the same stratified split, but writes the frame column by column
+    into one contiguous float32 matrix ordered [hospital 0 | ... | test],
+    so no per-hospital frames are created.
+    Returns (features, labels, ranges) where ranges holds the (start, stop)
+    row span of each hospital followed by the test set.
     """
-    # Compute standardization stats from all training data
-    all_train = pd.concat(hospital_dfs)
-    train_features_all = all_train.drop('high_risk', axis=1).values.astype(np.float32)
-    feat_mean = train_features_all.mean(axis=0)
-    feat_std = train_features_all.std(axis=0)
-    feat_std[feat_std == 0] = 1.0  # avoid division by zero
+    train_idx, test_idx = train_test_split(
+        np.arange(len(df)), test_size=test_size, random_state=random_state, stratify=df[label_col]
+    )
+    order = np.concatenate([train_idx, test_idx])
+    feature_cols = [c for c in df.columns if c != label_col]
+
+    features = np.empty((len(df), len(feature_cols)), dtype=np.float32)
+    for j, col in enumerate(feature_cols):
+        features[:, j] = df[col].to_numpy()[order]
+    labels = df[label_col].to_numpy(dtype=np.float32)[order]
+
+    hospital_size = len(train_idx) // n_hospitals
+    ranges = []
+    for i in range(n_hospitals):
+        stop = (i + 1) * hospital_size if i < n_hospitals - 1 else len(train_idx)
+        ranges.append((i * hospital_size, stop))
+    ranges.append((len(train_idx), len(df)))
 
-    hospital_dataloaders = []
+    return features, labels, ranges
+
+
+def feature_stats(features, ranges, block_size=65536):
+    """
+    One-pass mean/std over the given row ranges (Welford/Chan merge of
+    per-block float64 moments), without materializing the concatenation.
+    Returns (mean, std, count) with population std like ndarray.std().
+    """
+    n_features = features.shape[1]
+    count = 0
+    mean = np.zeros(n_features, dtype=np.float64)
+    m2 = np.zeros(n_features, dtype=np.float64)
+
+    for start, stop in ranges:
+        for block_start in range(start, stop, block_size):
+            block = features[block_start:min(block_start + block_size, stop)]
+            n_b = len(block)
+            mean_b = block.mean(axis=0, dtype=np.float64)
+            m2_b = ((block - mean_b) ** 2).sum(axis=0)
+            delta = mean_b - mean
+            total = count + n_b
+            mean += delta * (n_b / total)
+            m2 += m2_b + delta ** 2 * (count * n_b / total)
+            count = total
+
+    std = np.sqrt(m2 / count) if count else np.ones(n_features)
+    return mean, std, count
+
+
+def prepare_matrix_dataloaders(features, labels, ranges, batch_size=32):
+    """
+    Build dataloaders over row ranges of one float32 matrix (see
+    split_frame_to_matrix). All but the last range are hospitals, the last is
+    the test set. Features are standardized in place with training stats and
+    every dataset is a torch.from_numpy view, so peak memory stays ~1x.
+    Returns (hospital_dataloaders, test_dataloader, stats) where stats holds
+    pos_weight and the feat_mean/feat_std used for standardization.
+    """
+    train_ranges, test_range = ranges[:-1], ranges[-1]
 
-    for hospital_df in hospital_dfs:
-        features = hospital_df.drop('high_risk', axis=1).values.astype(np.float32)
-        features = (features - feat_mean) / feat_std
-        labels = hospital_df['high_risk'].values.astype(np.float32)
+    # Compute standardization stats from all training data
+    feat_mean, feat_std, _ = feature_stats(features, train_ranges)
+    feat_std[feat_std == 0] = 1.0  # avoid division by zero
+    features -= feat_mean.astype(np.float32)
+    features /= feat_std.astype(np.float32)
 
+    def dataloader(start, stop, shuffle):
         dataset = MaternalHealthDataset(
-            torch.tensor(features),
-            torch.tensor(labels).unsqueeze(1)
+            torch.from_numpy(features[start:stop]),
+            torch.from_numpy(labels[start:stop]).unsqueeze(1)
         )
-        dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
-        hospital_dataloaders.append(dataloader)
+        return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle)
+
+    hospital_dataloaders = [dataloader(start, stop, True) for start, stop in train_ranges]
+    test_dataloader = dataloader(*test_range, False)
 
-    # Prepare test dataloader (standardized with training stats)
-    test_features = test_df.drop('high_risk', axis=1).values.astype(np.float32)
-    test_features = (test_features - feat_mean) / feat_std
-    test_labels = test_df['high_risk'].values.astype(np.float32)
+    # Compute pos_weight for class imbalance
+    n_train = train_ranges[-1][1] - train_ranges[0][0]
+    n_pos = float(labels[train_ranges[0][0]:train_ranges[-1][1]].sum())
+    n_neg = n_train - n_pos
+    pos_weight = float(n_neg / n_pos) if n_pos > 0 else 1.0
+
+    stats = {
+        'pos_weight': pos_weight,
+        'feat_mean': feat_mean.astype(np.float32),
+        'feat_std': feat_std.astype(np.float32),
+    }
+    return hospital_dataloaders, test_dataloader, stats
 
-    test_dataset = MaternalHealthDataset(
-        torch.tensor(test_features),
-        torch.tensor(test_labels).unsqueeze(1)
+
+def split_holdout(dataloader, holdout=0.2, batch_size=32):
+    """
+    Splits an in-memory hospital dataloader into (train, hold-out)
+    dataloaders over views of the same tensors; the last `holdout` fraction
+    of rows (already shuffled by split_frame_to_matrix) is held out.
+    """
+    dataset = dataloader.dataset
+    n_holdout = int(len(dataset) * holdout)
+    n_train = len(dataset) - n_holdout
+    train = MaternalHealthDataset(dataset.features[:n_train], dataset.labels[:n_train])
+    held_out = MaternalHealthDataset(dataset.features[n_train:], dataset.labels[n_train:])
+    return (
+        DataLoader(train, batch_size=batch_size, shuffle=True),
+        DataLoader(held_out, batch_size=batch_size, shuffle=False),
     )
-    test_dataloader = DataLoader(test_dataset, batch_size=batch_size, shuffle=False)
 
-    # Compute pos_weight for class imbalance
-    all_labels = all_train['high_risk']
-    n_pos = all_labels.sum()
-    n_neg = len(all_labels) - n_pos
+
+def prepare_dataloaders(hospital_dfs, test_df, batch_size=32):
+    """
+    Prepare PyTorch dataloaders for each hospital and test set.
+    Features are standardized (zero mean, unit variance) using training statistics.
+    """
+    frames = list(hospital_dfs) + [test_df]
+    feature_cols = [c for c in test_df.columns if c != 'high_risk']
+    n_rows = sum(len(df) for df in frames)
+
+    # Copy every frame once into its slice of a single contiguous matrix
+    features = np.empty((n_rows, len(feature_cols)), dtype=np.float32)
+    labels = np.empty(n_rows, dtype=np.float32)
+    ranges = []
+    start = 0
+    for df in frames:
+        stop = start + len(df)
+        features[start:stop] = df[feature_cols].to_numpy(dtype=np.float32)
+        labels[start:stop] = df['high_risk'].to_numpy(dtype=np.float32)
+        ranges.append((start, stop))
+        start = stop
+
+    hospital_dataloaders, test_dataloader, stats = prepare_matrix_dataloaders(
+        features, labels, ranges, batch_size=batch_size
+    )
+    return hospital_dataloaders, test_dataloader, stats['pos_weight']
+
+# Stream roles used to derive independent seeds for each simulated population
+STREAM_HOSPITAL, STREAM_TEST, STREAM_PILOT = 0, 1, 2
+
+
+def _stream_seed(random_state, role, index, chunk):
+    """Seed for one chunk of one stream; independent of every other chunk."""
+    return np.random.SeedSequence(random_state, spawn_key=(role, index, chunk))
+
+
+class SyntheticStreamDataset(IterableDataset):
+    """
+    Reproducible stream of calibrated synthetic records.
+
+    Records are generated chunk by chunk with `generate_calibrated_matrix`,
+    each chunk seeded from (random_state, role, index, chunk number), so the
+    same stream is replayed identically on every epoch and only one chunk
+    is ever held in memory. Yields ready-made (features, labels) batches;
+    wrap it in `DataLoader(dataset, batch_size=None)`. len() counts those
+    batches; the record count is `n_samples` (see num_samples).
+
+    Correlation shifts use per-chunk z-scores, so keep chunk_size large.
+    """
+
+    def __init__(self, n_samples, role, index=0, batch_size=32, chunk_size=65536,
+                 random_state=42, feat_mean=None, feat_std=None, cal=None):
+        self.n_samples = n_samples
+        self.role = role
+        self.index = index
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+        self.feat_mean = feat_mean
+        self.feat_std = feat_std
+        self.cal = _calibration(cal)
+
+    def __len__(self):
+        # Batches never span chunks, so every chunk ends with its own short batch
+        full, rest = divmod(self.n_samples, self.chunk_size)
+        return full * -(-self.chunk_size // self.batch_size) + -(-rest // self.batch_size)
+
+    def iter_chunks(self):
+        """Yield raw (features, labels) chunks; split across DataLoader workers."""
+        worker = get_worker_info()
+        n_chunks = (self.n_samples + self.chunk_size - 1) // self.chunk_size
+        for chunk in range(n_chunks):
+            if worker is not None and chunk % worker.num_workers != worker.id:
+                continue
+            size = min(self.chunk_size, self.n_samples - chunk * self.chunk_size)
+            seed = _stream_seed(self.random_state, self.role, self.index, chunk)
+            yield generate_calibrated_matrix(size, random_state=seed, cal=self.cal)
+
+    def __iter__(self):
+        for features, labels in self.iter_chunks():
+            if self.feat_mean is not None:
+                features -= self.feat_mean
+                features /= self.feat_std
+            features = torch.from_numpy(features)
+            labels = torch.from_numpy(labels.astype(np.float32)).unsqueeze(1)
+            for start in range(0, len(features), self.batch_size):
+                yield features[start:start + self.batch_size], labels[start:start + self.batch_size]
+
+
+def make_federated_streams(n_hospitals=3, samples_per_hospital=1000, test_samples=None,
+                           batch_size=32, chunk_size=65536, pilot_samples=100000, random_state=42):
+    """
+    Streaming counterpart of generate/split/prepare_dataloaders.
+
+    Standardization stats and pos_weight are estimated from an independent
+    pilot sample, so no hospital stream is ever materialized. Returns
+    (hospital_dataloaders, test_dataloader, stats) with the same dataloader
+    contract as `prepare_dataloaders`.
+    """
+    cal = _calibration()
+    if test_samples is None:
+        test_samples = samples_per_hospital
+
+    pilot_features, pilot_labels = generate_calibrated_matrix(
+        min(pilot_samples, n_hospitals * samples_per_hospital),
+        random_state=_stream_seed(random_state, STREAM_PILOT, 0, 0),
+        cal=cal
+    )
+    feat_mean = pilot_features.mean(axis=0, dtype=np.float64).astype(np.float32)
+    feat_std = pilot_features.std(axis=0, dtype=np.float64).astype(np.float32)
+    feat_std[feat_std == 0] = 1.0  # avoid division by zero
+    n_pos = int(pilot_labels.sum())
+    n_neg = len(pilot_labels) - n_pos
     pos_weight = float(n_neg / n_pos) if n_pos > 0 else 1.0
 
-    return hospital_dataloaders, test_dataloader, pos_weight
+    def stream(n, role, index):
+        dataset = SyntheticStreamDataset(
+            n, role, index,
+            batch_size=batch_size, chunk_size=chunk_size, random_state=random_state,
+            feat_mean=feat_mean, feat_std=feat_std, cal=cal
+        )
+        return DataLoader(dataset, batch_size=None)
+
+    hospital_dataloaders = [stream(samples_per_hospital, STREAM_HOSPITAL, i) for i in range(n_hospitals)]
+    test_dataloader = stream(test_samples, STREAM_TEST, 0)
+
+    stats = {
+        'pos_weight': pos_weight,
+        'high_risk_percentage': n_pos / len(pilot_labels) * 100,
+        'feat_mean': feat_mean,
+        'feat_std': feat_std,
+    }
+    return hospital_dataloaders, test_dataloader, stats
@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import socket
+import threading
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Optional, Dict, Any
+
+from config import config
+from app.data.storage import (
+    create_task,
+    mark_task_running,
+    finish_task,
+    get_task,
+    get_active_task,
+    list_active_tasks,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LocalTaskQueue:
+    """
+    In-process background task runner with task state persisted in SQLite.
+
+    Mirrors the Celery contract used by the API: `submit` returns a task id
+    immediately and `status` reports queued/running/success/failure with
+    the JSON result. Dispatcher threads pick up tasks; with
+    executor='process' the work itself runs in a child process so CPU-bound
+    jobs never compete with request handling for the GIL.
+    """
+
+    def __init__(self, max_workers: int = 1, executor: str = "thread"):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._dispatcher = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="artemis-task")
+        # spawn, not fork: forking a process that already runs torch/BLAS
+        # threads can deadlock the child
+        self._processes = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) if executor == "process" else None
+        self._lock = threading.Lock()
+        self._fail_orphaned_tasks()
+
+    def _fail_orphaned_tasks(self):
+        """Tasks left queued/running by a dead process on this host can never finish."""
+        host = socket.gethostname()
+        for task in list_active_tasks():
+            owner_host, _, pid = (task.get("owner") or "").rpartition(":")
+            if owner_host != host or not pid.isdigit():
+                continue
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                finish_task(task["id"], "failure", error="Interrupted: worker process exited")
+            except PermissionError:
+                pass
+
+    def submit(self, name: str, func: Callable[[], Any], dedupe: bool = True) -> str:
+        """
+        Queues `func` (a picklable, argument-free callable in process mode)
+        and returns its task id. With `dedupe`, an already queued or running
+        task of the same name is returned instead of starting another.
+        """
+        with self._lock:
+            if dedupe:
+                active = get_active_task(name)
+                if active:
+                    return active["id"]
+            task_id = uuid.uuid4().hex
+            create_task(task_id, name, owner=self.owner)
+        self._dispatcher.submit(self._run, task_id, name, func)
+        return task_id
+
+    def _run(self, task_id: str, name: str, func: Callable[[], Any]):
+        mark_task_running(task_id)
+        logger.info(f"Task {name} ({task_id}) started")
+        try:
+            if self._processes is not None:
+                result = self._processes.submit(func).result()
+            else:
+                result = func()
+        except Exception as e:
+            logger.error(f"Task {name} ({task_id}) failed: {e}")
+            finish_task(task_id, "failure", error=str(e))
+            return
+        finish_task(task_id, "success", result=result)
+        logger.info(f"Task {name} ({task_id}) finished")
+
+    @staticmethod
+    def status(task_id: str) -> Optional[Dict[str, Any]]:
+        return get_task(task_id)
+
+
+_queue: Optional[LocalTaskQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_task_queue() -> LocalTaskQueue:
+    """Process-wide queue, created on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = LocalTaskQueue(max_workers=config.TASK_WORKERS, executor=config.TASK_EXECUTOR)
+        return _queue
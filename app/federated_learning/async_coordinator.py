@@ -0,0 +1,160 @@
+import heapq
+import itertools
+
+import torch
+
+from app.federated_learning.coordinator import FederatedLearningCoordinator
+from app.federated_learning.privacy import PrivacyBudgetExceeded
+
+
+class AsyncFederatedCoordinator(FederatedLearningCoordinator):
+    """
+    Buffered asynchronous aggregation (FedBuff).
+
+    There is no round barrier: every hospital pulls the current global
+    model, trains one local epoch and pushes its update (the change from the
+    weights it pulled), then immediately pulls again. The coordinator keeps
+    a buffer; once `buffer_size` updates have arrived it applies
+
+        global += server_lr * sum(s(tau_i) * n_i * delta_i) / sum(n_i)
+
+    where tau_i is how many global versions were published since update i
+    was pulled and s(tau) = (1 + tau) ** -staleness_exponent. Updates older
+    than `max_staleness` versions are discarded. Each buffer flush is one
+    "round" (evaluated and recorded like a synchronous round).
+
+    Hospitals run on a simulated clock driven by `latency_model`, so fast
+    nodes contribute more often than slow ones instead of waiting for them.
+    A DP-SGD hospital whose epsilon budget is exhausted is retired instead
+    of pulling again; once no updates are left in flight, training stops
+    with stop_reason 'privacy_budget_exhausted'.
+    """
+
+    def __init__(self, hospital_nodes, test_dataloader, config, latency_model, feat_mean=None,
+                 feat_std=None, buffer_size=3, server_lr=1.0, staleness_exponent=0.5, max_staleness=None,
+                 federated_eval=False):
+        if buffer_size < 1:
+            raise ValueError(f"Async buffer size must be >= 1, got {buffer_size}")
+        if max_staleness is not None and max_staleness < 0:
+            raise ValueError(f"max_staleness must be >= 0, got {max_staleness}")
+        super().__init__(hospital_nodes, test_dataloader, config, feat_mean=feat_mean, feat_std=feat_std,
+                         latency_model=latency_model, federated_eval=federated_eval)
+        self.buffer_size = buffer_size
+        self.server_lr = server_lr
+        self.staleness_exponent = staleness_exponent
+        self.max_staleness = max_staleness
+        self.clock = 0.0
+        self.version = 0
+        self._sequence = itertools.count()
+        self._in_flight = []
+        self._started = False
+        self._pulls = 0
+        # Hospitals retired because another local epoch would exceed their epsilon budget
+        self.retired = set()
+
+    def _start_local_update(self, i):
+        """
+        Hospital i pulls the current global model; its update arrives after
+        its simulated latency. Returns False (and retires the hospital)
+        instead if its privacy budget does not allow another epoch.
+        """
+        hospital = self.hospital_nodes[i]
+        try:
+            hospital.check_privacy()
+        except PrivacyBudgetExceeded as e:
+            print(f"  Retiring hospital {i+1}: {e}")
+            self.retired.add(i)
+            return False
+        pulled = self.global_params()
+        hospital.initialize_model(self.global_model)
+        params, metrics = hospital.local_train()
+        self.track_privacy(i, metrics)
+        delta = [p - q for p, q in zip(self.receive_update(params, pulled), pulled)]
+        self._pulls += 1
+        duration = self.latency_model.sample({i: metrics['samples']})[i]
+        heapq.heappush(
+            self._in_flight,
+            (self.clock + duration, next(self._sequence), i, self.version, duration, delta, metrics)
+        )
+        return True
+
+    def staleness_weight(self, staleness):
+        return (1.0 + staleness) ** -self.staleness_exponent
+
+    def run_federated_round(self):
+        """Collect `buffer_size` updates as they arrive, then apply them to the global model"""
+        print(f"Starting async aggregation step {self.global_round + 1}")
+        if not self._started:
+            # Every hospital pulls the initial model at t=0
+            for i in range(len(self.hospital_nodes)):
+                self._start_local_update(i)
+            self._started = True
+        round_start = self.clock
+        buffer = []
+        node_times = {}
+        dropped = 0
+        bytes_uplink = 0
+
+        while len(buffer) < self.buffer_size:
+            if not self._in_flight:
+                # Every remaining hospital is retired: the buffer cannot fill
+                self.stop_reason = 'privacy_budget_exhausted'
+                break
+            arrival, _, i, pulled_version, duration, delta, metrics = heapq.heappop(self._in_flight)
+            self.clock = arrival
+            bytes_uplink += metrics['bytes_sent']
+            staleness = self.version - pulled_version
+            if self.max_staleness is not None and staleness > self.max_staleness:
+                dropped += 1
+            else:
+                buffer.append((i, staleness, delta, metrics))
+                node_times[str(i)] = round(duration, 6)
+            # The hospital pulls the latest global model and keeps training
+            self._start_local_update(i)
+
+        if not buffer:
+            print(f"  No updates left in flight ({len(self.retired)} hospitals out of privacy budget); stopping")
+            return None
+        total_samples = sum(metrics['samples'] for _, _, _, metrics in buffer)
+        with torch.no_grad():
+            for k, param in enumerate(self.global_model.parameters()):
+                update = sum(
+                    self.staleness_weight(staleness) * metrics['samples'] * delta[k]
+                    for _, staleness, delta, metrics in buffer
+                ) / total_samples
+                param.add_(torch.as_tensor(self.server_lr * update, dtype=param.dtype, device=param.device))
+        self.version += 1
+
+        stalenesses = [staleness for _, staleness, _, _ in buffer]
+        if len(buffer) < self.buffer_size:
+            print(f"  Only {len(buffer)} of {self.buffer_size} updates left in flight; applying them and stopping")
+            # Last step of the run: evaluate the final model
+            self._force_eval = True
+        print(f"  Applied {len(buffer)} updates (staleness {stalenesses}) at t={self.clock:.3f}s")
+        timing = {
+            'round_time': self.clock - round_start,
+            'node_times': node_times,
+            'dropped_updates': dropped,
+            # Updates computed against an older global model
+            'late_updates': sum(1 for staleness in stalenesses if staleness > 0),
+            'staleness': stalenesses,
+        }
+        avg_round_metrics = self.average_metrics(
+            [metrics for _, _, _, metrics in buffer],
+            [metrics['samples'] for _, _, _, metrics in buffer]
+        )
+        # Every arrival (kept or dropped) was uploaded; every restart downloaded the model
+        transport = {
+            'updates': len(buffer) + dropped,
+            'bytes_uplink': bytes_uplink,
+            'bytes_downlink': self._pulls * self.model_nbytes,
+        }
+        self._pulls = 0
+        participants = [i for i, _, _, _ in buffer]
+        return self.complete_round(avg_round_metrics, participants, timing, transport)
+
+    def privacy_stats(self):
+        stats = super().privacy_stats()
+        if stats is not None:
+            stats['retired'] = [str(i) for i in sorted(self.retired)]
+        return stats
@@ -0,0 +1,129 @@
+import math
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+METHODS = ('none', 'int8', 'int4', 'topk')
+
+
+def _quantize(x: np.ndarray, bits: int):
+    """Symmetric per-tensor quantization to signed `bits`-bit integers; int4 values are packed two per byte."""
+    levels = 2 ** (bits - 1) - 1
+    peak = float(np.abs(x).max()) if x.size else 0.0
+    scale = peak / levels if peak > 0 else 1.0
+    q = np.clip(np.rint(x / scale), -levels, levels).astype(np.int8)
+    if bits == 4:
+        nibbles = (q.reshape(-1) + 8).astype(np.uint8)
+        if nibbles.size % 2:
+            nibbles = np.append(nibbles, np.uint8(8))
+        q = nibbles[0::2] | (nibbles[1::2] << 4)
+    return {'q': q, 'scale': np.float32(scale)}
+
+
+def _dequantize(encoded, shape, bits: int) -> np.ndarray:
+    q = encoded['q']
+    if bits == 4:
+        nibbles = np.empty(q.size * 2, dtype=np.int8)
+        nibbles[0::2] = (q & 0x0F).astype(np.int8) - 8
+        nibbles[1::2] = (q >> 4).astype(np.int8) - 8
+        q = nibbles[:int(np.prod(shape))]
+    return (q.astype(np.float32) * encoded['scale']).reshape(shape)
+
+
+def _topk(x: np.ndarray, fraction: float):
+    """The ceil(fraction * n) largest-magnitude entries as (int32 flat indices, float32 values)."""
+    flat = x.reshape(-1)
+    k = min(flat.size, max(1, math.ceil(fraction * flat.size)))
+    indices = np.argpartition(np.abs(flat), flat.size - k)[flat.size - k:]
+    indices = np.sort(indices).astype(np.int32)
+    return {'indices': indices, 'values': flat[indices].astype(np.float32)}
+
+
+def _untopk(encoded, shape) -> np.ndarray:
+    flat = np.zeros(int(np.prod(shape)), dtype=np.float32)
+    flat[encoded['indices']] = encoded['values']
+    return flat.reshape(shape)
+
+
+class CompressedUpdate:
+    """A hospital's compressed model delta, as it would go over the wire."""
+
+    def __init__(self, method: str, tensors: List[tuple]):
+        self.method = method
+        self.tensors = tensors  # (shape, encoded) per parameter
+
+    @property
+    def nbytes(self) -> int:
+        """Payload size: encoded arrays plus one float32 scale per quantized tensor."""
+        return sum(
+            sum(np.asarray(value).nbytes for value in encoded.values())
+            for _, encoded in self.tensors
+        )
+
+    def decompress(self) -> List[np.ndarray]:
+        if self.method == 'topk':
+            return [_untopk(encoded, shape) for shape, encoded in self.tensors]
+        if self.method in ('int8', 'int4'):
+            bits = 8 if self.method == 'int8' else 4
+            return [_dequantize(encoded, shape, bits) for shape, encoded in self.tensors]
+        return [encoded['delta'].reshape(shape) for shape, encoded in self.tensors]
+
+
+class UpdateCompressor:
+    """
+    Node-side update compression. Each round the hospital sends
+    C(delta + residual), where delta is its change from the global model it
+    received; with error feedback the part lost to compression
+    (residual = delta + residual - decompressed) is kept on the node and
+    added to the next round's delta, so nothing is dropped permanently.
+    """
+
+    def __init__(self, method: str = 'int8', topk_fraction: float = 0.01, error_feedback: bool = True):
+        if method not in METHODS:
+            raise ValueError(f"Unknown compression method '{method}' (expected one of {METHODS})")
+        if not 0 < topk_fraction <= 1:
+            raise ValueError(f"topk_fraction must be in (0, 1], got {topk_fraction}")
+        self.method = method
+        self.topk_fraction = topk_fraction
+        self.error_feedback = error_feedback
+        self.residual: Optional[List[np.ndarray]] = None
+
+    def compress(self, delta: Sequence[np.ndarray]) -> CompressedUpdate:
+        delta = [np.asarray(d, dtype=np.float32) for d in delta]
+        if self.error_feedback and self.residual is not None:
+            delta = [d + r for d, r in zip(delta, self.residual)]
+
+        tensors = []
+        for d in delta:
+            if self.method == 'topk':
+                encoded = _topk(d, self.topk_fraction)
+            elif self.method in ('int8', 'int4'):
+                encoded = _quantize(d, 8 if self.method == 'int8' else 4)
+            else:
+                encoded = {'delta': d.reshape(-1)}
+            tensors.append((d.shape, encoded))
+        update = CompressedUpdate(self.method, tensors)
+
+        if self.error_feedback:
+            self.residual = [d - sent for d, sent in zip(delta, update.decompress())]
+        return update
+
+
+def build_compressor(options: Optional[dict], config) -> Optional[dict]:
+    """
+    Compressor settings from request options / config, or None to send full
+    weights. Each hospital gets its own UpdateCompressor(**settings), since
+    residuals are per node.
+    """
+    options = options or {}
+    method = options.get('method', config.UPDATE_COMPRESSION)
+    error_feedback = options.get('error_feedback', config.ERROR_FEEDBACK)
+    if not isinstance(error_feedback, bool):
+        raise ValueError(f"error_feedback must be true or false, got {error_feedback!r}")
+    settings = {
+        'method': method,
+        'topk_fraction': float(options.get('topk_fraction', config.TOPK_FRACTION)),
+        'error_feedback': error_feedback,
+    }
+    UpdateCompressor(**settings)  # validate
+    return None if method == 'none' and not options else settings
@@ -0,0 +1,105 @@
+import math
+from typing import Optional, Tuple
+
+MONITOR_METRICS = ('auc', 'accuracy', 'precision', 'recall', 'f1')
+
+
+class EvaluationSchedule:
+    """
+    Decides which rounds evaluate the global model: at least every `every`
+    rounds, and also as soon as the global update norm (L2 distance the
+    round moved the model) differs by more than `norm_change` (relative)
+    from the norm at the last evaluation. Rounds in between skip the test
+    pass entirely.
+    """
+
+    def __init__(self, every: int = 1, norm_change: Optional[float] = None):
+        if every < 1:
+            raise ValueError(f"Evaluation interval must be >= 1 round, got {every}")
+        if norm_change is not None and norm_change <= 0:
+            raise ValueError(f"norm_change must be positive, got {norm_change}")
+        self.every = every
+        self.norm_change = norm_change
+        self.rounds_since = 0
+        self.reference_norm = None
+
+    def due(self, update_norm: Optional[float], force: bool = False) -> bool:
+        self.rounds_since += 1
+        due = force or self.rounds_since >= self.every
+        if not due and self.norm_change is not None and update_norm is not None:
+            if self.reference_norm is None:
+                due = True
+            else:
+                change = abs(update_norm - self.reference_norm) / max(self.reference_norm, 1e-12)
+                due = change > self.norm_change
+        if due:
+            self.rounds_since = 0
+            self.reference_norm = update_norm
+        return due
+
+
+class ConvergenceMonitor:
+    """
+    Early stopping: stop once `patience` consecutive evaluations fail to
+    improve the best `metric` (higher is better) by more than `min_delta`.
+    """
+
+    def __init__(self, patience: int = 3, min_delta: float = 1e-3, metric: str = 'auc'):
+        if patience < 1:
+            raise ValueError(f"Patience must be >= 1 evaluation, got {patience}")
+        if metric not in MONITOR_METRICS:
+            raise ValueError(f"Unknown early stopping metric '{metric}'; expected one of {MONITOR_METRICS}")
+        self.patience = patience
+        self.min_delta = min_delta
+        self.metric = metric
+        self.best = -math.inf
+        self.best_round = None
+        self.stale = 0
+        self.stopped = False
+
+    def update(self, round_number: int, test_metrics: dict) -> bool:
+        """Records an evaluation; True once training should stop."""
+        value = test_metrics[self.metric]
+        if value > self.best + self.min_delta:
+            self.best = value
+            self.best_round = round_number
+            self.stale = 0
+        else:
+            self.stale += 1
+        self.stopped = self.stale >= self.patience
+        return self.stopped
+
+    def stats(self) -> dict:
+        return {
+            'metric': self.metric,
+            'best': self.best if self.best_round is not None else None,
+            'best_round': self.best_round,
+            'patience': self.patience,
+            'min_delta': self.min_delta,
+        }
+
+
+def build_convergence(options: Optional[dict],
+                      config) -> Tuple[EvaluationSchedule, Optional[ConvergenceMonitor]]:
+    """
+    (evaluation schedule, early stopping monitor or None) from /api/train
+    options / config: 'eval_every', 'eval_norm_change' and 'early_stopping'
+    (true or {'patience', 'min_delta', 'metric'}).
+    """
+    options = options or {}
+    norm_change = options.get('eval_norm_change', config.EVAL_NORM_CHANGE)
+    schedule = EvaluationSchedule(
+        every=int(options.get('eval_every', config.EVAL_EVERY)),
+        norm_change=float(norm_change) if norm_change is not None else None,
+    )
+
+    stopping = options.get('early_stopping', config.EARLY_STOPPING)
+    monitor = None
+    if stopping:
+        stopping = stopping if isinstance(stopping, dict) else {}
+        monitor = ConvergenceMonitor(
+            patience=int(stopping.get('patience', config.EARLY_STOPPING_PATIENCE)),
+            min_delta=float(stopping.get('min_delta', config.EARLY_STOPPING_MIN_DELTA)),
+            metric=stopping.get('metric', config.EARLY_STOPPING_METRIC),
+        )
+    return schedule, monitor
@@ -1,14 +1,46 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import torch
 import torch.nn as nn
 from app.data.storage import record_training_round
+from app.federated_learning.compression import CompressedUpdate
+from app.federated_learning.convergence import EvaluationSchedule
+from app.federated_learning.federated_eval import merge_statistics, metrics_from_statistics
+from app.federated_learning.hierarchical import accept_update, combine, reduce_region, weighted_sum
+from app.federated_learning.stragglers import RoundDeadline
 from app.models.model_utils import MaternalRiskModel, evaluate_model
 
 class FederatedLearningCoordinator:
-    def __init__(self, hospital_nodes, test_dataloader, config):
+    def __init__(self, hospital_nodes, test_dataloader, config, feat_mean=None, feat_std=None,
+                 scheduler=None, latency_model=None, deadline=None, aggregator=None, node_workers=1,
+                 federated_eval=False):
         self.hospital_nodes = hospital_nodes
         self.test_dataloader = test_dataloader
         self.config = config
+        # Optional ParticipationScheduler; None trains every hospital each round
+        self.scheduler = scheduler
+        # Optional straggler handling: simulated LatencyModel and/or RoundDeadline.
+        # A deadline without a latency model uses measured local training times.
+        self.latency_model = latency_model
+        self.deadline = deadline
+        self._latency_lock = threading.Lock()
+        # Optional HierarchicalAggregator: regional sub-aggregators train their own
+        # hospitals and reduce the updates as they arrive; None aggregates flat
+        self.aggregator = aggregator
+        if aggregator is not None and aggregator.executor == 'process' and not all(
+            hasattr(hospital, 'train_region') for hospital in hospital_nodes
+        ):
+            raise ValueError("The 'process' aggregation executor needs hospitals hosted on node servers "
+                             "(RemoteHospitalNode); use 'thread' for in-process hospitals")
+        # Hospitals trained concurrently per round (remote nodes train in their own processes)
+        self.node_workers = node_workers
+        # Evaluate on the hospitals' hold-out splits instead of test_dataloader
+        self.federated_eval = federated_eval
+        # Standardization applied to the training data; exported with the model
+        self.feat_mean = feat_mean
+        self.feat_std = feat_std
         self.global_model = MaternalRiskModel(
             config.INPUT_SIZE,
             config.HIDDEN_SIZE,
@@ -18,26 +50,57 @@ class FederatedLearningCoordinator:
         self.global_round = 0
         self.history = {
             'train_metrics': [],
-            'test_metrics': []
+            'test_metrics': [],
+            'participants': [],
+            'timing': [],
+            'transport': [],
+            'evaluation': []
         }
+        # Evaluation cadence / early stopping for the current training run
+        self.schedule = EvaluationSchedule()
+        self.monitor = None
+        self.run_stats = None
+        # Set by a round that ends training early for a reason other than convergence
+        self.stop_reason = None
+        self._force_eval = False
+        self._previous_params = self.global_params()
+        # Latest epsilon reported by each DP-SGD hospital
+        self.privacy_spent = {}
         
     def aggregate_parameters(self, all_params, sample_sizes):
-        """
-        Aggregate model parameters using Federated Averaging
-        """
-        # Calculate total samples
-        total_samples = sum(sample_sizes)
-        
-        # Initialize averaged parameters
-        averaged_params = []
-        for i in range(len(all_params[0])):
-            # Weighted average based on sample size
-            weighted_sum = np.zeros_like(all_params[0][i])
-            for j in range(len(all_params)):
-                weighted_sum += all_params[j][i] * sample_sizes[j]
-            averaged_params.append(weighted_sum / total_samples)
-            
-        return averaged_params
+        """Aggregate model parameters using Federated Averaging"""
+        # Weighted average based on sample size
+        return combine([weighted_sum(zip(all_params, sample_sizes))])
+    
+    @property
+    def model_nbytes(self):
+        """Size of the float32 global model each participant downloads per round"""
+        return sum(param.numel() * param.element_size() for param in self.global_model.parameters())
+    
+    def global_params(self):
+        return [param.detach().cpu().numpy().copy() for param in self.global_model.parameters()]
+    
+    @staticmethod
+    def receive_update(params, base_params):
+        """Full weights from a hospital's update (compressed deltas are applied to the weights it was sent)"""
+        if isinstance(params, CompressedUpdate):
+            return [base + delta for base, delta in zip(base_params, params.decompress())]
+        return params
+    
+    def transport_stats(self):
+        """Bytes moved so far, and uplink size relative to sending full float32 weights"""
+        transports = [t for t in self.history['transport'] if t is not None]
+        if not transports:
+            return None
+        updates = sum(t['updates'] for t in transports)
+        uplink = sum(t['bytes_uplink'] for t in transports)
+        return {
+            'rounds': len(transports),
+            'updates': updates,
+            'bytes_uplink': uplink,
+            'bytes_downlink': sum(t['bytes_downlink'] for t in transports),
+            'uplink_ratio': uplink / (updates * self.model_nbytes) if updates else None,
+        }
     
     def update_global_model(self, averaged_params):
         """Update the global model with averaged parameters"""
@@ -45,45 +108,262 @@ class FederatedLearningCoordinator:
             for param, avg_param in zip(self.global_model.parameters(), averaged_params):
                 param.data = torch.tensor(avg_param).to(self.config.DEVICE)
     
+    def select_participants(self, n_nodes):
+        """
+        {node index: aggregation weight} for this round. Without a scheduler
+        every node takes part and the weight (None) defaults to its sample count.
+        """
+        if self.scheduler is None:
+            return {i: None for i in range(n_nodes)}
+        return self.scheduler.select()
+    
+    def participation_stats(self):
+        return self.scheduler.stats() if self.scheduler is not None else None
+    
+    def resolve_arrivals(self, selected, sizes, measured_times=None):
+        """
+        Applies the round deadline to the selected updates. Returns
+        ({node: aggregation weight} for the updates that made it, timing or
+        None when straggler handling is off).
+        """
+        weights = {i: float(sizes[i]) if weight is None else weight for i, weight in selected.items()}
+        if self.latency_model is None and self.deadline is None:
+            return weights, None
+        if self.latency_model is not None:
+            arrivals = self.latency_model.sample({i: sizes[i] for i in selected})
+        else:
+            arrivals = measured_times
+        factors, timing = (self.deadline or RoundDeadline()).resolve(arrivals)
+        return {i: weights[i] * factor for i, factor in factors.items()}, timing
+    
+    def arrival_time(self, i, samples, measured):
+        """Node i's simulated arrival time, or its measured training time without a latency model"""
+        if self.latency_model is None:
+            return measured
+        with self._latency_lock:
+            return self.latency_model.sample({i: samples})[i]
+    
+    def track_privacy(self, i, metrics):
+        if 'epsilon' in metrics:
+            self.privacy_spent[i] = metrics['epsilon']
+    
+    def check_privacy(self, nodes):
+        """
+        Raises PrivacyBudgetExceeded before anyone trains if any of `nodes`
+        would exceed its epsilon budget, so no hospital spends budget on a
+        round that cannot complete.
+        """
+        for i in nodes:
+            self.hospital_nodes[i].check_privacy()
+    
+    def privacy_stats(self):
+        """Epsilon spent per DP-SGD hospital (cumulative across rounds), or None without DP"""
+        if not self.privacy_spent:
+            return None
+        return {
+            'epsilon': {str(i): epsilon for i, epsilon in sorted(self.privacy_spent.items())},
+            'max_epsilon': max(self.privacy_spent.values()),
+        }
+    
+    def timing_stats(self):
+        """Round-time distribution and late/dropped update totals so far"""
+        timings = [t for t in self.history['timing'] if t is not None]
+        if not timings:
+            return None
+        round_times = np.array([t['round_time'] for t in timings])
+        return {
+            'rounds': len(timings),
+            'total_time': float(round_times.sum()),
+            'mean_round_time': float(round_times.mean()),
+            'p50_round_time': float(np.percentile(round_times, 50)),
+            'p90_round_time': float(np.percentile(round_times, 90)),
+            'max_round_time': float(round_times.max()),
+            'dropped_updates': sum(t['dropped_updates'] for t in timings),
+            'late_updates': sum(t['late_updates'] for t in timings),
+        }
+    
+    def time_to_auc(self, target_auc):
+        """
+        Elapsed round time until the test AUC was first seen at or above
+        `target_auc` (None if never or untimed); only evaluated rounds count.
+        """
+        elapsed = 0.0
+        for timing, test_metrics in zip(self.history['timing'], self.history['test_metrics']):
+            if timing is None:
+                return None
+            elapsed += timing['round_time']
+            if test_metrics is not None and test_metrics['auc'] >= target_auc:
+                return elapsed
+        return None
+    
+    def train_node(self, i):
+        """Send hospital i the global model and train it; returns (params, metrics, seconds)"""
+        hospital = self.hospital_nodes[i]
+        start = time.perf_counter()
+        # Initialize the hospital model with the global model
+        hospital.initialize_model(self.global_model)
+        print(f"  Training on hospital {i+1}...")
+        params, metrics = hospital.local_train()
+        return params, metrics, time.perf_counter() - start
+    
     def run_federated_round(self):
         """Run one round of federated learning"""
         print(f"Starting federated round {self.global_round + 1}")
+        selected = self.select_participants(len(self.hospital_nodes))
+        self.check_privacy(selected)
+        
+        base_params = self.global_params()
+        if self.aggregator is not None:
+            averaged_params, round_metrics, timing = self.train_by_region(selected, base_params)
+        else:
+            averaged_params, round_metrics, timing = self.train_flat(selected, base_params)
         
-        # Initialize all hospital models with the global model
-        for hospital in self.hospital_nodes:
-            hospital.initialize_model(self.global_model)
+        if averaged_params is not None:
+            # Update global model
+            self.update_global_model(averaged_params)
+        else:
+            print("  No updates arrived before the deadline; global model unchanged")
         
-        # Train on each hospital's data
-        all_params = []
-        sample_sizes = []
+        participants = list(selected) if self.scheduler is not None else None
+        avg_round_metrics = self.average_metrics(round_metrics, [metrics['samples'] for metrics in round_metrics])
+        transport = {
+            'updates': len(round_metrics),
+            'bytes_uplink': sum(metrics['bytes_sent'] for metrics in round_metrics),
+            'bytes_downlink': len(round_metrics) * self.model_nbytes,
+        }
+        return self.complete_round(avg_round_metrics, participants, timing, transport)
+    
+    def train_flat(self, selected, base_params):
+        """
+        Train every selected hospital, collect all updates and average the
+        ones that arrived in time; returns (averaged params or None,
+        per-node metrics, timing).
+        """
+        # Train on each participating hospital's data
+        all_params = {}
+        sample_sizes = {}
+        measured_times = {}
         round_metrics = []
         
-        for i, hospital in enumerate(self.hospital_nodes):
-            print(f"  Training on hospital {i+1}...")
-            params, metrics = hospital.local_train()
-            all_params.append(params)
-            sample_sizes.append(metrics['samples'])
+        if self.node_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.node_workers) as pool:
+                results = list(pool.map(self.train_node, selected))
+        else:
+            results = [self.train_node(i) for i in selected]
+        
+        for i, (params, metrics, seconds) in zip(selected, results):
+            measured_times[i] = seconds
+            all_params[i] = self.receive_update(params, base_params)
+            sample_sizes[i] = metrics['samples']
             round_metrics.append(metrics)
+            self.track_privacy(i, metrics)
         
-        # Aggregate parameters
-        averaged_params = self.aggregate_parameters(all_params, sample_sizes)
+        # Keep the updates that arrived in time
+        accepted, timing = self.resolve_arrivals(selected, sample_sizes, measured_times)
+        averaged_params = None
+        if accepted:
+            # Aggregate parameters
+            averaged_params = self.aggregate_parameters(
+                [all_params[i] for i in accepted],
+                list(accepted.values())
+            )
+        return averaged_params, round_metrics, timing
+    
+    def train_by_region(self, selected, base_params):
+        """
+        Each regional sub-aggregator trains its selected hospitals and folds
+        every update into the region's exact weighted sum as it arrives, so
+        the root only combines one partial per region. The deadline factor
+        is applied per update on arrival (it depends only on that arrival
+        time). With the 'process' executor a region is trained and reduced
+        on the node server hosting it. Returns (averaged params or None,
+        per-node metrics, timing).
+        """
+        straggling = self.latency_model is not None or self.deadline is not None
+        deadline = self.deadline or RoundDeadline()
         
-        # Update global model
-        self.update_global_model(averaged_params)
+        def produce(i):
+            params, metrics, seconds = self.train_node(i)
+            self.track_privacy(i, metrics)
+            if straggling:
+                seconds = self.arrival_time(i, metrics['samples'], seconds)
+            return accept_update(params, metrics, seconds, selected[i], deadline if straggling else None, base_params)
         
-        # Evaluate global model on test set
-        test_metrics = self.evaluate_global_model()
+        def reduce_remote(region_nodes):
+            hospital = self.hospital_nodes[region_nodes[0]]
+            if any(self.hospital_nodes[i].address != hospital.address for i in region_nodes):
+                raise ValueError(f"Region of hospital {region_nodes[0]} spans several node servers")
+            arrivals = None
+            if self.latency_model is not None:
+                with self._latency_lock:
+                    arrivals = self.latency_model.sample({i: self.hospital_nodes[i].samples for i in region_nodes})
+                arrivals = [arrivals[i] for i in region_nodes]
+            print(f"  Training region of hospitals {region_nodes[0]+1}-{region_nodes[-1]+1} on {hospital.address}...")
+            partial, infos = hospital.train_region(
+                region_nodes, self.global_model, [selected[i] for i in region_nodes], arrivals,
+                deadline if straggling else None
+            )
+            for i, (metrics, _) in zip(region_nodes, infos):
+                self.track_privacy(i, metrics)
+            return partial, dict(zip(region_nodes, infos))
+        
+        if self.aggregator.executor == 'process':
+            reduce = reduce_remote
+        else:
+            reduce = lambda region_nodes: reduce_region(region_nodes, produce)
+        averaged_params, infos = self.aggregator.run(selected, reduce)
+        round_metrics = [infos[i][0] for i in selected]
+        timing = deadline.resolve({i: infos[i][1] for i in selected})[1] if straggling else None
+        return averaged_params, round_metrics, timing
+    
+    def update_norm(self):
+        """L2 distance the global model moved since the previous round"""
+        current = self.global_params()
+        norm = float(np.sqrt(sum(
+            np.sum(np.square(new - old, dtype=np.float64)) for new, old in zip(current, self._previous_params)
+        )))
+        self._previous_params = current
+        return norm
+    
+    def complete_round(self, avg_round_metrics, participants=None, timing=None, transport=None):
+        """Evaluate the updated global model if the schedule says so, then record and report the round"""
+        update_norm = self.update_norm()
+        test_metrics = None
+        evaluation = {'evaluated': False, 'update_norm': update_norm, 'eval_time': 0.0, 'stopped': False}
+        if self.schedule.due(update_norm, force=self._force_eval):
+            # Evaluate global model on test set
+            start = time.perf_counter()
+            test_metrics = self.evaluate_global_model()
+            evaluation['evaluated'] = True
+            evaluation['eval_time'] = time.perf_counter() - start
+            if self.monitor is not None:
+                evaluation['stopped'] = self.monitor.update(self.global_round + 1, test_metrics)
         
         # Record metrics
-        avg_round_metrics = self.average_metrics(round_metrics, sample_sizes)
         self.history['train_metrics'].append(avg_round_metrics)
         self.history['test_metrics'].append(test_metrics)
+        self.history['participants'].append(participants)
+        self.history['timing'].append(timing)
+        self.history['transport'].append(transport)
+        self.history['evaluation'].append(evaluation)
         
-        record_training_round(self.global_round + 1, avg_round_metrics, test_metrics)
+        record_training_round(self.global_round + 1, avg_round_metrics, test_metrics, participants, timing,
+                              transport, evaluation)
 
         print(f"Round {self.global_round + 1} completed:")
         print(f"  Train Loss: {avg_round_metrics['loss']:.4f}, Accuracy: {avg_round_metrics['accuracy']:.4f}")
-        print(f"  Test Accuracy: {test_metrics['accuracy']:.4f}, AUC: {test_metrics['auc']:.4f}")
+        if test_metrics is not None:
+            print(f"  Test Accuracy: {test_metrics['accuracy']:.4f}, AUC: {test_metrics['auc']:.4f}")
+        else:
+            print(f"  Evaluation skipped (update norm {update_norm:.4f})")
+        if evaluation['stopped']:
+            print(f"  Early stopping: no {self.monitor.metric} gain > {self.monitor.min_delta} "
+                  f"in {self.monitor.patience} evaluations")
+        if timing is not None:
+            print(f"  Round time: {timing['round_time']:.3f}s, late: {timing['late_updates']}, "
+                  f"dropped: {timing['dropped_updates']}")
+        if transport is not None:
+            print(f"  Bytes up: {transport['bytes_uplink']}, down: {transport['bytes_downlink']}")
         
         self.global_round += 1
         
@@ -91,6 +371,8 @@ class FederatedLearningCoordinator:
     
     def evaluate_global_model(self):
         """Evaluate the global model on the test set"""
+        if self.federated_eval:
+            return self.federated_evaluate()
         accuracy, precision, recall, f1, auc = evaluate_model(
             self.global_model,
             self.test_dataloader,
@@ -105,13 +387,26 @@ class FederatedLearningCoordinator:
             'auc': auc
         }
     
+    def federated_evaluate(self):
+        """
+        Each hospital scores its hold-out split in parallel and returns
+        sufficient statistics; merging them is O(bins), no central test set.
+        """
+        workers = max(1, min(len(self.hospital_nodes), max(self.node_workers, self.config.EVAL_WORKERS)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statistics = list(pool.map(
+                lambda hospital: hospital.evaluation_statistics(self.global_model),
+                self.hospital_nodes
+            ))
+        return metrics_from_statistics(merge_statistics(statistics))
+    
     def average_metrics(self, metrics_list, sample_sizes):
         """Calculate weighted average of metrics based on sample sizes"""
         total_samples = sum(sample_sizes)
         averaged_metrics = {}
         
         for key in metrics_list[0].keys():
-            if key == 'samples':
+            if key in ('samples', 'bytes_sent', 'epsilon'):
                 continue
             weighted_sum = 0
             for i, metrics in enumerate(metrics_list):
@@ -120,9 +415,51 @@ class FederatedLearningCoordinator:
             
         return averaged_metrics
     
-    def run_federated_training(self, rounds):
-        """Run multiple rounds of federated learning"""
-        for _ in range(rounds):
-            self.run_federated_round()
+    def run_federated_training(self, rounds, schedule=None, monitor=None):
+        """
+        Run up to `rounds` rounds of federated learning. `schedule` picks the
+        rounds that evaluate (default: every round; the last one always
+        does) and `monitor` stops training once the test metric plateaus.
+        """
+        self.schedule = schedule or EvaluationSchedule()
+        self.monitor = monitor
+        self.stop_reason = None
+        round_seconds = []
+        for r in range(rounds):
+            self._force_eval = r == rounds - 1
+            start = time.perf_counter()
+            # None: the round could not run (see stop_reason)
+            if self.run_federated_round() is not None:
+                round_seconds.append(time.perf_counter() - start)
+            if monitor is not None and monitor.stopped:
+                self.stop_reason = 'early_stopping'
+            if self.stop_reason is not None:
+                break
+        self._force_eval = False
+        self.run_stats = self.convergence_stats(rounds, round_seconds)
         
         return self.history
+    
+    def convergence_stats(self, rounds_requested, round_seconds):
+        """
+        Rounds and evaluations the last run skipped, and the wall time that
+        saved relative to evaluating every round for all requested rounds.
+        """
+        evaluations = self.history['evaluation'][len(self.history['evaluation']) - len(round_seconds):]
+        eval_times = [e['eval_time'] for e in evaluations if e['evaluated']]
+        mean_eval = sum(eval_times) / len(eval_times) if eval_times else 0.0
+        mean_train = (sum(round_seconds) - sum(eval_times)) / len(round_seconds) if round_seconds else 0.0
+        baseline = rounds_requested * (mean_train + mean_eval)
+        saved = max(0.0, baseline - sum(round_seconds))
+        return {
+            'rounds_requested': rounds_requested,
+            'rounds_run': len(round_seconds),
+            'stopped_early': len(round_seconds) < rounds_requested,
+            'evaluations': len(eval_times),
+            'evaluations_skipped': len(round_seconds) - len(eval_times),
+            'seconds': sum(round_seconds),
+            'estimated_seconds_saved': saved,
+            'estimated_saved_fraction': saved / baseline if baseline else 0.0,
+            'early_stopping': self.monitor.stats() if self.monitor is not None else None,
+            'stop_reason': self.stop_reason,
+        }
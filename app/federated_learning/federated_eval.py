@@ -0,0 +1,42 @@
+from typing import Dict, List
+
+import numpy as np
+
+COUNT_KEYS = ('samples', 'tp', 'fp', 'fn', 'tn', 'loss_sum')
+
+
+def merge_statistics(statistics: List[Dict]) -> Dict:
+    """Sums per-site evaluation statistics (see evaluation_statistics); O(bins) per site."""
+    merged = {key: sum(stats[key] for stats in statistics) for key in COUNT_KEYS}
+    merged['pos_hist'] = np.sum([np.asarray(stats['pos_hist']) for stats in statistics], axis=0)
+    merged['neg_hist'] = np.sum([np.asarray(stats['neg_hist']) for stats in statistics], axis=0)
+    return merged
+
+
+def histogram_auc(pos_hist: np.ndarray, neg_hist: np.ndarray) -> float:
+    """
+    ROC AUC from score histograms: each positive beats every negative in a
+    lower bin and ties (counts 1/2) with the negatives in its own bin.
+    Matches the exact AUC up to ties introduced by the bin width.
+    """
+    n_pos, n_neg = pos_hist.sum(), neg_hist.sum()
+    if n_pos == 0 or n_neg == 0:
+        return 0.0
+    neg_below = np.cumsum(neg_hist) - neg_hist
+    wins = (pos_hist * (neg_below + 0.5 * neg_hist)).sum()
+    return float(wins / (float(n_pos) * float(n_neg)))
+
+
+def metrics_from_statistics(stats: Dict) -> Dict:
+    """Same metrics as evaluate_global_model (sklearn definitions, zero_division=0), plus loss."""
+    tp, fp, fn, tn = stats['tp'], stats['fp'], stats['fn'], stats['tn']
+    total = stats['samples']
+    return {
+        'accuracy': (tp + tn) / total if total else 0.0,
+        'precision': tp / (tp + fp) if tp + fp else 0.0,
+        'recall': tp / (tp + fn) if tp + fn else 0.0,
+        'f1': 2 * tp / (2 * tp + fp + fn) if tp else 0.0,
+        'auc': histogram_auc(stats['pos_hist'], stats['neg_hist']),
+        'loss': stats['loss_sum'] / total if total else 0.0,
+        'samples': int(total),
+    }
@@ -0,0 +1,213 @@
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.federated_learning.compression import CompressedUpdate
+
+# Default regions: one sub-aggregator per state (as keyed in the AHR data) plus DC
+US_STATES = (
+    "AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "DC", "FL", "GA", "HI", "ID", "IL", "IN", "IA", "KS",
+    "KY", "LA", "ME", "MD", "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ", "NM", "NY",
+    "NC", "ND", "OH", "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV",
+    "WI", "WY",
+)
+
+
+def assign_regions(n_nodes: int, n_regions: Optional[int] = None) -> Dict[str, List[int]]:
+    """
+    Splits node indices into contiguous, balanced regions. Regions are the
+    US states by default (or the first `n_regions` of them); beyond 51
+    regions they are named region-0, region-1, ...
+    """
+    n_regions = min(n_regions or len(US_STATES), n_nodes)
+    names = US_STATES[:n_regions] if n_regions <= len(US_STATES) else [f"region-{k}" for k in range(n_regions)]
+    blocks = np.array_split(np.arange(n_nodes), n_regions)
+    return {name: block.tolist() for name, block in zip(names, blocks)}
+
+
+# Exact sums: every float64 term is split into 32-bit integer digits on a fixed
+# grid (2**32 down to 2**-96) and the digits are added as int64, so sums are
+# integer additions and do not depend on order or grouping. Terms must be below
+# 2**63 in magnitude; bits under 2**-96 are truncated per term, before summing.
+DIGIT_BITS = 32
+DIGIT_SHIFTS = (32, 0, -32, -64, -96)
+MAX_TERM = 2.0 ** 63
+
+
+def to_digits(x) -> np.ndarray:
+    """Exact fixed-point digits of float64 `x`: int64 array of shape (len(DIGIT_SHIFTS),) + x.shape."""
+    x = np.asarray(x, dtype=np.float64)
+    rest = np.abs(x)
+    if not np.all(rest < MAX_TERM):
+        raise ValueError("Aggregation terms must be finite and below 2**63 in magnitude")
+    digits = np.empty((len(DIGIT_SHIFTS),) + x.shape, dtype=np.int64)
+    digit = np.empty_like(rest)
+    for k, shift in enumerate(DIGIT_SHIFTS):
+        # Scaling by powers of two and truncating the magnitude keep every step exact
+        np.floor(np.multiply(rest, 2.0 ** -shift, out=digit), out=digit)
+        digits[k] = digit
+        rest -= np.multiply(digit, 2.0 ** shift, out=digit)
+    np.negative(digits, out=digits, where=x < 0)
+    return digits
+
+
+def from_digits(digits: np.ndarray) -> np.ndarray:
+    """float64 value of summed digits; the same exact sum always gives the same float."""
+    digits = digits.copy()
+    # Carry into canonical form (every digit but the top one in [0, 2**32))
+    for k in range(len(DIGIT_SHIFTS) - 1, 0, -1):
+        carry = digits[k] >> DIGIT_BITS
+        digits[k] -= carry << DIGIT_BITS
+        digits[k - 1] += carry
+    value = np.zeros(digits.shape[1:], dtype=np.float64)
+    for digit, shift in zip(digits, DIGIT_SHIFTS):
+        value += digit.astype(np.float64) * 2.0 ** shift
+    return value
+
+
+def weighted_sum(updates: Iterable[Tuple[Sequence[np.ndarray], float]]) -> Tuple[Optional[List[np.ndarray]], np.ndarray]:
+    """
+    Exact sum of weight * params over (params, weight) pairs and of the
+    weights, as fixed-point digits (see to_digits); (None, zero digits) for
+    no updates. Each product is rounded once to float64, then summed
+    exactly, so the average is bitwise identical however the updates are
+    grouped (flat or per region). `updates` may be a generator: each update
+    is added and released before the next is drawn.
+    """
+    flat, shapes, total = None, None, to_digits(0.0)
+    for params, weight in updates:
+        # One flat vector per update keeps the digit split to a few large numpy calls
+        vector = np.concatenate([np.ravel(p) for p in params]).astype(np.float64)
+        if flat is None:
+            shapes = [np.shape(p) for p in params]
+            flat = np.zeros((len(DIGIT_SHIFTS), vector.size), dtype=np.int64)
+        flat += to_digits(vector * weight)
+        total += to_digits(weight)
+    if flat is None:
+        return None, total
+    splits = np.cumsum([int(np.prod(shape)) for shape in shapes])[:-1]
+    return [part.reshape((len(DIGIT_SHIFTS),) + shape)
+            for part, shape in zip(np.split(flat, splits, axis=1), shapes)], total
+
+
+def combine(partials: Iterable[Tuple[Optional[List[np.ndarray]], np.ndarray]],
+            dtype=np.float32) -> Optional[List[np.ndarray]]:
+    """
+    Weighted average from (weighted sum, total weight) partials, or None if
+    they hold no weight; flat FedAvg is a single partial. Partials are added
+    as integers, so the average does not depend on how they were grouped.
+    """
+    partials = [(sums, total) for sums, total in partials if sums is not None]
+    if not partials:
+        return None
+    sums = [sum(parts) for parts in zip(*(partial_sums for partial_sums, _ in partials))]
+    total = float(from_digits(sum(partial_total for _, partial_total in partials)))
+    if total <= 0:
+        return None
+    return [(from_digits(s) / total).astype(dtype) for s in sums]
+
+
+def accept_update(params, metrics: dict, seconds: float, weight: Optional[float] = None, deadline=None,
+                  base_params=None):
+    """
+    (full params or None, aggregation weight, (metrics, seconds)) for one
+    trained update arriving after `seconds`. The weight defaults to the
+    node's sample count and is scaled by the deadline's factor (0 when the
+    update is dropped); compressed deltas are applied to `base_params`.
+    """
+    weight = float(metrics['samples']) if weight is None else weight
+    if deadline is not None:
+        weight *= deadline.factor(seconds) or 0.0
+    if weight <= 0:
+        return None, 0.0, (metrics, seconds)
+    if isinstance(params, CompressedUpdate):
+        params = [base + delta for base, delta in zip(base_params, params.decompress())]
+    return params, weight, (metrics, seconds)
+
+
+def reduce_region(nodes: Iterable, produce: Callable) -> Tuple[Tuple[Optional[List[np.ndarray]], np.ndarray], dict]:
+    """
+    One region's sub-aggregator. `produce(node)` trains a hospital and
+    returns (params, weight, info) (see accept_update); each update is
+    folded into the region's exact weighted sum as soon as it arrives and
+    updates with no weight are skipped. Returns the partial and {node: info}.
+    """
+    infos = {}
+
+    def updates():
+        for node in nodes:
+            params, weight, info = produce(node)
+            infos[node] = info
+            if weight > 0:
+                yield params, weight
+
+    return weighted_sum(updates()), infos
+
+
+class HierarchicalAggregator:
+    """
+    Two-level FedAvg for large federations.
+
+    Each region's sub-aggregator owns its hospitals: it trains them one
+    after another and folds every update into the region's exact
+    (weighted parameter sum, total weight) as soon as it arrives. With the
+    'process' executor the hospitals of a region live on one node server
+    and the region is reduced in that worker process, so only one partial
+    per region crosses to the coordinator; with 'thread' the regions run on
+    coordinator threads. Either way the root adds R partials and divides
+    once, and the average is bitwise identical to flat FedAvg (see
+    weighted_sum).
+    """
+
+    EXECUTORS = ("thread", "process")
+
+    def __init__(self, regions: Dict[str, List[int]], workers: int = 4, executor: str = "process"):
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown aggregation executor '{executor}' (expected one of {self.EXECUTORS})")
+        if workers < 1:
+            raise ValueError(f"Aggregation workers must be >= 1, got {workers}")
+        self.regions = regions
+        self.node_region = {node: region for region, nodes in regions.items() for node in nodes}
+        self.workers = workers
+        self.executor = executor
+        self._pool = None
+
+    def placement(self, addresses: Sequence[str]) -> Dict[int, str]:
+        """{node: node server address} keeping each region's hospitals on one server."""
+        return {
+            node: addresses[k % len(addresses)]
+            for k, nodes in enumerate(self.regions.values())
+            for node in nodes
+        }
+
+    @property
+    def pool(self):
+        # Threads only drive the regions: in 'process' mode each one waits on its node server
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            weakref.finalize(self, self._pool.shutdown, wait=False)
+        return self._pool
+
+    def run(self, nodes: Iterable[int], reduce: Callable) -> Tuple[Optional[List[np.ndarray]], dict]:
+        """
+        FedAvg over hospitals `nodes`. `reduce(region_nodes)` is one region's
+        sub-aggregator, returning (partial, {node: info}); regions run
+        concurrently. Returns (average or None when no update carried
+        weight, {node: info}).
+        """
+        by_region = {}
+        for node in nodes:
+            by_region.setdefault(self.node_region[node], []).append(node)
+        futures = [self.pool.submit(reduce, region_nodes) for region_nodes in by_region.values()]
+        results = [future.result() for future in futures]
+        infos = {}
+        for _, region_infos in results:
+            infos.update(region_infos)
+        return combine(partial for partial, _ in results), infos
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -1,16 +1,25 @@
 import torch
 import torch.nn as nn
 import copy
-from app.models.model_utils import train_model, evaluate_model
+from app.data.synthetic_data import num_samples
+from app.models.model_utils import train_model, train_model_dp, evaluate_model, evaluation_statistics
 
 class HospitalNode:
-    def __init__(self, node_id, dataloader, device, config, pos_weight=None):
+    def __init__(self, node_id, dataloader, device, config, pos_weight=None, compressor=None,
+                 eval_dataloader=None, privacy=None):
         self.node_id = node_id
         self.dataloader = dataloader
+        # Local hold-out split for federated evaluation
+        self.eval_dataloader = eval_dataloader
         self.device = device
         self.config = config
         self.model = None
         self.optimizer = None
+        # Optional UpdateCompressor: send compressed deltas instead of full weights
+        self.compressor = compressor
+        self.global_params = None
+        # Optional PrivacyAccountant: train with DP-SGD and track epsilon across rounds
+        self.privacy = privacy
         if pos_weight is not None:
             self.criterion = nn.BCEWithLogitsLoss(pos_weight=torch.tensor([pos_weight], device=device))
         else:
@@ -19,6 +28,8 @@ class HospitalNode:
     def initialize_model(self, model):
         """Initialize with the global model"""
         self.model = copy.deepcopy(model).to(self.device)
+        if self.compressor is not None:
+            self.global_params = [param.data.cpu().numpy().copy() for param in self.model.parameters()]
         self.optimizer = torch.optim.Adam(
             self.model.parameters(),
             lr=self.config.LEARNING_RATE
@@ -28,18 +39,32 @@ class HospitalNode:
         """Train on local data for one epoch"""
         if self.model is None:
             raise ValueError("Model not initialized. Call initialize_model first.")
-            
-        epoch_loss, accuracy, precision, recall, f1 = train_model(
-            self.model,
-            self.dataloader,
-            self.criterion,
-            self.optimizer,
-            self.device,
-            privacy_engine
-        )
+        
+        if self.privacy is not None:
+            if privacy_engine is not None:
+                raise ValueError("Node already trains with DP-SGD; do not pass a privacy engine.")
+            epoch_loss, accuracy, precision, recall, f1, epsilon = self.private_train()
+        else:
+            epsilon = None
+            epoch_loss, accuracy, precision, recall, f1 = train_model(
+                self.model,
+                self.dataloader,
+                self.criterion,
+                self.optimizer,
+                self.device,
+                privacy_engine
+            )
         
         # Get model parameters to send back to coordinator
         model_params = [param.data.cpu().numpy() for param in self.model.parameters()]
+        if self.compressor is not None:
+            # Compressed change from the received global model (a CompressedUpdate)
+            model_params = self.compressor.compress(
+                [p - g for p, g in zip(model_params, self.global_params)]
+            )
+            bytes_sent = model_params.nbytes
+        else:
+            bytes_sent = sum(p.nbytes for p in model_params)
         
         metrics = {
             'loss': epoch_loss,
@@ -47,10 +72,40 @@ class HospitalNode:
             'precision': precision,
             'recall': recall,
             'f1': f1,
-            'samples': len(self.dataloader.dataset)
+            'samples': num_samples(self.dataloader.dataset),
+            'bytes_sent': bytes_sent
         }
+        if epsilon is not None:
+            metrics['epsilon'] = epsilon
         
         return model_params, metrics
+    
+    def check_privacy(self):
+        """Raises PrivacyBudgetExceeded if the next local epoch would exceed the epsilon budget"""
+        if self.privacy is not None:
+            self.privacy.check(*self.privacy.schedule(num_samples(self.dataloader.dataset), self.config.BATCH_SIZE))
+    
+    def private_train(self):
+        """One DP-SGD epoch over the local data; refuses to start if it would exceed the epsilon budget"""
+        dataset = self.dataloader.dataset
+        if not hasattr(dataset, 'features'):
+            raise ValueError("DP-SGD needs an in-memory local dataset for Poisson sampling.")
+        sample_rate, steps = self.privacy.schedule(len(dataset), self.config.BATCH_SIZE)
+        self.privacy.check(sample_rate, steps)
+        results = train_model_dp(
+            self.model,
+            dataset.features,
+            dataset.labels,
+            self.criterion,
+            self.optimizer,
+            self.device,
+            self.privacy.noise_multiplier,
+            self.privacy.max_grad_norm,
+            sample_rate,
+            steps,
+            method=self.config.DP_GRADIENT_METHOD
+        )
+        return results + (self.privacy.spend(sample_rate, steps),)
         
     def evaluate(self):
         """Evaluate the model on local data"""
@@ -69,5 +124,17 @@ class HospitalNode:
             'recall': recall,
             'f1': f1,
             'auc': auc,
-            'samples': len(self.dataloader.dataset)
+            'samples': num_samples(self.dataloader.dataset)
         }
+    
+    def evaluation_statistics(self, model):
+        """Sufficient statistics of `model` (the global model) on the local hold-out split"""
+        if self.eval_dataloader is None:
+            raise ValueError("No local hold-out split for federated evaluation.")
+        return evaluation_statistics(
+            model,
+            self.eval_dataloader,
+            self.device,
+            self.criterion,
+            bins=self.config.EVAL_HISTOGRAM_BINS
+        )
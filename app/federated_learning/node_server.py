@@ -0,0 +1,185 @@
+import argparse
+import copy
+import logging
+import socket
+import socketserver
+import threading
+import time
+
+import torch
+from torch.utils.data import DataLoader
+
+from app.data.storage import init_db
+from app.data.synthetic_data import MaternalHealthDataset
+from app.federated_learning.compression import UpdateCompressor
+from app.federated_learning.hierarchical import accept_update, reduce_region
+from app.federated_learning.hospital_node import HospitalNode
+from app.federated_learning.privacy import PrivacyAccountant
+from app.federated_learning.rpc import recv_message, send_message
+from app.federated_learning.stragglers import RoundDeadline
+from app.models.model_utils import MaternalRiskModel
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class NodeService:
+    """
+    The hospital side of the RPC: hosts any number of HospitalNodes (keyed
+    by node id) in this process and runs the calls the coordinator's
+    RemoteHospitalNode proxies send.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.templates = {}
+        self.locks = {}
+        self._lock = threading.Lock()
+
+    def setup(self, node_id, features, labels, pos_weight=None, compression=None, settings=None,
+              eval_features=None, eval_labels=None, privacy=None):
+        """
+        Creates node `node_id` over its local data (and optional hold-out
+        split). `settings` overrides model/training config values so every
+        node matches the coordinator.
+        """
+        node_config = copy.copy(config)
+        for key, value in (settings or {}).items():
+            setattr(node_config, key, value)
+        dataset = MaternalHealthDataset(torch.from_numpy(features), torch.from_numpy(labels))
+        eval_dataloader = None
+        if eval_features is not None:
+            eval_dataloader = DataLoader(
+                MaternalHealthDataset(torch.from_numpy(eval_features), torch.from_numpy(eval_labels)),
+                batch_size=node_config.BATCH_SIZE
+            )
+        node = HospitalNode(
+            node_id=node_id,
+            dataloader=DataLoader(dataset, batch_size=node_config.BATCH_SIZE, shuffle=True),
+            device=node_config.DEVICE,
+            config=node_config,
+            pos_weight=pos_weight,
+            compressor=UpdateCompressor(**compression) if compression is not None else None,
+            eval_dataloader=eval_dataloader,
+            privacy=PrivacyAccountant(node_id, **privacy) if privacy is not None else None
+        )
+        template = MaternalRiskModel(
+            node_config.INPUT_SIZE,
+            node_config.HIDDEN_SIZE,
+            node_config.OUTPUT_SIZE,
+            node_config.DROPOUT_RATE
+        ).to(node_config.DEVICE)
+        with self._lock:
+            self.nodes[node_id] = node
+            self.templates[node_id] = template
+            self.locks[node_id] = threading.Lock()
+        logger.info(f"Node {node_id} ready with {len(dataset)} samples")
+        return {"samples": len(dataset)}
+
+    def _load_template(self, node_id, params):
+        template = self.templates[node_id]
+        with torch.no_grad():
+            for param, value in zip(template.parameters(), params):
+                param.copy_(torch.from_numpy(value))
+        return template
+
+    def initialize_model(self, node_id, params):
+        self.nodes[node_id].initialize_model(self._load_template(node_id, params))
+
+    def evaluation_statistics(self, node_id, params):
+        return self.nodes[node_id].evaluation_statistics(self._load_template(node_id, params))
+
+    def local_train(self, node_id):
+        return list(self.nodes[node_id].local_train())
+
+    def train_region(self, node_ids, params, weights, arrivals=None, deadline=None):
+        """
+        Sub-aggregator for a region hosted here: trains each node from
+        `params` in turn and folds its update into the region's exact
+        weighted sum, so only the partial goes back to the coordinator.
+        """
+        deadline = RoundDeadline(**deadline) if deadline is not None else None
+
+        def produce(k):
+            node_id = node_ids[k]
+            with self.locks[node_id]:
+                start = time.perf_counter()
+                self.initialize_model(node_id, params)
+                update, metrics = self.nodes[node_id].local_train()
+                seconds = time.perf_counter() - start
+            if arrivals is not None:
+                seconds = arrivals[k]
+            return accept_update(update, metrics, seconds, weights[k], deadline, params)
+
+        (sums, total), infos = reduce_region(range(len(node_ids)), produce)
+        return {"sums": sums, "total": total, "infos": [list(infos[k]) for k in range(len(node_ids))]}
+
+    def check_privacy(self, node_id):
+        self.nodes[node_id].check_privacy()
+
+    def evaluate(self, node_id):
+        return self.nodes[node_id].evaluate()
+
+    def dispatch(self, method, kwargs):
+        if method == "ping":
+            return {"nodes": sorted(self.nodes)}
+        if method not in ("setup", "initialize_model", "local_train", "train_region", "check_privacy",
+                          "evaluate", "evaluation_statistics"):
+            raise ValueError(f"Unknown method '{method}'")
+        if method == "setup":
+            return self.setup(**kwargs)
+        if method == "train_region":
+            # Takes each node's lock as it trains it
+            return self.train_region(**kwargs)
+        # One call at a time per node; different nodes run concurrently
+        with self.locks[kwargs["node_id"]]:
+            return getattr(self, method)(**kwargs)
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    """Serves one persistent coordinator connection until it closes."""
+
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                reply = {"ok": True, "result": self.server.service.dispatch(message["method"], message["kwargs"])}
+            except Exception as e:
+                logger.error(f"{message.get('method')} failed: {e}")
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}", "code": getattr(e, "rpc_code", None)}
+            send_message(self.request, reply)
+
+
+class NodeServer(socketserver.ThreadingTCPServer):
+    """TCP node server: a thread per connection, nodes shared across connections."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _ConnectionHandler)
+        self.service = NodeService()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve hospital nodes to a remote coordinator")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=config.NODE_SERVER_BASE_PORT)
+    parser.add_argument('--threads', type=int, default=1, help="torch intra-op threads for this process")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    torch.set_num_threads(args.threads)
+    # Privacy accountants are persisted on the hospital side
+    init_db()
+    with NodeServer((args.host, args.port)) as server:
+        logger.info(f"Node server listening on {args.host}:{server.server_address[1]}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
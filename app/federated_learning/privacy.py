@@ -0,0 +1,121 @@
+import logging
+import math
+from typing import List, Optional, Tuple
+
+from opacus.accountants import RDPAccountant
+
+from app.data.storage import get_privacy_accountant, save_privacy_accountant
+
+logger = logging.getLogger(__name__)
+
+
+class PrivacyBudgetExceeded(RuntimeError):
+    """Another local epoch would take a hospital past its epsilon budget."""
+
+    # Error code node servers put in the RPC reply, so proxies can re-raise it
+    rpc_code = "privacy_budget_exceeded"
+
+
+class PrivacyAccountant:
+    """
+    A hospital's DP-SGD settings and RDP accountant. The accountant history
+    ((noise_multiplier, sample_rate, steps) entries) is loaded from and saved
+    to the database under the node id, so epsilon keeps accumulating across
+    rounds, training runs and restarts instead of resetting per round.
+    """
+
+    def __init__(self, node_id, noise_multiplier: float = 1.1, max_grad_norm: float = 1.0,
+                 delta: float = 1e-5, epsilon_budget: Optional[float] = None, persist: bool = True):
+        if noise_multiplier <= 0:
+            raise ValueError(f"noise_multiplier must be positive, got {noise_multiplier}")
+        if max_grad_norm <= 0:
+            raise ValueError(f"max_grad_norm must be positive, got {max_grad_norm}")
+        if not 0 < delta < 1:
+            raise ValueError(f"delta must be in (0, 1), got {delta}")
+        if epsilon_budget is not None and epsilon_budget <= 0:
+            raise ValueError(f"epsilon_budget must be positive, got {epsilon_budget}")
+        self.node_id = node_id
+        self.noise_multiplier = noise_multiplier
+        self.max_grad_norm = max_grad_norm
+        self.delta = delta
+        self.epsilon_budget = epsilon_budget
+        self.persist = persist
+        self.history: List[Tuple[float, float, int]] = []
+        if persist:
+            state = get_privacy_accountant(node_id)
+            if state is not None:
+                self.history = [tuple(entry) for entry in state["history"]]
+
+    @property
+    def steps(self) -> int:
+        return sum(steps for _, _, steps in self.history)
+
+    def _epsilon(self, history) -> float:
+        if not history:
+            return 0.0
+        accountant = RDPAccountant()
+        accountant.history = list(history)
+        return float(accountant.get_epsilon(self.delta))
+
+    @property
+    def epsilon(self) -> float:
+        """Epsilon spent so far at this accountant's delta."""
+        return self._epsilon(self.history)
+
+    def _extended(self, sample_rate: float, steps: int):
+        history = list(self.history)
+        if history and history[-1][:2] == (self.noise_multiplier, sample_rate):
+            history[-1] = (self.noise_multiplier, sample_rate, history[-1][2] + steps)
+        else:
+            history.append((self.noise_multiplier, sample_rate, steps))
+        return history
+
+    def check(self, sample_rate: float, steps: int):
+        """Raises PrivacyBudgetExceeded if `steps` more DP-SGD steps would exceed the budget."""
+        if self.epsilon_budget is None:
+            return
+        epsilon = self._epsilon(self._extended(sample_rate, steps))
+        if epsilon > self.epsilon_budget:
+            raise PrivacyBudgetExceeded(
+                f"Hospital {self.node_id} would reach epsilon {epsilon:.3f} "
+                f"(budget {self.epsilon_budget}, spent {self.epsilon:.3f})"
+            )
+
+    def spend(self, sample_rate: float, steps: int) -> float:
+        """Records `steps` DP-SGD steps at `sample_rate`; returns the epsilon spent so far."""
+        self.history = self._extended(sample_rate, steps)
+        epsilon = self.epsilon
+        if self.persist:
+            save_privacy_accountant(self.node_id, [list(entry) for entry in self.history], self.steps,
+                                    epsilon, self.delta)
+        logger.info(f"Hospital {self.node_id}: epsilon {epsilon:.3f} (delta {self.delta}) after {self.steps} steps")
+        return epsilon
+
+    @staticmethod
+    def schedule(n_samples: int, batch_size: int) -> Tuple[float, int]:
+        """(Poisson sample rate, steps) for one local epoch at an expected `batch_size`."""
+        sample_rate = min(1.0, batch_size / n_samples)
+        return sample_rate, math.ceil(1 / sample_rate)
+
+
+def build_privacy(options, config) -> Optional[dict]:
+    """
+    DP-SGD settings from request options (true or {'noise_multiplier',
+    'max_grad_norm', 'delta', 'epsilon_budget'}) / config, or None when
+    differential privacy is off. Each hospital gets its own
+    PrivacyAccountant(node_id, **settings).
+    """
+    if options is None:
+        options = config.DIFFERENTIAL_PRIVACY
+    if not options:
+        return None
+    options = options if isinstance(options, dict) else {}
+    budget = options.get('epsilon_budget', config.DP_EPSILON_BUDGET)
+    settings = {
+        'noise_multiplier': float(options.get('noise_multiplier', config.NOISE_MULTIPLIER)),
+        'max_grad_norm': float(options.get('max_grad_norm', config.MAX_GRAD_NORM)),
+        'delta': float(options.get('delta', config.DELTA)),
+        'epsilon_budget': float(budget) if budget is not None else None,
+    }
+    PrivacyAccountant(None, persist=False, **settings)  # validate
+    return settings
@@ -0,0 +1,176 @@
+import atexit
+import logging
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+from app.federated_learning.privacy import PrivacyBudgetExceeded
+from app.federated_learning.rpc import RpcClient, RpcError
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Config values a node server must share with the coordinator
+NODE_SETTINGS = (
+    "INPUT_SIZE", "HIDDEN_SIZE", "OUTPUT_SIZE", "DROPOUT_RATE", "LEARNING_RATE", "BATCH_SIZE", "EVAL_HISTOGRAM_BINS",
+    "DP_GRADIENT_METHOD",
+)
+
+
+class RemoteHospitalNode:
+    """
+    Coordinator-side proxy for a HospitalNode hosted by a node server
+    (app.federated_learning.node_server). Same initialize_model /
+    local_train / evaluate interface; weights and updates travel as binary
+    tensor frames over a persistent connection, one per proxy so nodes can
+    be driven concurrently.
+    """
+
+    def __init__(self, node_id, address: str, timeout: Optional[float] = None):
+        self.node_id = node_id
+        self.address = address
+        self.client = RpcClient(address, timeout=timeout if timeout is not None else config.NODE_RPC_TIMEOUT)
+        self.samples = None
+        self.private = False
+
+    def setup(self, features, labels, pos_weight=None, compression=None, node_config=None,
+              eval_features=None, eval_labels=None, privacy=None):
+        """
+        Ships the node its local data and hold-out split (simulation) and
+        training settings. With `privacy` (DP-SGD settings) the node server
+        keeps and persists the hospital's privacy accountant.
+        """
+        node_config = node_config or config
+        result = self.client.call(
+            "setup",
+            node_id=self.node_id,
+            features=features,
+            labels=labels,
+            eval_features=eval_features,
+            eval_labels=eval_labels,
+            pos_weight=pos_weight,
+            compression=compression,
+            privacy=privacy,
+            settings={key: getattr(node_config, key) for key in NODE_SETTINGS},
+        )
+        self.samples = result["samples"]
+        self.private = privacy is not None
+        return self
+
+    def _call(self, method, **kwargs):
+        """client.call, re-raising a node's PrivacyBudgetExceeded as such"""
+        try:
+            return self.client.call(method, **kwargs)
+        except RpcError as e:
+            if e.code == PrivacyBudgetExceeded.rpc_code:
+                raise PrivacyBudgetExceeded(str(e)) from e
+            raise
+
+    @staticmethod
+    def _params(model):
+        return [param.detach().cpu().numpy() for param in model.parameters()]
+
+    def initialize_model(self, model):
+        self.client.call("initialize_model", node_id=self.node_id, params=self._params(model))
+
+    def local_train(self, privacy_engine=None):
+        if privacy_engine is not None:
+            raise ValueError("Remote nodes manage their own privacy engine")
+        params, metrics = self._call("local_train", node_id=self.node_id)
+        return params, metrics
+
+    def train_region(self, node_ids, model, weights, arrivals=None, deadline=None):
+        """
+        Trains hospitals `node_ids` (all hosted on this node's server) from
+        `model` and reduces their updates on the server (see
+        hierarchical.reduce_region). `weights` are per-node aggregation
+        weights (None: sample count); `arrivals` optional simulated arrival
+        times, else measured training times, checked against `deadline`.
+        Returns (partial, [(metrics, seconds) per node]).
+        """
+        result = self._call(
+            "train_region",
+            node_ids=list(node_ids),
+            params=self._params(model),
+            weights=list(weights),
+            arrivals=arrivals,
+            deadline={'seconds': deadline.seconds, 'policy': deadline.policy, 'grace': deadline.grace}
+            if deadline is not None else None,
+        )
+        return (result["sums"], result["total"]), [tuple(info) for info in result["infos"]]
+
+    def check_privacy(self):
+        if self.private:
+            self._call("check_privacy", node_id=self.node_id)
+
+    def evaluate(self):
+        return self.client.call("evaluate", node_id=self.node_id)
+
+    def evaluation_statistics(self, model):
+        return self.client.call("evaluation_statistics", node_id=self.node_id, params=self._params(model))
+
+    def close(self):
+        self.client.close()
+
+
+class LocalNodeCluster:
+    """Node server processes on this machine, for testing the remote path on one box."""
+
+    def __init__(self, n_processes: int, base_port: Optional[int] = None, host: str = "127.0.0.1"):
+        base_port = base_port or config.NODE_SERVER_BASE_PORT
+        self.addresses = [f"{host}:{base_port + k}" for k in range(n_processes)]
+        self.processes = [
+            subprocess.Popen(
+                [sys.executable, "-m", "app.federated_learning.node_server", "--host", host, "--port", str(base_port + k)],
+                cwd=config.BASE_DIR,
+                stdout=subprocess.DEVNULL,
+            )
+            for k in range(n_processes)
+        ]
+        atexit.register(self.stop)
+        self._wait_ready()
+
+    def _wait_ready(self, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        for address, process in zip(self.addresses, self.processes):
+            client = RpcClient(address, timeout=5)
+            while True:
+                if process.poll() is not None:
+                    self.stop()
+                    raise RuntimeError(f"Node server {address} exited with code {process.returncode}")
+                try:
+                    client.call("ping")
+                    break
+                except RpcError:
+                    if time.monotonic() > deadline:
+                        self.stop()
+                        raise RuntimeError(f"Node server {address} did not start within {timeout}s")
+                    time.sleep(0.2)
+            client.close()
+        logger.info(f"Started {len(self.processes)} local node servers: {self.addresses}")
+
+    def stop(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+_cluster: Optional[LocalNodeCluster] = None
+
+
+def get_local_cluster(n_processes: int) -> List[str]:
+    """Addresses of `n_processes` local node servers, (re)starting them if needed."""
+    global _cluster
+    if _cluster is None or len(_cluster.processes) != n_processes or any(
+        process.poll() is not None for process in _cluster.processes
+    ):
+        if _cluster is not None:
+            _cluster.stop()
+        _cluster = LocalNodeCluster(n_processes)
+    return _cluster.addresses
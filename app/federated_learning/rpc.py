@@ -0,0 +1,166 @@
+import json
+import socket
+import struct
+import threading
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.federated_learning.compression import CompressedUpdate
+
+# Frame: MAGIC, uint32 header length, JSON header, then the raw bytes of every
+# tensor the header describes, back to back. Tensors are written straight from
+# the arrays' buffers (sendmsg scatter/gather) and read straight into freshly
+# allocated arrays (recv_into), so payloads are never copied into a message.
+MAGIC = b"ARPC"
+PREFIX = struct.Struct("!4sI")
+# sendmsg accepts at most IOV_MAX buffers per call
+MAX_IOV = 512
+
+
+class RpcError(RuntimeError):
+    """
+    A remote call failed: the node raised, or the connection broke. `code`
+    is the error code the node sent with the exception, if any.
+    """
+
+    def __init__(self, message: str, code: Optional[str] = None):
+        super().__init__(message)
+        self.code = code
+
+
+def _encode(value: Any, tensors: List[np.ndarray]) -> Any:
+    """JSON-able copy of `value` with arrays replaced by references into `tensors`."""
+    if isinstance(value, np.generic):
+        # Scalars travel in the header with their exact dtype
+        return {"__scalar__": value.dtype.str, "value": value.item()}
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        tensors.append(array)
+        return {"__tensor__": len(tensors) - 1}
+    if isinstance(value, CompressedUpdate):
+        return {
+            "__compressed__": value.method,
+            "tensors": [[list(shape), _encode(encoded, tensors)] for shape, encoded in value.tensors],
+        }
+    if isinstance(value, dict):
+        return {key: _encode(item, tensors) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item, tensors) for item in value]
+    return value
+
+
+def _decode(value: Any, tensors: List[np.ndarray]) -> Any:
+    if isinstance(value, dict):
+        if "__tensor__" in value:
+            return tensors[value["__tensor__"]]
+        if "__scalar__" in value:
+            return np.dtype(value["__scalar__"]).type(value["value"])
+        if "__compressed__" in value:
+            return CompressedUpdate(
+                value["__compressed__"],
+                [(tuple(shape), _decode(encoded, tensors)) for shape, encoded in value["tensors"]],
+            )
+        return {key: _decode(item, tensors) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item, tensors) for item in value]
+    return value
+
+
+def _sendall(sock: socket.socket, buffers: List[memoryview]):
+    """sendmsg until every buffer is written, resuming after partial sends."""
+    buffers = [buffer for buffer in buffers if buffer.nbytes]
+    while buffers:
+        sent = sock.sendmsg(buffers[:MAX_IOV])
+        while sent:
+            if sent >= buffers[0].nbytes:
+                sent -= buffers[0].nbytes
+                buffers.pop(0)
+            else:
+                buffers[0] = buffers[0][sent:]
+                sent = 0
+
+
+def _recv_into(sock: socket.socket, view: memoryview):
+    while view.nbytes:
+        received = sock.recv_into(view)
+        if received == 0:
+            raise ConnectionError("Connection closed mid-frame")
+        view = view[received:]
+
+
+def send_message(sock: socket.socket, message: Any):
+    tensors: List[np.ndarray] = []
+    body = _encode(message, tensors)
+    header = json.dumps({
+        "body": body,
+        "tensors": [[array.dtype.str, list(array.shape)] for array in tensors],
+    }).encode()
+    buffers = [memoryview(PREFIX.pack(MAGIC, len(header))), memoryview(header)]
+    buffers += [memoryview(array).cast("B") for array in tensors if array.size]
+    _sendall(sock, buffers)
+
+
+def recv_message(sock: socket.socket) -> Any:
+    """Next message, or raises ConnectionError if the peer closed the connection."""
+    prefix = bytearray(PREFIX.size)
+    _recv_into(sock, memoryview(prefix))
+    magic, header_len = PREFIX.unpack(prefix)
+    if magic != MAGIC:
+        raise RpcError(f"Bad frame magic {magic!r}")
+    header = bytearray(header_len)
+    _recv_into(sock, memoryview(header))
+    header = json.loads(header)
+
+    tensors = []
+    for dtype, shape in header["tensors"]:
+        array = np.empty(shape, dtype=np.dtype(dtype))
+        if array.size:
+            _recv_into(sock, memoryview(array).cast("B"))
+        tensors.append(array)
+    return _decode(header["body"], tensors)
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class RpcClient:
+    """
+    One persistent connection to a node server. Calls are serialized per
+    connection; use one client per concurrently driven node.
+    """
+
+    def __init__(self, address: str, timeout: Optional[float] = None):
+        self.address = address
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        if self._sock is None:
+            sock = socket.create_connection(parse_address(self.address), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._sock = sock
+        return self._sock
+
+    def call(self, method: str, **kwargs) -> Any:
+        with self._lock:
+            try:
+                sock = self._connect()
+                send_message(sock, {"method": method, "kwargs": kwargs})
+                reply = recv_message(sock)
+            except (OSError, ConnectionError) as e:
+                self.close()
+                raise RpcError(f"{method} on {self.address} failed: {e}") from e
+        if not reply.get("ok"):
+            raise RpcError(f"{method} on {self.address} raised: {reply.get('error')}", code=reply.get("code"))
+        return reply.get("result")
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
@@ -0,0 +1,89 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+
+class ParticipationScheduler:
+    """
+    Chooses which hospitals take part in each federated round.
+
+    Policies:
+      - 'uniform': `k` distinct hospitals uniformly at random; aggregated
+        with sample-size weights.
+      - 'size_weighted': `k` draws with replacement, probability
+        proportional to sample size; aggregated with equal weight per draw
+        (a hospital drawn twice counts twice), which keeps the aggregate an
+        unbiased estimate of full-participation FedAvg.
+      - 'round_robin': walks a seeded permutation of all hospitals, `k`
+        per round, so every hospital participates equally often.
+
+    `k` is `count`, else ceil(fraction * n_nodes), and at least 1.
+    """
+
+    POLICIES = ('uniform', 'size_weighted', 'round_robin')
+
+    def __init__(self, sizes: Sequence[int], fraction: float = 1.0, count: Optional[int] = None,
+                 policy: str = 'uniform', seed: Optional[int] = None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown participation policy '{policy}' (expected one of {self.POLICIES})")
+        if count is None and not 0 < fraction <= 1:
+            raise ValueError(f"Participation fraction must be in (0, 1], got {fraction}")
+        self.sizes = np.asarray(sizes, dtype=np.float64)
+        self.n_nodes = len(self.sizes)
+        self.policy = policy
+        self.k = int(count) if count is not None else int(np.ceil(fraction * self.n_nodes))
+        self.k = max(1, min(self.k, self.n_nodes))
+        self.rng = np.random.default_rng(seed)
+        self._order = self.rng.permutation(self.n_nodes)
+        self._cursor = 0
+        self.participation = np.zeros(self.n_nodes, dtype=np.int64)
+        self.rounds = 0
+
+    @property
+    def full_participation(self) -> bool:
+        return self.k == self.n_nodes and self.policy != 'size_weighted'
+
+    def select(self) -> Dict[int, float]:
+        """
+        Samples the next round's participants. Returns {node index:
+        aggregation weight}; weights are unnormalized.
+        """
+        if self.policy == 'size_weighted':
+            draws = self.rng.choice(self.n_nodes, size=self.k, replace=True, p=self.sizes / self.sizes.sum())
+            nodes, counts = np.unique(draws, return_counts=True)
+            selected = {int(n): float(c) for n, c in zip(nodes, counts)}
+        else:
+            if self.policy == 'uniform':
+                nodes = self.rng.choice(self.n_nodes, size=self.k, replace=False)
+            else:
+                positions = (self._cursor + np.arange(self.k)) % self.n_nodes
+                nodes = self._order[positions]
+                self._cursor = (self._cursor + self.k) % self.n_nodes
+            selected = {int(n): float(self.sizes[n]) for n in sorted(nodes)}
+
+        self.participation[list(selected)] += 1
+        self.rounds += 1
+        return selected
+
+    def stats(self) -> Dict[str, object]:
+        """Per-node participation counts and rates so far."""
+        rounds = max(self.rounds, 1)
+        return {
+            'policy': self.policy,
+            'per_round': self.k,
+            'rounds': self.rounds,
+            'participation_counts': self.participation.tolist(),
+            'min_rate': float(self.participation.min() / rounds),
+            'max_rate': float(self.participation.max() / rounds),
+            'never_selected': int((self.participation == 0).sum()),
+        }
+
+
+def build_scheduler(sizes: Sequence[int], options: Optional[dict], config) -> Optional[ParticipationScheduler]:
+    """Scheduler from request options / config, or None for full participation."""
+    options = options or {}
+    fraction = float(options.get('fraction', config.PARTICIPATION_FRACTION))
+    count = options.get('count', config.PARTICIPATION_COUNT)
+    policy = options.get('policy', config.PARTICIPATION_POLICY)
+    seed = options.get('seed', config.PARTICIPATION_SEED)
+    scheduler = ParticipationScheduler(sizes, fraction, count, policy, seed)
+    return None if scheduler.full_participation else scheduler
@@ -0,0 +1,137 @@
+import math
+import numpy as np
+from typing import Dict, Mapping, Optional, Tuple
+
+
+class LatencyModel:
+    """
+    Simulated time (seconds) for a hospital to return its update after a
+    round starts: local compute (samples x the node's seconds per sample)
+    plus network latency, scaled by per-round lognormal jitter and, with
+    probability `straggler_prob`, a `straggler_slowdown` factor.
+
+    Per-node compute speed and latency are drawn once from a lognormal with
+    spread `heterogeneity`, so some hospitals are consistently slower.
+    """
+
+    def __init__(self, n_nodes: int, seconds_per_sample: float = 1e-3, latency: float = 0.1,
+                 heterogeneity: float = 0.5, jitter: float = 0.1, straggler_prob: float = 0.0,
+                 straggler_slowdown: float = 10.0, seed: Optional[int] = None):
+        if not 0 <= straggler_prob <= 1:
+            raise ValueError(f"straggler_prob must be in [0, 1], got {straggler_prob}")
+        self.rng = np.random.default_rng(seed)
+        self.seconds_per_sample = seconds_per_sample * self.rng.lognormal(0.0, heterogeneity, n_nodes)
+        self.latency = latency * self.rng.lognormal(0.0, heterogeneity, n_nodes)
+        self.jitter = jitter
+        self.straggler_prob = straggler_prob
+        self.straggler_slowdown = straggler_slowdown
+
+    def sample(self, sizes: Mapping[int, int]) -> Dict[int, float]:
+        """Arrival time of each node's update, for {node index: local samples}."""
+        arrivals = {}
+        for node, samples in sizes.items():
+            seconds = samples * self.seconds_per_sample[node] + self.latency[node]
+            seconds *= self.rng.lognormal(0.0, self.jitter)
+            if self.rng.random() < self.straggler_prob:
+                seconds *= self.straggler_slowdown
+            arrivals[node] = float(seconds)
+        return arrivals
+
+
+class RoundDeadline:
+    """
+    Decides which updates make it into a round.
+
+    Updates arriving by `seconds` are aggregated as usual. Late updates are
+    dropped ('drop'), or ('downweight') still accepted until
+    `grace * seconds` with their aggregation weight scaled by
+    seconds / arrival time; anything later is dropped. The round ends when
+    the last accepted update arrives or at the cutoff, whichever is first.
+    With `seconds=None` every update is waited for.
+    """
+
+    POLICIES = ('drop', 'downweight')
+
+    def __init__(self, seconds: Optional[float] = None, policy: str = 'drop', grace: float = 2.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown late update policy '{policy}' (expected one of {self.POLICIES})")
+        if seconds is not None and seconds <= 0:
+            raise ValueError(f"Round deadline must be positive, got {seconds}")
+        if grace < 1:
+            raise ValueError(f"Late update grace must be >= 1, got {grace}")
+        self.seconds = seconds
+        self.policy = policy
+        self.grace = grace
+
+    @property
+    def cutoff(self) -> float:
+        if self.seconds is None:
+            return math.inf
+        return self.seconds * (self.grace if self.policy == 'downweight' else 1.0)
+
+    def factor(self, seconds: float) -> Optional[float]:
+        """Weight factor for an update arriving after `seconds`, or None if it is dropped."""
+        if self.seconds is None or seconds <= self.seconds:
+            return 1.0
+        if seconds <= self.cutoff:
+            return self.seconds / seconds
+        return None
+
+    def resolve(self, arrivals: Mapping[int, float]) -> Tuple[Dict[int, float], Dict[str, object]]:
+        """
+        Returns ({node: weight factor} for accepted updates, timing), where
+        timing holds the round time, every node's arrival time and the
+        dropped / late (down-weighted) update counts.
+        """
+        factors = {}
+        dropped = late = 0
+        for node, seconds in arrivals.items():
+            factor = self.factor(seconds)
+            if factor is None:
+                dropped += 1
+                continue
+            factors[node] = factor
+            if factor < 1.0:
+                late += 1
+
+        timing = {
+            'round_time': min(max(arrivals.values(), default=0.0), self.cutoff),
+            'node_times': {str(node): round(seconds, 6) for node, seconds in arrivals.items()},
+            'dropped_updates': dropped,
+            'late_updates': late,
+        }
+        return factors, timing
+
+
+def build_straggler_handling(n_nodes: int, options: Optional[dict],
+                             config) -> Tuple[Optional[LatencyModel], Optional[RoundDeadline]]:
+    """
+    (latency model, deadline) from request options / config; either is
+    None when disabled. Latency is simulated when SIMULATE_LATENCY is set or
+    the options carry a 'latency' dict.
+    """
+    options = options or {}
+    latency_options = options.get('latency')
+    latency_model = None
+    if latency_options is not None or config.SIMULATE_LATENCY:
+        latency_options = latency_options or {}
+        latency_model = LatencyModel(
+            n_nodes,
+            seconds_per_sample=float(latency_options.get('seconds_per_sample', config.SIM_SECONDS_PER_SAMPLE)),
+            latency=float(latency_options.get('latency', config.SIM_NETWORK_LATENCY)),
+            heterogeneity=float(latency_options.get('heterogeneity', config.SIM_HETEROGENEITY)),
+            jitter=float(latency_options.get('jitter', config.SIM_JITTER)),
+            straggler_prob=float(latency_options.get('straggler_prob', config.SIM_STRAGGLER_PROB)),
+            straggler_slowdown=float(latency_options.get('straggler_slowdown', config.SIM_STRAGGLER_SLOWDOWN)),
+            seed=latency_options.get('seed', config.SIM_LATENCY_SEED),
+        )
+
+    seconds = options.get('deadline', config.ROUND_DEADLINE)
+    deadline = None
+    if seconds is not None:
+        deadline = RoundDeadline(
+            float(seconds),
+            policy=options.get('late_policy', config.LATE_UPDATE_POLICY),
+            grace=float(options.get('grace', config.LATE_UPDATE_GRACE)),
+        )
+    return latency_model, deadline
@@ -0,0 +1,206 @@
+import math
+
+import torch
+import torch.nn.functional as F
+from torch.func import functional_call, grad, vmap
+
+from app.federated_learning.coordinator import FederatedLearningCoordinator
+
+
+class VectorizedFederatedCoordinator(FederatedLearningCoordinator):
+    """
+    Simulation-mode coordinator that trains every hospital at once.
+
+    All hospitals share the MaternalRiskModel architecture, so their
+    parameters are stacked along a leading hospital dimension and each
+    local step is one vmap'd functional_call + grad over that dimension,
+    followed by an Adam update written on the stacked tensors. Local data is
+    padded to the largest hospital; a hospital with no rows left in a step
+    is masked out so its parameters and optimizer state stay put, exactly as
+    if its DataLoader had run out. FedAvg is a weighted sum over dim 0.
+
+    Each round matches the per-node loop: a fresh Adam per hospital, one
+    epoch of BATCH_SIZE mini-batches, BCEWithLogitsLoss with pos_weight,
+    sample-weighted averaging of parameters and metrics. With a
+    participation scheduler only the round's participants are stacked.
+    """
+
+    def __init__(self, hospital_data, test_dataloader, config, pos_weight=None,
+                 feat_mean=None, feat_std=None, shuffle=True, seed=None, scheduler=None,
+                 latency_model=None, deadline=None):
+        """
+        `hospital_data` is a list of (features, labels) tensors, one pair
+        per hospital, with features (n, n_features) and labels (n, 1).
+        Hospitals train together, so a deadline needs a simulated latency model.
+        """
+        if deadline is not None and latency_model is None:
+            raise ValueError("Round deadlines in vectorized simulation need a simulated latency model")
+        super().__init__([], test_dataloader, config, feat_mean=feat_mean, feat_std=feat_std,
+                         scheduler=scheduler, latency_model=latency_model, deadline=deadline)
+        device = config.DEVICE
+        sizes = [len(features) for features, _ in hospital_data]
+        n_max = max(sizes)
+        n_features = hospital_data[0][0].shape[1]
+
+        self.n_hospitals = len(hospital_data)
+        self.sizes = torch.tensor(sizes, device=device)
+        self.features = torch.zeros(self.n_hospitals, n_max, n_features, device=device)
+        self.labels = torch.zeros(self.n_hospitals, n_max, 1, device=device)
+        for h, (features, labels) in enumerate(hospital_data):
+            self.features[h, :sizes[h]] = features.to(device)
+            self.labels[h, :sizes[h]] = labels.reshape(-1, 1).to(device)
+
+        self.pos_weight = torch.tensor([pos_weight], device=device) if pos_weight is not None else None
+        self.shuffle = shuffle
+        self.generator = torch.Generator(device=device)
+        if seed is not None:
+            self.generator.manual_seed(seed)
+
+        # grad of one hospital's batch loss, mapped over the hospital dimension;
+        # 'different' gives every hospital its own dropout mask
+        self._local_grad = vmap(
+            grad(self._local_loss, has_aux=True),
+            in_dims=(0, 0, 0, 0),
+            randomness='different'
+        )
+
+    def _local_loss(self, params, features, labels, valid):
+        logits = functional_call(self.global_model, params, (features,))
+        losses = F.binary_cross_entropy_with_logits(
+            logits, labels, pos_weight=self.pos_weight, reduction='none'
+        ).squeeze(-1)
+        # Mean over the real rows of the batch (padding rows have valid == 0)
+        loss = (losses * valid).sum() / valid.sum().clamp(min=1)
+        return loss, (loss, logits.squeeze(-1))
+
+    def _row_order(self, sizes):
+        """Per-hospital row permutation with padding rows sorted last."""
+        n_max = self.features.shape[1]
+        positions = torch.arange(n_max, device=self.features.device).expand(len(sizes), n_max)
+        if not self.shuffle:
+            return positions
+        keys = torch.rand(len(sizes), n_max, generator=self.generator, device=self.features.device)
+        keys = torch.where(positions < sizes[:, None], keys, 2.0)
+        return keys.argsort(dim=1)
+
+    def train_hospitals(self, indices=None):
+        """
+        One local epoch on every hospital (or the hospitals in `indices`)
+        from the current global model. Returns (stacked parameters dict,
+        per-hospital metrics dict of tensors), stacked in `indices` order.
+        """
+        cfg = self.config
+        beta1, beta2, eps, lr = 0.9, 0.999, 1e-8, cfg.LEARNING_RATE
+        device = self.features.device
+        if indices is None:
+            all_features, all_labels, sizes = self.features, self.labels, self.sizes
+        else:
+            indices = torch.as_tensor(indices, device=device)
+            all_features, all_labels, sizes = self.features[indices], self.labels[indices], self.sizes[indices]
+        H = len(sizes)
+        # Trim padding beyond the largest participant
+        n_max = int(sizes.max())
+        all_features, all_labels = all_features[:, :n_max], all_labels[:, :n_max]
+
+        params = {
+            name: p.detach().unsqueeze(0).repeat(H, *([1] * p.dim())).contiguous()
+            for name, p in self.global_model.named_parameters()
+        }
+        exp_avg = {name: torch.zeros_like(p) for name, p in params.items()}
+        exp_avg_sq = {name: torch.zeros_like(p) for name, p in params.items()}
+        steps = torch.zeros(H, device=device)
+
+        loss_sum = torch.zeros(H, device=device)
+        tp = torch.zeros(H, device=device)
+        fp = torch.zeros(H, device=device)
+        fn = torch.zeros(H, device=device)
+        tn = torch.zeros(H, device=device)
+
+        order = self._row_order(sizes)[:, :n_max]
+        hospitals = torch.arange(H, device=device)[:, None]
+        batch_positions = torch.arange(cfg.BATCH_SIZE, device=device)
+        self.global_model.train()
+
+        for b in range(math.ceil(n_max / cfg.BATCH_SIZE)):
+            positions = b * cfg.BATCH_SIZE + batch_positions
+            positions = positions[positions < n_max]
+            rows = order[:, positions]
+            valid = (positions[None, :] < sizes[:, None]).float()
+            active = valid[:, 0] > 0
+
+            features = all_features[hospitals, rows]
+            labels = all_labels[hospitals, rows]
+            grads, (loss, logits) = self._local_grad(params, features, labels, valid)
+
+            # Adam (torch.optim.Adam defaults), applied only to hospitals with data left
+            steps = steps + active.float()
+            step = steps.clamp(min=1)
+            bias_correction1 = 1 - beta1 ** step
+            bias_correction2_sqrt = torch.sqrt(1 - beta2 ** step)
+            for name, p in params.items():
+                shape = (H,) + (1,) * (p.dim() - 1)
+                mask = active.view(shape)
+                g = grads[name]
+                m = torch.where(mask, exp_avg[name].lerp(g, 1 - beta1), exp_avg[name])
+                v = torch.where(mask, exp_avg_sq[name] * beta2 + (1 - beta2) * g * g, exp_avg_sq[name])
+                denom = v.sqrt() / bias_correction2_sqrt.view(shape) + eps
+                update = (lr / bias_correction1).view(shape) * m / denom
+                params[name] = torch.where(mask, p - update, p)
+                exp_avg[name], exp_avg_sq[name] = m, v
+
+            # Statistics (same definitions as train_model)
+            loss_sum += loss * valid.sum(dim=1)
+            predicted = logits > 0
+            positive = labels.squeeze(-1) > 0.5
+            tp += ((predicted & positive).float() * valid).sum(dim=1)
+            fp += ((predicted & ~positive).float() * valid).sum(dim=1)
+            fn += ((~predicted & positive).float() * valid).sum(dim=1)
+            tn += ((~predicted & ~positive).float() * valid).sum(dim=1)
+
+        sizes = sizes.float()
+        metrics = {
+            'loss': loss_sum / sizes,
+            'accuracy': (tp + tn) / sizes,
+            'precision': torch.where(tp + fp > 0, tp / (tp + fp).clamp(min=1), 0.0),
+            'recall': torch.where(tp + fn > 0, tp / (tp + fn).clamp(min=1), 0.0),
+            'f1': torch.where(tp > 0, 2 * tp / (2 * tp + fp + fn).clamp(min=1), 0.0),
+        }
+        return params, metrics
+
+    def run_federated_round(self):
+        """Run one round of federated learning over all participating hospitals at once"""
+        print(f"Starting federated round {self.global_round + 1}")
+        selected = self.select_participants(self.n_hospitals)
+        nodes = list(selected)
+        if self.scheduler is None:
+            print(f"  Training {self.n_hospitals} hospitals (vectorized)...")
+            params, metrics = self.train_hospitals()
+        else:
+            print(f"  Training {len(nodes)} of {self.n_hospitals} hospitals (vectorized)...")
+            params, metrics = self.train_hospitals(nodes)
+        sizes = self.sizes[nodes].float()
+
+        # Updates that missed the deadline get weight 0
+        accepted, timing = self.resolve_arrivals(selected, dict(zip(nodes, sizes.tolist())))
+        weights = torch.tensor([accepted.get(i, 0.0) for i in nodes], device=sizes.device, dtype=sizes.dtype)
+        if weights.sum() > 0:
+            # FedAvg: weighted reduction over the hospital dimension
+            weights = weights / weights.sum()
+            with torch.no_grad():
+                for name, param in self.global_model.named_parameters():
+                    shape = (-1,) + (1,) * param.dim()
+                    param.copy_((params[name] * weights.view(shape)).sum(dim=0))
+        else:
+            print("  No updates arrived before the deadline; global model unchanged")
+
+        # Train metrics are averaged over the participants' samples
+        sample_weights = sizes / sizes.sum()
+        avg_round_metrics = {key: float((value * sample_weights).sum()) for key, value in metrics.items()}
+        participants = nodes if self.scheduler is not None else None
+        # Simulated transport: each participant downloads and uploads full float32 weights
+        transport = {
+            'updates': len(nodes),
+            'bytes_uplink': len(nodes) * self.model_nbytes,
+            'bytes_downlink': len(nodes) * self.model_nbytes,
+        }
+        return self.complete_round(avg_round_metrics, participants, timing, transport)
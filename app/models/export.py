@@ -0,0 +1,146 @@
+import copy
+import os
+import logging
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+
+class ScaledRiskModel(nn.Module):
+    """
+    Inference wrapper around MaternalRiskModel: standardizes raw features
+    with the training feat_mean/feat_std and returns sigmoid risk scores.
+    """
+
+    def __init__(self, model, feat_mean=None, feat_std=None):
+        super(ScaledRiskModel, self).__init__()
+        self.model = copy.deepcopy(model).cpu().eval()
+        n_features = self.model.layer1.in_features
+        mean = np.zeros(n_features) if feat_mean is None else np.asarray(feat_mean)
+        std = np.ones(n_features) if feat_std is None else np.asarray(feat_std)
+        self.register_buffer('feat_mean', torch.as_tensor(mean, dtype=torch.float32))
+        self.register_buffer('feat_std', torch.as_tensor(std, dtype=torch.float32))
+
+    def forward(self, x):
+        return torch.sigmoid(self.model((x - self.feat_mean) / self.feat_std))
+
+
+def export_torchscript(model, path, feat_mean=None, feat_std=None):
+    """
+    Traces the model with its normalization baked in and saves a frozen
+    TorchScript artifact. Loading it needs neither MaternalRiskModel nor the
+    training-time scaling state.
+    """
+    wrapped = ScaledRiskModel(model, feat_mean, feat_std).eval()
+    example = torch.zeros(1, wrapped.feat_mean.numel())
+    with torch.no_grad():
+        frozen = torch.jit.freeze(torch.jit.trace(wrapped, example))
+
+    tmp_path = path + '.tmp'
+    frozen.save(tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(f"TorchScript artifact saved to {path}")
+    return path
+
+
+def quantize_int8(module):
+    """Dynamic int8 quantization of every Linear layer (weights int8, activations quantized per batch)."""
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+
+
+def export_quantized(model, path, feat_mean=None, feat_std=None):
+    """int8 counterpart of export_torchscript; loads with TorchScriptPredictor."""
+    wrapped = quantize_int8(ScaledRiskModel(model, feat_mean, feat_std).eval())
+    example = torch.zeros(1, wrapped.feat_mean.numel())
+    with torch.no_grad():
+        frozen = torch.jit.freeze(torch.jit.trace(wrapped, example))
+
+    tmp_path = path + '.tmp'
+    frozen.save(tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(f"int8 TorchScript artifact saved to {path}")
+    return path
+
+
+def quantization_report(model, test_dataloader):
+    """
+    Compares the float model against its int8 version on the held-out test
+    set (already standardized, as served by the dataloaders).
+    """
+    from sklearn.metrics import roc_auc_score
+
+    float_model = copy.deepcopy(model).cpu().eval()
+    int8_model = quantize_int8(float_model)
+    float_scores, int8_scores, labels = [], [], []
+    with torch.no_grad():
+        for features, batch_labels in test_dataloader:
+            features = features.cpu()
+            float_scores.append(torch.sigmoid(float_model(features)).reshape(-1).numpy())
+            int8_scores.append(torch.sigmoid(int8_model(features)).reshape(-1).numpy())
+            labels.append(batch_labels.reshape(-1).cpu().numpy())
+    float_scores = np.concatenate(float_scores)
+    int8_scores = np.concatenate(int8_scores)
+    labels = np.concatenate(labels) > 0.5
+
+    def auc(scores):
+        return float(roc_auc_score(labels, scores)) if 0 < labels.sum() < len(labels) else None
+
+    float_auc, int8_auc = auc(float_scores), auc(int8_scores)
+    float_accuracy = float(((float_scores > 0.5) == labels).mean())
+    int8_accuracy = float(((int8_scores > 0.5) == labels).mean())
+    diff = np.abs(float_scores - int8_scores)
+    return {
+        'samples': int(len(labels)),
+        'float_auc': float_auc,
+        'int8_auc': int8_auc,
+        'auc_delta': int8_auc - float_auc if float_auc is not None else None,
+        'float_accuracy': float_accuracy,
+        'int8_accuracy': int8_accuracy,
+        'accuracy_delta': int8_accuracy - float_accuracy,
+        'max_abs_score_diff': float(diff.max()),
+        'mean_abs_score_diff': float(diff.mean()),
+    }
+
+
+def export_numpy(model, path, feat_mean=None, feat_std=None):
+    """
+    Writes the weights as contiguous float32 arrays (transposed to
+    (in, out) for x @ W) plus the scaling stats, for NumpyRiskModel.
+    """
+    state = {k: v.detach().cpu().numpy() for k, v in model.state_dict().items()}
+    n_features = state['layer1.weight'].shape[1]
+    arrays = {
+        'feat_mean': np.zeros(n_features) if feat_mean is None else np.asarray(feat_mean),
+        'feat_std': np.ones(n_features) if feat_std is None else np.asarray(feat_std),
+    }
+    for i in (1, 2, 3):
+        arrays[f'w{i}'] = state[f'layer{i}.weight'].T
+        arrays[f'b{i}'] = state[f'layer{i}.bias']
+    arrays = {k: np.ascontiguousarray(v, dtype=np.float32) for k, v in arrays.items()}
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as fh:
+        np.savez(fh, **arrays)
+    os.replace(tmp_path, path)
+    logger.info(f"NumPy weights saved to {path}")
+    return path
+
+
+class TorchScriptPredictor:
+    """Serves risk scores from an exported TorchScript artifact."""
+
+    def __init__(self, path):
+        self.path = path
+        self.module = torch.jit.load(path, map_location='cpu')
+        self.module.eval()
+
+    def predict(self, features) -> np.ndarray:
+        """Risk scores for a (batch, n_features) array of raw features."""
+        x = torch.as_tensor(np.asarray(features, dtype=np.float32))
+        if x.dim() == 1:
+            x = x.unsqueeze(0)
+        with torch.no_grad():
+            return self.module(x).reshape(-1).numpy()
@@ -0,0 +1,70 @@
+import os
+import threading
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.data.storage import get_latest_model_version
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Inference backend -> model_versions column holding its artifact
+BACKENDS = {
+    "torchscript": "artifact_path",
+    "numpy": "numpy_path",
+    "int8": "int8_path",
+}
+
+# Loaded predictor per backend, as (artifact path, predictor). Artifacts are
+# immutable per version; only the newest one requested is kept, so superseded
+# (and garbage-collected) versions are released
+_predictors: Dict[str, Tuple[str, Any]] = {}
+_predictors_lock = threading.Lock()
+
+
+def _load(backend: str, path: str):
+    if backend == "numpy":
+        from app.models.numpy_inference import NumpyRiskModel
+        return NumpyRiskModel.load(path)
+    from app.models.export import TorchScriptPredictor
+    return TorchScriptPredictor(path)
+
+
+def load_predictor(backend: str, artifact_path: str):
+    """Returns the cached predictor for an exported artifact, loading it (and evicting the previous one) on change."""
+    with _predictors_lock:
+        cached = _predictors.get(backend)
+        if cached is None or cached[0] != artifact_path:
+            logger.info(f"Loading {backend} inference artifact {artifact_path}")
+            cached = (artifact_path, _load(backend, artifact_path))
+            _predictors[backend] = cached
+        return cached[1]
+
+
+def get_latest_predictor(backend: Optional[str] = None) -> Tuple[Optional[Any], Optional[int]]:
+    """
+    (predictor, version) for the newest exported model using `backend`
+    (default: config.INFERENCE_BACKEND), or (None, None) if there is none.
+    """
+    backend = backend or config.INFERENCE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'")
+    record = get_latest_model_version()
+    path = record.get(BACKENDS[backend]) if record else None
+    if not path or not os.path.exists(path):
+        return None, None
+    return load_predictor(backend, path), int(record["version"])
+
+
+def predict_in_memory(model, features, feat_mean=None, feat_std=None, device="cpu") -> np.ndarray:
+    """Scores raw features with a live (not yet saved) model, standardized like its training data."""
+    import torch
+
+    x = torch.as_tensor(np.asarray(features, dtype=np.float32))
+    if feat_mean is not None:
+        x = (x - torch.as_tensor(feat_mean, dtype=torch.float32)) / torch.as_tensor(feat_std, dtype=torch.float32)
+    model.eval()
+    with torch.no_grad():
+        return torch.sigmoid(model(x.to(device))).reshape(-1).cpu().numpy()
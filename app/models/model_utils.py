@@ -2,6 +2,7 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 from opacus import PrivacyEngine
+from torch.func import functional_call, grad, vmap
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 import numpy as np
 
@@ -31,8 +32,9 @@ def train_model(model, dataloader, criterion, optimizer, device, privacy_engine=
     """
     model.train()
     running_loss = 0.0
-    all_predictions = []
-    all_labels = []
+    # Confusion counts instead of per-sample prediction lists keep memory
+    # constant for streamed (arbitrarily large) local datasets
+    tp = fp = fn = tn = 0
     
     for features, labels in dataloader:
         features, labels = features.to(device), labels.to(device)
@@ -50,20 +52,141 @@ def train_model(model, dataloader, criterion, optimizer, device, privacy_engine=
         
         # Statistics
         running_loss += loss.item() * features.size(0)
-        predicted = (torch.sigmoid(outputs.data) > 0.5).float()
-        all_predictions.extend(predicted.cpu().numpy())
-        all_labels.extend(labels.cpu().numpy())
+        predicted = outputs.detach() > 0  # sigmoid(x) > 0.5
+        positive = labels > 0.5
+        tp += int((predicted & positive).sum())
+        fp += int((predicted & ~positive).sum())
+        fn += int((~predicted & positive).sum())
+        tn += int((~predicted & ~positive).sum())
     
-    epoch_loss = running_loss / len(dataloader.dataset)
+    # Calculate metrics (same definitions as sklearn with zero_division=0)
+    total = tp + fp + fn + tn
+    epoch_loss = running_loss / total if total else 0.0
+    accuracy = (tp + tn) / total if total else 0.0
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * tp / (2 * tp + fp + fn) if tp else 0.0
     
-    # Calculate metrics
-    all_predictions = np.array(all_predictions).flatten()
-    all_labels = np.array(all_labels).flatten()
+    return epoch_loss, accuracy, precision, recall, f1
+
+def _linear_layers(model):
+    """The model's nn.Linear layers, if they hold every parameter (else ghost clipping does not apply)"""
+    layers = [module for module in model.modules() if isinstance(module, nn.Linear)]
+    if sum(p.numel() for layer in layers for p in layer.parameters()) != sum(p.numel() for p in model.parameters()):
+        raise ValueError("Ghost clipping needs every parameter in an nn.Linear layer; use method='vmap'")
+    return layers
+
+def _ghost_clipped_sum(model, layers, features, labels, max_grad_norm, class_weights):
+    """
+    Sum of per-example clipped gradients without materializing them: for a
+    linear layer an example's weight gradient is the outer product of its
+    output gradient g and input a, so its norm is |g| * |a|, and the clipped
+    sum is (g * clip)^T a.
+    """
+    captured = []
+    hooks = [layer.register_forward_hook(lambda module, inputs, output: captured.append((inputs[0], output)))
+             for layer in layers]
+    try:
+        outputs = model(features)
+    finally:
+        for hook in hooks:
+            hook.remove()
+    # Rows are independent, so gradients of the summed loss are per-example
+    loss = nn.functional.binary_cross_entropy_with_logits(outputs, labels, reduction='sum')
+    output_grads = torch.autograd.grad(loss, [output for _, output in captured])
+    squared_norms = sum(
+        g.pow(2).sum(dim=1) * (a.pow(2).sum(dim=1) + (1.0 if layer.bias is not None else 0.0))
+        for layer, (a, _), g in zip(layers, captured, output_grads)
+    )
+    clip = (max_grad_norm / (squared_norms.sqrt() + 1e-6)).clamp(max=1.0) * class_weights[labels.long().squeeze(1)]
+    summed = {}
+    for layer, (a, _), g in zip(layers, captured, output_grads):
+        g = g * clip.unsqueeze(1)
+        summed[layer.weight] = g.t() @ a.detach()
+        if layer.bias is not None:
+            summed[layer.bias] = g.sum(dim=0)
+    return summed, outputs.detach()
+
+def _vmap_clipped_sum(model, per_sample_grads, features, labels, max_grad_norm, class_weights):
+    """Sum of per-example clipped gradients from one vmap(grad) call over the batch (any model)"""
+    params = {name: param.detach() for name, param in model.named_parameters()}
+    grads, outputs = per_sample_grads(params, features, labels)
+    norms = torch.sqrt(sum(g.reshape(len(features), -1).pow(2).sum(dim=1) for g in grads.values()))
+    clip = (max_grad_norm / (norms + 1e-6)).clamp(max=1.0) * class_weights[labels.long().squeeze(1)]
+    summed = {param: torch.tensordot(clip, grads[name], dims=1) for name, param in model.named_parameters()}
+    return summed, outputs
+
+def train_model_dp(model, features, labels, criterion, optimizer, device, noise_multiplier, max_grad_norm,
+                   sample_rate, steps, method="ghost"):
+    """
+    One epoch of DP-SGD over in-memory local data: `steps` Poisson-sampled
+    batches (each row included with probability `sample_rate`). Each
+    example's gradient is clipped to `max_grad_norm`, the clipped gradients
+    are summed, and Gaussian noise with std noise_multiplier * max_grad_norm
+    is added before dividing by the expected batch size and taking the
+    optimizer step.
+
+    Per-example gradient norms are computed for the whole batch at once:
+    "ghost" clipping derives them from layer activations and output
+    gradients (linear layers only, the fastest); "vmap" computes full
+    per-example gradients with torch.func (any model).
+
+    The criterion's pos_weight is applied after clipping, as per-example
+    weights scaled to at most 1 (clipping a weighted loss would cancel it),
+    so no example contributes more than max_grad_norm.
+    """
+    model.train()
+    if method == "ghost":
+        layers = _linear_layers(model)
+        clipped_sum = lambda x, y: _ghost_clipped_sum(model, layers, x, y, max_grad_norm, class_weights)
+    elif method == "vmap":
+        buffers = {name: buffer.detach() for name, buffer in model.named_buffers()}
+        
+        def sample_loss(params, x, y):
+            output = functional_call(model, (params, buffers), (x.unsqueeze(0),))
+            return nn.functional.binary_cross_entropy_with_logits(output, y.unsqueeze(0)), output.squeeze(0)
+        
+        # 'different' gives every example its own dropout mask
+        per_sample_grads = vmap(grad(sample_loss, has_aux=True), in_dims=(None, 0, 0), randomness='different')
+        clipped_sum = lambda x, y: _vmap_clipped_sum(model, per_sample_grads, x, y, max_grad_norm, class_weights)
+    else:
+        raise ValueError(f"Unknown DP gradient method '{method}' (expected 'ghost' or 'vmap')")
     
-    accuracy = accuracy_score(all_labels, all_predictions)
-    precision = precision_score(all_labels, all_predictions, zero_division=0)
-    recall = recall_score(all_labels, all_predictions, zero_division=0)
-    f1 = f1_score(all_labels, all_predictions, zero_division=0)
+    pos_weight = float(criterion.pos_weight) if getattr(criterion, 'pos_weight', None) is not None else 1.0
+    class_weights = torch.tensor([1.0, pos_weight], device=device) / max(pos_weight, 1.0)
+    n = len(features)
+    expected_batch = sample_rate * n
+    noise_std = noise_multiplier * max_grad_norm
+    running_loss = 0.0
+    tp = fp = fn = tn = 0
+    
+    for _ in range(steps):
+        batch = torch.nonzero(torch.rand(n) < sample_rate).squeeze(1)
+        x, y = features[batch].to(device), labels[batch].to(device)
+        summed, outputs = clipped_sum(x, y) if len(batch) else ({}, None)
+        
+        optimizer.zero_grad()
+        for param in model.parameters():
+            noise = torch.normal(0.0, noise_std, size=param.shape, device=device)
+            param.grad = (summed.get(param, 0.0) + noise) / expected_batch
+        optimizer.step()
+        
+        if len(batch):
+            with torch.no_grad():
+                running_loss += criterion(outputs, y).item() * len(batch)
+            predicted = outputs > 0
+            positive = y > 0.5
+            tp += int((predicted & positive).sum())
+            fp += int((predicted & ~positive).sum())
+            fn += int((~predicted & positive).sum())
+            tn += int((~predicted & ~positive).sum())
+    
+    total = tp + fp + fn + tn
+    epoch_loss = running_loss / total if total else 0.0
+    accuracy = (tp + tn) / total if total else 0.0
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * tp / (2 * tp + fp + fn) if tp else 0.0
     
     return epoch_loss, accuracy, precision, recall, f1
 
@@ -106,6 +229,50 @@ def evaluate_model(model, dataloader, device):
     
     return accuracy, precision, recall, f1, auc
 
+def evaluation_statistics(model, dataloader, device, criterion=None, bins=1000):
+    """
+    Sufficient statistics for evaluating `model` on one dataloader: sample
+    count, confusion counts at 0.5, the summed loss and fixed-bin histograms
+    of positive / negative scores on [0, 1]. Statistics from several sites
+    add up, and AUC follows from the merged histograms.
+    """
+    model.eval()
+    tp = fp = fn = tn = 0
+    loss_sum = 0.0
+    pos_hist = np.zeros(bins, dtype=np.int64)
+    neg_hist = np.zeros(bins, dtype=np.int64)
+    
+    with torch.no_grad():
+        for features, labels in dataloader:
+            features, labels = features.to(device), labels.to(device)
+            
+            outputs = model(features)
+            if criterion is not None:
+                loss_sum += criterion(outputs, labels).item() * features.size(0)
+            predicted = outputs > 0  # sigmoid(x) > 0.5
+            positive = labels > 0.5
+            tp += int((predicted & positive).sum())
+            fp += int((predicted & ~positive).sum())
+            fn += int((~predicted & positive).sum())
+            tn += int((~predicted & ~positive).sum())
+            
+            probs = torch.sigmoid(outputs).cpu().numpy().reshape(-1)
+            positive = positive.cpu().numpy().reshape(-1)
+            idx = np.minimum((probs * bins).astype(np.int64), bins - 1)
+            pos_hist += np.bincount(idx[positive], minlength=bins)
+            neg_hist += np.bincount(idx[~positive], minlength=bins)
+    
+    return {
+        'samples': tp + fp + fn + tn,
+        'tp': tp,
+        'fp': fp,
+        'fn': fn,
+        'tn': tn,
+        'loss_sum': loss_sum,
+        'pos_hist': pos_hist,
+        'neg_hist': neg_hist
+    }
+
 def setup_differential_privacy(model, optimizer, dataloader, noise_multiplier, max_grad_norm, delta):
     """
     Set up differential privacy using Opacus
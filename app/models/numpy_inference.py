@@ -0,0 +1,50 @@
+import numpy as np
+
+
+class NumpyRiskModel:
+    """
+    Torch-free forward pass of MaternalRiskModel from an exported .npz
+    (see export_numpy): two matmul+bias+ReLU layers, a final matmul and a
+    sigmoid. Dropout is a no-op at inference.
+
+    Standardization is fused into the first layer: with s = 1/std,
+    ((x - mean) * s) @ W1 + b1 == x @ (s[:, None] * W1) + (b1 - (mean * s) @ W1),
+    so raw features go straight into the first matmul.
+    """
+
+    def __init__(self, w1, b1, w2, b2, w3, b3, feat_mean, feat_std):
+        as32 = lambda a: np.ascontiguousarray(a, dtype=np.float32)
+        self.feat_mean = as32(feat_mean)
+        self.feat_std = as32(feat_std)
+        scale = 1.0 / self.feat_std.astype(np.float64)
+        w1 = np.asarray(w1, dtype=np.float64)
+        self.w1 = as32(scale[:, None] * w1)
+        self.b1 = as32(np.asarray(b1, dtype=np.float64) - (self.feat_mean * scale) @ w1)
+        self.w2, self.b2 = as32(w2), as32(b2)
+        self.w3, self.b3 = as32(w3), as32(b3)
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyRiskModel':
+        with np.load(path) as data:
+            return cls(**{k: data[k] for k in data.files})
+
+    @property
+    def n_features(self) -> int:
+        return self.w1.shape[0]
+
+    def predict(self, features) -> np.ndarray:
+        """Risk scores for a (batch, n_features) array of raw features."""
+        x = np.asarray(features, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[None, :]
+
+        h = x @ self.w1
+        h += self.b1
+        np.maximum(h, 0, out=h)
+        h2 = h @ self.w2
+        h2 += self.b2
+        np.maximum(h2, 0, out=h2)
+        z = (h2 @ self.w3).reshape(-1)
+        z += self.b3
+        # sigmoid(z) = exp(-log(1 + exp(-z))), stable for large |z|
+        return np.exp(-np.logaddexp(0, -z))
@@ -0,0 +1,98 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import torch
+
+# Add the project root to sys.path so we can import app
+sys.path.append(os.getcwd())
+
+from app.data.storage import init_db
+from app.data.synthetic_data import (
+    generate_synthetic_maternal_data,
+    prepare_matrix_dataloaders,
+    split_frame_to_matrix,
+)
+from app.federated_learning.async_coordinator import AsyncFederatedCoordinator
+from app.federated_learning.coordinator import FederatedLearningCoordinator
+from app.federated_learning.hospital_node import HospitalNode
+from app.federated_learning.stragglers import LatencyModel, RoundDeadline
+from config import config
+
+
+def make_federation(n_hospitals, samples_per_hospital):
+    data = generate_synthetic_maternal_data(n_samples=n_hospitals * samples_per_hospital,
+                                            n_features=config.NUM_FEATURES)
+    features, labels, ranges = split_frame_to_matrix(data, n_hospitals=n_hospitals, test_size=config.TEST_SIZE)
+    hospital_dls, test_dl, stats = prepare_matrix_dataloaders(features, labels, ranges, batch_size=config.BATCH_SIZE)
+    nodes = [
+        HospitalNode(i, dl, config.DEVICE, config, pos_weight=stats['pos_weight'])
+        for i, dl in enumerate(hospital_dls)
+    ]
+    return nodes, test_dl
+
+
+def time_to_target(coordinator, target_auc, max_rounds):
+    """Runs rounds until the test AUC reaches the target; returns (simulated seconds, rounds, updates, cpu seconds)."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(max_rounds):
+            coordinator.run_federated_round()
+            if coordinator.time_to_auc(target_auc) is not None:
+                break
+    cpu = time.perf_counter() - start
+    updates = sum(len(t['node_times']) - t['dropped_updates'] for t in coordinator.history['timing'])
+    return coordinator.time_to_auc(target_auc), coordinator.global_round, updates, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated wall-clock time to a target AUC: sync FedAvg vs FedBuff")
+    parser.add_argument('--hospitals', type=int, default=10)
+    parser.add_argument('--samples', type=int, default=500, help="Samples per hospital")
+    parser.add_argument('--target-auc', type=float, default=0.85)
+    parser.add_argument('--heterogeneity', type=float, default=1.0,
+                        help="Lognormal spread of per-node compute speed / latency")
+    parser.add_argument('--straggler-prob', type=float, default=0.1)
+    parser.add_argument('--buffer-size', type=int, default=3)
+    parser.add_argument('--deadline', type=float, default=None,
+                        help="Also run sync FedAvg with this round deadline (seconds, late updates dropped)")
+    parser.add_argument('--max-rounds', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config.DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    init_db()
+
+    def latency():
+        # Same seed: every mode sees the same per-node speeds
+        return LatencyModel(args.hospitals, seconds_per_sample=config.SIM_SECONDS_PER_SAMPLE,
+                            latency=config.SIM_NETWORK_LATENCY, heterogeneity=args.heterogeneity,
+                            jitter=config.SIM_JITTER, straggler_prob=args.straggler_prob,
+                            straggler_slowdown=config.SIM_STRAGGLER_SLOWDOWN, seed=args.seed)
+
+    modes = [('sync FedAvg', lambda nodes, test_dl: FederatedLearningCoordinator(
+        nodes, test_dl, config, latency_model=latency()))]
+    if args.deadline is not None:
+        modes.append((f'sync, {args.deadline}s deadline', lambda nodes, test_dl: FederatedLearningCoordinator(
+            nodes, test_dl, config, latency_model=latency(), deadline=RoundDeadline(args.deadline))))
+    modes.append((f'FedBuff K={args.buffer_size}', lambda nodes, test_dl: AsyncFederatedCoordinator(
+        nodes, test_dl, config, latency(), buffer_size=args.buffer_size)))
+
+    speeds = latency().seconds_per_sample
+    print(f"{args.hospitals} hospitals x {args.samples} samples, per-node seconds/sample "
+          f"{speeds.min():.2e}..{speeds.max():.2e}, target AUC {args.target_auc}")
+    print(f"{'mode':>24} {'sim s to AUC':>13} {'steps':>6} {'updates':>8} {'cpu s':>7}")
+    for name, build in modes:
+        torch.manual_seed(args.seed)
+        nodes, test_dl = make_federation(args.hospitals, args.samples)
+        seconds, steps, updates, cpu = time_to_target(build(nodes, test_dl), args.target_auc, args.max_rounds)
+        shown = f"{seconds:.2f}" if seconds is not None else "not reached"
+        print(f"{name:>24} {shown:>13} {steps:>6} {updates:>8} {cpu:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import torch
+import torch.nn as nn
+
+# Add the project root to sys.path so we can import app
+sys.path.append(os.getcwd())
+
+from app.data.storage import init_db
+from app.data.synthetic_data import (
+    generate_synthetic_maternal_data,
+    prepare_matrix_dataloaders,
+    split_frame_to_matrix,
+)
+from app.federated_learning.privacy import PrivacyAccountant
+from app.models.model_utils import (
+    MaternalRiskModel,
+    evaluate_model,
+    setup_differential_privacy,
+    train_model,
+    train_model_dp,
+)
+from config import config
+
+
+def new_model(seed):
+    torch.manual_seed(seed)
+    model = MaternalRiskModel(config.INPUT_SIZE, config.HIDDEN_SIZE, config.OUTPUT_SIZE, config.DROPOUT_RATE)
+    return model, torch.optim.Adam(model.parameters(), lr=config.LEARNING_RATE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local training cost of DP-SGD vs non-private training")
+    parser.add_argument('--samples', type=int, default=20000, help="Local samples")
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    config.DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    init_db()
+    data = generate_synthetic_maternal_data(n_samples=args.samples, n_features=config.NUM_FEATURES)
+    features, labels, ranges = split_frame_to_matrix(data, n_hospitals=1, test_size=config.TEST_SIZE)
+    hospital_dls, test_dl, stats = prepare_matrix_dataloaders(features, labels, ranges, batch_size=config.BATCH_SIZE)
+    train_dl = hospital_dls[0]
+    criterion = nn.BCEWithLogitsLoss(pos_weight=torch.tensor([stats['pos_weight']]))
+    device = torch.device('cpu')
+
+    print(f"{len(train_dl.dataset)} local samples, batch {config.BATCH_SIZE}, {args.epochs} epochs, "
+          f"noise {config.NOISE_MULTIPLIER}, clip {config.MAX_GRAD_NORM}, delta {config.DELTA}")
+    print(f"{'mode':>22} {'s/epoch':>8} {'slowdown':>9} {'test AUC':>9} {'epsilon':>8}")
+
+    results = []
+
+    model, optimizer = new_model(args.seed)
+    start = time.perf_counter()
+    for _ in range(args.epochs):
+        train_model(model, train_dl, criterion, optimizer, device)
+    results.append(('non-private', time.perf_counter() - start, model, None))
+
+    # Existing Opacus path (hook-based per-sample gradients)
+    model, optimizer = new_model(args.seed)
+    model, optimizer, private_dl, engine = setup_differential_privacy(
+        model, optimizer, train_dl, config.NOISE_MULTIPLIER, config.MAX_GRAD_NORM, config.DELTA
+    )
+    start = time.perf_counter()
+    for _ in range(args.epochs):
+        train_model(model, private_dl, criterion, optimizer, device, engine)
+    results.append(('DP-SGD opacus', time.perf_counter() - start, model, engine.get_epsilon(config.DELTA)))
+
+    for method in ('vmap', 'ghost'):
+        model, optimizer = new_model(args.seed)
+        accountant = PrivacyAccountant(method, config.NOISE_MULTIPLIER, config.MAX_GRAD_NORM, config.DELTA,
+                                       persist=False)
+        sample_rate, steps = accountant.schedule(len(train_dl.dataset), config.BATCH_SIZE)
+        start = time.perf_counter()
+        for _ in range(args.epochs):
+            train_model_dp(model, train_dl.dataset.features, train_dl.dataset.labels, criterion, optimizer, device,
+                           config.NOISE_MULTIPLIER, config.MAX_GRAD_NORM, sample_rate, steps, method=method)
+            accountant.spend(sample_rate, steps)
+        results.append((f'DP-SGD {method}', time.perf_counter() - start, model, accountant.epsilon))
+
+    baseline = results[0][1]
+    for name, seconds, model, epsilon in results:
+        auc = evaluate_model(model, test_dl, device)[4]
+        epsilon = f"{epsilon:>8.3f}" if epsilon is not None else f"{'-':>8}"
+        print(f"{name:>22} {seconds / args.epochs:>8.3f} {seconds / baseline:>8.2f}x {auc:>9.4f} {epsilon}")
+
+
+if __name__ == "__main__":
+    main()
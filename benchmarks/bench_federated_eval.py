@@ -0,0 +1,72 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import torch
+from torch.utils.data import DataLoader
+
+# Add the project root to sys.path so we can import app
+sys.path.append(os.getcwd())
+
+from app.data.storage import init_db
+from app.data.synthetic_data import (
+    MaternalHealthDataset,
+    generate_synthetic_maternal_data,
+    prepare_matrix_dataloaders,
+    split_frame_to_matrix,
+    split_holdout,
+)
+from app.federated_learning.coordinator import FederatedLearningCoordinator
+from app.federated_learning.hospital_node import HospitalNode
+from app.models.model_utils import evaluate_model
+from config import config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Central test pass vs federated sufficient-statistics evaluation")
+    parser.add_argument('--hospitals', type=int, default=8)
+    parser.add_argument('--samples', type=int, default=20000, help="Samples per hospital")
+    parser.add_argument('--bins', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--train-rounds', type=int, default=2, help="Rounds to train before evaluating")
+    args = parser.parse_args()
+
+    config.DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    init_db()
+    data = generate_synthetic_maternal_data(n_samples=args.hospitals * args.samples, n_features=config.NUM_FEATURES)
+    features, labels, ranges = split_frame_to_matrix(data, n_hospitals=args.hospitals, test_size=config.TEST_SIZE)
+    hospital_dls, _, stats = prepare_matrix_dataloaders(features, labels, ranges, batch_size=config.BATCH_SIZE)
+    splits = [split_holdout(dl, config.EVAL_HOLDOUT, config.BATCH_SIZE) for dl in hospital_dls]
+    nodes = [
+        HospitalNode(i, train, config.DEVICE, config, pos_weight=stats['pos_weight'], eval_dataloader=held_out)
+        for i, (train, held_out) in enumerate(splits)
+    ]
+    coordinator = FederatedLearningCoordinator(nodes, None, config, federated_eval=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        coordinator.run_federated_training(args.train_rounds)
+
+    # The pooled hold-out rows a central evaluation would need
+    pooled = DataLoader(MaternalHealthDataset(
+        torch.cat([held_out.dataset.features for _, held_out in splits]),
+        torch.cat([held_out.dataset.labels for _, held_out in splits])
+    ), batch_size=config.BATCH_SIZE)
+    start = time.perf_counter()
+    _, _, _, _, exact_auc = evaluate_model(coordinator.global_model, pooled, config.DEVICE)
+    t_central = time.perf_counter() - start
+
+    print(f"{args.hospitals} sites, {len(pooled.dataset)} hold-out rows; central pass {t_central:.3f}s, "
+          f"exact AUC {exact_auc:.6f}")
+    print(f"{'bins':>7} {'federated s':>12} {'AUC':>10} {'|AUC err|':>10}")
+    for bins in args.bins:
+        config.EVAL_HISTOGRAM_BINS = bins
+        start = time.perf_counter()
+        metrics = coordinator.evaluate_global_model()
+        t_federated = time.perf_counter() - start
+        print(f"{bins:>7} {t_federated:>12.3f} {metrics['auc']:>10.6f} {abs(metrics['auc'] - exact_auc):>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
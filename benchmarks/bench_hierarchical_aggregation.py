@@ -0,0 +1,132 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Add the project root to sys.path so we can import app
+sys.path.append(os.getcwd())
+
+from app.federated_learning.coordinator import FederatedLearningCoordinator
+from app.federated_learning.hierarchical import HierarchicalAggregator, assign_regions
+from app.federated_learning.remote_node import LocalNodeCluster, RemoteHospitalNode
+from config import config
+
+
+def model_shapes():
+    """Parameter shapes of MaternalRiskModel (weights stored out x in, as in state_dict)."""
+    sizes = [config.INPUT_SIZE, config.HIDDEN_SIZE, config.HIDDEN_SIZE // 2, config.OUTPUT_SIZE]
+    shapes = []
+    for fan_in, fan_out in zip(sizes, sizes[1:]):
+        shapes += [(fan_out, fan_in), (fan_out,)]
+    return shapes
+
+
+def simulated_update(node, shapes):
+    """Deterministic stand-in for hospital `node`'s local update: (params, sample count)."""
+    rng = np.random.default_rng(node)
+    params = [rng.standard_normal(shape, dtype=np.float32) * 0.1 for shape in shapes]
+    return params, int(rng.integers(50, 2000))
+
+
+class SimulatedHospital:
+    """Hospital node whose local_train returns a simulated update, so only aggregation is timed."""
+
+    def __init__(self, node, shapes):
+        self.node = node
+        self.shapes = shapes
+
+    def initialize_model(self, global_model):
+        pass
+
+    def local_train(self):
+        params, samples = simulated_update(self.node, self.shapes)
+        return params, {'loss': 0.0, 'accuracy': 0.0, 'samples': samples, 'bytes_sent': 0}
+
+
+def run_round(coordinator, train):
+    """One round's training + aggregation through the coordinator; (average, seconds, peak bytes)."""
+    selected = coordinator.select_participants(len(coordinator.hospital_nodes))
+    base_params = coordinator.global_params()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        averaged, _, _ = train(selected, base_params)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return averaged, elapsed, peak
+
+
+def remote_hospitals(n_nodes, samples, addresses):
+    """Hospitals with `samples` random rows each, hosted on node servers `addresses` ({node: address})."""
+    hospitals = []
+    for node in range(n_nodes):
+        rng = np.random.default_rng(node)
+        features = rng.standard_normal((samples, config.INPUT_SIZE), dtype=np.float32)
+        labels = (rng.random((samples, 1)) < 0.3).astype(np.float32)
+        hospitals.append(RemoteHospitalNode(node, addresses[node]).setup(features, labels))
+    return hospitals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flat vs hierarchical (per-state) FedAvg rounds through the coordinator")
+    parser.add_argument('--nodes', type=int, nargs='+', default=None,
+                        help="Default: 10 to 10000 (thread), 10 to 1000 (process)")
+    parser.add_argument('--regions', type=int, default=None, help="Regions (default: the 50 states + DC)")
+    parser.add_argument('--workers', type=int, default=config.AGGREGATION_WORKERS)
+    parser.add_argument('--executor', choices=HierarchicalAggregator.EXECUTORS, default='thread',
+                        help="thread: simulated updates in the coordinator; process: real local training "
+                             "on node servers, regions reduced there")
+    parser.add_argument('--samples', type=int, default=32, help="Rows per hospital (process executor)")
+    args = parser.parse_args()
+    nodes = args.nodes or ([10, 100, 1000, 10000] if args.executor == 'thread' else [10, 100, 1000])
+
+    shapes = model_shapes()
+    n_params = sum(int(np.prod(shape)) for shape in shapes)
+    print(f"Model: {n_params} parameters ({n_params * 4 / 1024:.1f} KiB per float32 update), "
+          f"{args.workers} sub-aggregator {'threads' if args.executor == 'thread' else 'node server processes'}")
+    print(f"{'nodes':>7} {'regions':>8} {'fan-in flat':>12} {'fan-in tree':>12} {'root MiB flat':>14} "
+          f"{'root MiB tree':>14} {'s flat':>8} {'s tree':>8} {'max |diff|':>11} {'bitwise':>8}")
+
+    cluster = LocalNodeCluster(args.workers) if args.executor == 'process' else None
+    try:
+        for n_nodes in nodes:
+            aggregator = HierarchicalAggregator(assign_regions(n_nodes, args.regions), workers=args.workers,
+                                                executor=args.executor)
+            if cluster is None:
+                hospitals = [SimulatedHospital(node, shapes) for node in range(n_nodes)]
+            else:
+                hospitals = remote_hospitals(n_nodes, args.samples, aggregator.placement(cluster.addresses))
+            coordinator = FederatedLearningCoordinator(hospitals, None, config, aggregator=aggregator,
+                                                       node_workers=1 if cluster is None else min(n_nodes, 64))
+
+            # Flat: the root collects every update, then reduces
+            flat, t_flat, mem_flat = run_round(coordinator, coordinator.train_flat)
+            # Hierarchical: regions reduce updates as they arrive, the root adds R partials
+            tree, t_tree, mem_tree = run_round(coordinator, coordinator.train_by_region)
+            aggregator.close()
+            if cluster is not None:
+                for hospital in hospitals:
+                    hospital.close()
+
+            regions = len(aggregator.regions)
+            if cluster is None:
+                diff = f"{max(float(np.abs(a - b).max()) for a, b in zip(flat, tree)):>11.1e}"
+                bitwise = f"{str(all(np.array_equal(a, b) for a, b in zip(flat, tree))):>8}"
+            else:
+                # Real training is stochastic: the two rounds train different models
+                diff, bitwise = f"{'-':>11}", f"{'-':>8}"
+            print(f"{n_nodes:>7} {regions:>8} {n_nodes:>12} {regions:>12} {mem_flat / 2**20:>14.2f} "
+                  f"{mem_tree / 2**20:>14.2f} {t_flat:>8.3f} {t_tree:>8.3f} {diff} {bitwise}")
+    finally:
+        if cluster is not None:
+            cluster.stop()
+
+
+if __name__ == "__main__":
+    main()
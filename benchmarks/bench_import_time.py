@@ -0,0 +1,73 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Modules the API process must not import until a training/inference
+# handler actually needs them
+TRAINING_DEPENDENCIES = ['torch', 'opacus', 'sklearn', 'scipy']
+
+# (module, max cumulative import seconds, modules that must stay unloaded)
+TARGETS = [
+    ('config', 0.3, TRAINING_DEPENDENCIES),
+    ('app.data.storage', 0.3, TRAINING_DEPENDENCIES),
+    ('app.api.data_routes', 1.5, TRAINING_DEPENDENCIES),
+    ('run', 2.0, TRAINING_DEPENDENCIES),
+]
+
+
+def measure(module):
+    """Cumulative import time of `module` in a fresh interpreter (-X importtime)."""
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {TRAINING_DEPENDENCIES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=os.getcwd()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        # The top-level entry for the target itself is not indented
+        if name == module:
+            cumulative_us = int(cumulative)
+    loaded = [m for m in result.stdout.strip().split(',') if m]
+    return (cumulative_us or 0) / 1e6, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time regression check for the API process")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per module; the fastest is reported")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Multiplier applied to every threshold (for slow machines)")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':24s} {'seconds':>9} {'limit':>7}  heavy modules loaded")
+    for module, limit, forbidden in TARGETS:
+        runs = [measure(module) for _ in range(args.repeat)]
+        seconds = min(r[0] for r in runs)
+        loaded = [m for m in runs[0][1] if m in forbidden]
+        limit *= args.scale
+        print(f"{module:24s} {seconds:>9.3f} {limit:>7.2f}  {', '.join(loaded) or '-'}")
+        if seconds > limit:
+            failures.append(f"{module}: {seconds:.3f}s > {limit:.2f}s")
+        if loaded:
+            failures.append(f"{module}: imports {', '.join(loaded)}")
+
+    if failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+# Add the project root to sys.path so we can import app
+sys.path.append(os.getcwd())
+
+from app.models.export import export_numpy, export_quantized, export_torchscript, TorchScriptPredictor
+from app.models.model_utils import MaternalRiskModel
+from app.models.numpy_inference import NumpyRiskModel
+from config import config
+
+
+def time_call(fn, x, min_seconds=0.2):
+    """Median seconds per call over enough repetitions to fill min_seconds."""
+    fn(x)  # warm up
+    runs = []
+    deadline = time.perf_counter() + min_seconds
+    while time.perf_counter() < deadline or len(runs) < 5:
+        start = time.perf_counter()
+        fn(x)
+        runs.append(time.perf_counter() - start)
+    return float(np.median(runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference latency: torch eager vs TorchScript (float/int8) vs NumPy")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 64, 512, 4096])
+    parser.add_argument('--threads', type=int, default=1, help="torch intra-op threads")
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    rng = np.random.default_rng(0)
+    model = MaternalRiskModel(config.INPUT_SIZE, config.HIDDEN_SIZE, config.OUTPUT_SIZE, config.DROPOUT_RATE).eval()
+    feat_mean = rng.normal(size=config.INPUT_SIZE).astype(np.float32)
+    feat_std = rng.uniform(0.5, 2.0, size=config.INPUT_SIZE).astype(np.float32)
+
+    tmp_dir = tempfile.mkdtemp()
+    scripted = TorchScriptPredictor(export_torchscript(model, os.path.join(tmp_dir, 'm.ts'), feat_mean, feat_std))
+    int8 = TorchScriptPredictor(export_quantized(model, os.path.join(tmp_dir, 'm.int8.ts'), feat_mean, feat_std))
+    numpy_model = NumpyRiskModel.load(export_numpy(model, os.path.join(tmp_dir, 'm.npz'), feat_mean, feat_std))
+
+    mean_t, std_t = torch.from_numpy(feat_mean), torch.from_numpy(feat_std)
+
+    def eager(x):
+        with torch.no_grad():
+            return torch.sigmoid(model((torch.from_numpy(x) - mean_t) / std_t)).reshape(-1).numpy()
+
+    check = rng.normal(size=(4096, config.INPUT_SIZE)).astype(np.float32)
+    print(f"max |numpy - eager|       = {np.abs(numpy_model.predict(check) - eager(check)).max():.2e}")
+    print(f"max |torchscript - eager| = {np.abs(scripted.predict(check) - eager(check)).max():.2e}")
+    print(f"max |int8 - eager|        = {np.abs(int8.predict(check) - eager(check)).max():.2e}")
+    print()
+    print(f"{'batch':>6} {'eager us':>10} {'script us':>10} {'int8 us':>10} {'numpy us':>10} "
+          f"{'int8 rows/s':>12} {'numpy rows/s':>13}")
+    for batch in args.batch_sizes:
+        x = rng.normal(size=(batch, config.INPUT_SIZE)).astype(np.float32)
+        t_eager = time_call(eager, x)
+        t_script = time_call(scripted.predict, x)
+        t_int8 = time_call(int8.predict, x)
+        t_numpy = time_call(numpy_model.predict, x)
+        print(f"{batch:>6} {t_eager * 1e6:>10.1f} {t_script * 1e6:>10.1f} {t_int8 * 1e6:>10.1f} {t_numpy * 1e6:>10.1f} "
+              f"{batch / t_int8:>12.0f} {batch / t_numpy:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
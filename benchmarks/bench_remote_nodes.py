@@ -0,0 +1,78 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import torch
+
+# Add the project root to sys.path so we can import app
+sys.path.append(os.getcwd())
+
+from app.data.storage import init_db
+from app.data.synthetic_data import (
+    generate_synthetic_maternal_data,
+    prepare_matrix_dataloaders,
+    split_frame_to_matrix,
+)
+from app.federated_learning.coordinator import FederatedLearningCoordinator
+from app.federated_learning.hospital_node import HospitalNode
+from app.federated_learning.remote_node import LocalNodeCluster, RemoteHospitalNode
+from config import config
+
+
+def seconds_per_round(coordinator, rounds):
+    with contextlib.redirect_stdout(io.StringIO()):
+        coordinator.run_federated_round()  # warm-up
+        start = time.perf_counter()
+        coordinator.run_federated_training(rounds)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process vs out-of-process (RPC) hospital nodes")
+    parser.add_argument('--hospitals', type=int, default=8)
+    parser.add_argument('--samples', type=int, default=5000, help="Samples per hospital")
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    config.DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    init_db()
+    data = generate_synthetic_maternal_data(n_samples=args.hospitals * args.samples, n_features=config.NUM_FEATURES)
+    features, labels, ranges = split_frame_to_matrix(data, n_hospitals=args.hospitals, test_size=config.TEST_SIZE)
+    hospital_dls, test_dl, stats = prepare_matrix_dataloaders(features, labels, ranges, batch_size=config.BATCH_SIZE)
+
+    print(f"{args.hospitals} hospitals x {args.samples} samples, {args.rounds} rounds")
+    print(f"{'mode':>22} {'s/round':>8} {'test AUC':>9}")
+
+    torch.set_num_threads(1)
+    nodes = [HospitalNode(i, dl, config.DEVICE, config, pos_weight=stats['pos_weight'])
+             for i, dl in enumerate(hospital_dls)]
+    coordinator = FederatedLearningCoordinator(nodes, test_dl, config)
+    t = seconds_per_round(coordinator, args.rounds)
+    print(f"{'in-process':>22} {t:>8.3f} {coordinator.history['test_metrics'][-1]['auc']:>9.4f}")
+
+    for n_processes in args.processes:
+        cluster = LocalNodeCluster(n_processes)
+        try:
+            nodes = [
+                RemoteHospitalNode(i, cluster.addresses[i % n_processes]).setup(
+                    dl.dataset.features.numpy(), dl.dataset.labels.numpy(), pos_weight=stats['pos_weight']
+                )
+                for i, dl in enumerate(hospital_dls)
+            ]
+            coordinator = FederatedLearningCoordinator(nodes, test_dl, config, node_workers=len(nodes))
+            t = seconds_per_round(coordinator, args.rounds)
+            print(f"{f'{n_processes} node processes':>22} {t:>8.3f} "
+                  f"{coordinator.history['test_metrics'][-1]['auc']:>9.4f}")
+            for node in nodes:
+                node.close()
+        finally:
+            cluster.stop()
+
+
+if __name__ == "__main__":
+    main()
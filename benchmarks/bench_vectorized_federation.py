@@ -0,0 +1,97 @@
+import argparse
+import contextlib
+import copy
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+
+# Add the project root to sys.path so we can import app
+sys.path.append(os.getcwd())
+
+from app.data.storage import init_db
+from app.data.synthetic_data import MaternalHealthDataset
+from app.federated_learning.coordinator import FederatedLearningCoordinator
+from app.federated_learning.hospital_node import HospitalNode
+from app.federated_learning.vectorized import VectorizedFederatedCoordinator
+from config import config
+
+
+def make_hospitals(n_hospitals, rows, n_features, seed=0):
+    """Hospitals with slightly different sizes and feature shifts."""
+    rng = np.random.default_rng(seed)
+    hospitals = []
+    for h in range(n_hospitals):
+        n = int(rows * rng.uniform(0.7, 1.3))
+        x = rng.normal(rng.normal(0, 0.3), 1.0, size=(n, n_features)).astype(np.float32)
+        y = (x[:, :3].sum(axis=1) + rng.normal(0, 1, size=n) > 1.5).astype(np.float32)
+        hospitals.append((torch.from_numpy(x), torch.from_numpy(y).unsqueeze(1)))
+    return hospitals
+
+
+def loop_coordinator(cfg, hospitals, test_dl, shuffle):
+    nodes = [
+        HospitalNode(i, DataLoader(MaternalHealthDataset(x, y), batch_size=cfg.BATCH_SIZE, shuffle=shuffle),
+                     cfg.DEVICE, cfg, pos_weight=2.0)
+        for i, (x, y) in enumerate(hospitals)
+    ]
+    return FederatedLearningCoordinator(nodes, test_dl, cfg)
+
+
+def run_rounds(coordinator, rounds):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        coordinator.run_federated_training(rounds)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-node loop vs vmap'd federation simulator")
+    parser.add_argument('--hospitals', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--rows', type=int, default=300, help="Mean rows per hospital")
+    parser.add_argument('--rounds', type=int, default=2)
+    parser.add_argument('--loop-max', type=int, default=100,
+                        help="Largest federation to also time with the per-node loop")
+    args = parser.parse_args()
+
+    config.DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    init_db()
+    test = make_hospitals(1, 2000, config.INPUT_SIZE, seed=99)[0]
+    test_dl = DataLoader(MaternalHealthDataset(*test), batch_size=1024)
+
+    # Parity: without dropout and shuffling both paths are deterministic
+    cfg = copy.copy(config)
+    cfg.DROPOUT_RATE = 0.0
+    hospitals = make_hospitals(5, args.rows, cfg.INPUT_SIZE)
+    torch.manual_seed(0)
+    loop = loop_coordinator(cfg, hospitals, test_dl, shuffle=False)
+    torch.manual_seed(0)
+    vectorized = VectorizedFederatedCoordinator(hospitals, test_dl, cfg, pos_weight=2.0, shuffle=False)
+    run_rounds(loop, 3)
+    run_rounds(vectorized, 3)
+    diff = max(
+        (a - b).abs().max().item()
+        for a, b in zip(loop.global_model.parameters(), vectorized.global_model.parameters())
+    )
+    loss_diff = abs(loop.history['train_metrics'][-1]['loss'] - vectorized.history['train_metrics'][-1]['loss'])
+    print(f"Parity after 3 rounds (5 hospitals): max |param diff| = {diff:.2e}, |loss diff| = {loss_diff:.2e}")
+    print()
+
+    print(f"{'hospitals':>10} {'loop s/round':>13} {'vmap s/round':>13} {'speedup':>8}")
+    for n_hospitals in args.hospitals:
+        hospitals = make_hospitals(n_hospitals, args.rows, config.INPUT_SIZE)
+        t_vec = run_rounds(VectorizedFederatedCoordinator(hospitals, test_dl, config, pos_weight=2.0, seed=0),
+                           args.rounds)
+        t_loop = float('nan')
+        if n_hospitals <= args.loop_max:
+            t_loop = run_rounds(loop_coordinator(config, hospitals, test_dl, shuffle=True), args.rounds)
+        print(f"{n_hospitals:>10} {t_loop:>13.3f} {t_vec:>13.3f} {t_loop / t_vec:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import os
-import torch
+from functools import cached_property
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,7 +18,74 @@ class Config:
     NUM_SAMPLES_PER_HOSPITAL = 1000
     NUM_FEATURES = 25
     TEST_SIZE = 0.2
-    
+    # Streaming simulation: hospital/test data generated chunk by chunk on the fly
+    STREAMING_DATA = False
+    STREAM_CHUNK_SIZE = 65536
+    # Simulation: train all hospitals at once in one vmap'd model
+    VECTORIZED_SIMULATION = False
+    # Partial participation: hospitals sampled per round (fraction or count)
+    # with policy 'uniform', 'size_weighted' or 'round_robin'
+    PARTICIPATION_FRACTION = float(os.getenv("PARTICIPATION_FRACTION", "1.0"))
+    PARTICIPATION_COUNT = None
+    PARTICIPATION_POLICY = os.getenv("PARTICIPATION_POLICY", "uniform")
+    PARTICIPATION_SEED = None
+    # Round deadline (seconds, None waits for every update); late updates are
+    # dropped or, with 'downweight', accepted until GRACE x deadline at reduced weight
+    ROUND_DEADLINE = None
+    LATE_UPDATE_POLICY = "drop"
+    LATE_UPDATE_GRACE = 2.0
+    # Simulated per-node compute speed / network latency for local testing
+    SIMULATE_LATENCY = False
+    SIM_SECONDS_PER_SAMPLE = 1e-3
+    SIM_NETWORK_LATENCY = 0.1
+    SIM_HETEROGENEITY = 0.5
+    SIM_JITTER = 0.1
+    SIM_STRAGGLER_PROB = 0.05
+    SIM_STRAGGLER_SLOWDOWN = 10.0
+    SIM_LATENCY_SEED = None
+    # Asynchronous buffered aggregation (FedBuff): apply every K arriving updates,
+    # weighted by (1 + staleness) ** -ASYNC_STALENESS_EXPONENT; runs on simulated latency
+    ASYNC_AGGREGATION = False
+    ASYNC_BUFFER_SIZE = 3
+    ASYNC_SERVER_LR = 1.0
+    ASYNC_STALENESS_EXPONENT = 0.5
+    ASYNC_MAX_STALENESS = None
+    # Hierarchical aggregation: regional sub-aggregators (US states by default,
+    # or AGGREGATION_REGIONS groups) train their hospitals and reduce updates as
+    # they arrive, exactly; "process" hosts each region on a node server
+    # (AGGREGATION_WORKERS local ones unless NODE_SERVERS is set), "thread"
+    # reduces in the coordinator. AGGREGATION_WORKERS regions run concurrently
+    HIERARCHICAL_AGGREGATION = False
+    AGGREGATION_REGIONS = None
+    AGGREGATION_WORKERS = 4
+    AGGREGATION_EXECUTOR = "process"  # "thread" or "process"
+    # Update compression: hospitals send deltas as "int8", "int4" or "topk"
+    # (TOPK_FRACTION of entries) with error-feedback residuals; "none" sends full weights
+    UPDATE_COMPRESSION = "none"
+    TOPK_FRACTION = 0.01
+    ERROR_FEEDBACK = True
+    # Out-of-process hospitals: node servers ("host:port", comma-separated) or
+    # NODE_SERVER_PROCESSES local server processes started from NODE_SERVER_BASE_PORT
+    NODE_SERVERS = [address for address in os.getenv("NODE_SERVERS", "").split(",") if address]
+    NODE_SERVER_PROCESSES = 0
+    NODE_SERVER_BASE_PORT = 9100
+    NODE_RPC_TIMEOUT = 300
+    # Federated evaluation: hospitals score a local hold-out split (EVAL_HOLDOUT of
+    # their rows) and return confusion counts, loss sums and score histograms
+    FEDERATED_EVALUATION = False
+    EVAL_HOLDOUT = 0.2
+    EVAL_HISTOGRAM_BINS = 1000
+    EVAL_WORKERS = 4
+    # Evaluation cadence: test every EVAL_EVERY rounds, and also whenever the
+    # global update norm changes by more than EVAL_NORM_CHANGE (relative)
+    EVAL_EVERY = 1
+    EVAL_NORM_CHANGE = None
+    # Early stopping: stop after PATIENCE evaluations without a METRIC gain > MIN_DELTA
+    EARLY_STOPPING = False
+    EARLY_STOPPING_PATIENCE = 3
+    EARLY_STOPPING_MIN_DELTA = 1e-3
+    EARLY_STOPPING_METRIC = "auc"
+
     # Model settings
     INPUT_SIZE = 25
     HIDDEN_SIZE = 64
@@ -31,16 +98,52 @@ class Config:
     LEARNING_RATE = 0.001
     FEDERATED_ROUNDS = 5
     
-    # Privacy settings
+    # Privacy settings: DP-SGD in local training, with a per-hospital RDP
+    # accountant persisted in the DB; hospitals stop at DP_EPSILON_BUDGET (None: no cap)
+    DIFFERENTIAL_PRIVACY = os.getenv("DIFFERENTIAL_PRIVACY", "0") == "1"
     MAX_GRAD_NORM = 1.0
     NOISE_MULTIPLIER = 1.1
     DELTA = 1e-5
+    DP_EPSILON_BUDGET = None
+    # Per-example clipping: "ghost" (norms from activations; linear layers) or "vmap" (any model)
+    DP_GRADIENT_METHOD = "ghost"
     
-    # Device
-    DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    # Device: "cpu", "cuda", ... or unset to pick cuda when available.
+    # Resolved on first use so importing config does not import torch.
+    DEVICE_NAME = os.getenv("DEVICE")
+
+    @cached_property
+    def DEVICE(self):
+        import torch
+        if self.DEVICE_NAME:
+            return torch.device(self.DEVICE_NAME)
+        return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    @property
+    def device_label(self) -> str:
+        """Device for display; does not import torch if it is not resolved yet."""
+        if "DEVICE" in self.__dict__:
+            return str(self.DEVICE)
+        return self.DEVICE_NAME or "auto"
+
+    # Inference backend for /api/predict: "torchscript", "int8", or "numpy"
+    # to serve without importing torch
+    INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torchscript")
+    # Also export a dynamically quantized int8 artifact ("int8" backend)
+    EXPORT_INT8 = True
+    # Largest batch accepted by /api/predict
+    MAX_PREDICT_BATCH = 10000
+
+    # Background tasks (local queue, used when no Celery broker is configured)
+    TASK_WORKERS = 1
+    TASK_EXECUTOR = os.getenv("TASK_EXECUTOR", "thread")  # "thread" or "process"
 
     # Storage
     DB_PATH = os.path.join(BASE_DIR, "artemis.sqlite3")
     MODEL_DIR = os.path.join(BASE_DIR, "saved_models")
+    # Model store: a whole (keyframe) version every N versions, deltas between;
+    # keep only the newest MODEL_RETENTION versions (0 keeps all)
+    MODEL_STORE_KEYFRAME_INTERVAL = 10
+    MODEL_RETENTION = int(os.getenv("MODEL_RETENTION", "0"))
     
 config = Config()
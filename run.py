@@ -2,6 +2,7 @@ from flask import Flask
 from flask_cors import CORS
 from app.api.endpoints import api_bp
 from app.api.data_routes import data_bp
+from app.data.storage import init_db
 from config import config
 
 
@@ -32,6 +33,8 @@ def create_app():
         storage_uri="memory://",
     )
 
+    init_db()
+
     # Register blueprints
     app.register_blueprint(api_bp)
     app.register_blueprint(data_bp)
@@ -44,7 +47,7 @@ if __name__ == '__main__':
 
     print("Starting Project Artemis Server")
     print("=" * 50)
-    print(f"Device: {config.DEVICE}")
+    print(f"Device: {config.device_label}")
     print(f"Hospitals: {config.NUM_HOSPITALS}")
     print(f"Features: {config.NUM_FEATURES}")
     print("=" * 50)